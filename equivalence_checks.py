@@ -0,0 +1,148 @@
+"""
+# ISC License (ISC)
+
+# Copyright 2023 ARIA Systems Research, University of Colorado at Boulder
+
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+# Author: Justin Kottinger
+"""
+
+import sys
+import os
+import copy
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Dict, Callable
+from src.TestManager import TestManager
+from src.FaultIdentifier import FaultIdentifier
+
+
+# the measurement columns the noise is added to (the CSS and RW Omega columns)
+NOISY_COLUMNS = ['CSS Cos Values  %d [-]' %idx for idx in range(1, 9)] + ['RW Omega  %d [rad/s]' %idx for idx in range(1, 5)]
+# the block sizes the coverage of the coarse pass of run_coarse_to_fine() is checked for 
+COARSE_STRIDES = (3, 6, 10, 25)
+
+def noisy_truth(truth_telem: pd.DataFrame, noise_std: float, seed: int = 0) -> pd.DataFrame:
+	""" Returns a copy of the truth telemetry data with zero-mean Gaussian noise 
+	added to NOISY_COLUMNS. On noisy truth, fault modes keep switching between 
+	matching and not matching Nominal, which exercises the tie-break logic. 
+	"""
+	rng = np.random.default_rng(seed)
+	truth_telem = truth_telem.copy()
+	columns = [column for column in NOISY_COLUMNS if column in truth_telem.columns]
+	truth_telem[columns] = truth_telem[columns] + noise_std * rng.standard_normal((len(truth_telem.index), len(columns)))
+	return truth_telem
+
+def resumed_run(tester: FaultIdentifier, truth_telem: pd.DataFrame, checkpoint_path: str) -> np.ndarray:
+	""" Runs tester on the first half of truth_telem with a checkpoint every 7 measurements, 
+	then resumes a fresh copy of tester from the last checkpoint on all of truth_telem. """
+	fresh_tester = copy.deepcopy(tester)
+	tester.run_offline_fault_ID(truth_telem.iloc[:len(truth_telem.index) // 2], checkpoint_path=checkpoint_path, 
+								checkpoint_interval=7)
+	assert fresh_tester.load_checkpoint(checkpoint_path), "The checkpoint was not written."
+	return fresh_tester.run_offline_fault_ID(truth_telem)
+
+def checkpointed_run(tester: FaultIdentifier, truth_telem: pd.DataFrame, checkpoint_path: str) -> np.ndarray:
+	""" Runs tester on truth_telem with a checkpoint every 7 measurements. Taking checkpoints 
+	must not change the results. """
+	return tester.run_offline_fault_ID(truth_telem, checkpoint_path=checkpoint_path, checkpoint_interval=7)
+
+def updated_run(tester: FaultIdentifier, truth_telem: pd.DataFrame) -> np.ndarray:
+	""" Runs tester on the first half of truth_telem, replaces the simulated telemetry of 
+	every mode in place (see FaultIdentifier.update_modes()) and runs on the rest. """
+	half = len(truth_telem.index) // 2
+	tester.run_offline_fault_ID(truth_telem.iloc[:half])
+	times = np.array(list(tester._time_index.keys()))
+	sim_meas = tester._expected_measurements(np.arange(len(times)))
+	sim_data = {mode: pd.DataFrame(np.column_stack((times, sim_meas[idx])), columns=['Time (ns)'] + tester._columns) 
+				for idx, mode in enumerate(tester._modes)}
+	tester.update_modes(sim_data, recent_truth=truth_telem.iloc[half - tester._window_len:half])
+	return tester.run_offline_fault_ID(truth_telem)
+
+def generic_run(tester: FaultIdentifier, truth_telem: pd.DataFrame) -> np.ndarray:
+	""" Runs tester with every mode on the generic (D-dimensional) test. """
+	tester._set_channel_families(False)
+	return tester.run_offline_fault_ID(truth_telem)
+
+def uncovered_decision_changes(tester: FaultIdentifier, truth_telem: pd.DataFrame, serial_mode_ids: np.ndarray, 
+							stride: int) -> int:
+	""" Returns the number of decision changes of the serial run (serial_mode_ids) that 
+	the coarse pass of FaultIdentifier.run_coarse_to_fine() does not flag for the fine pass. """
+	truth_meas = tester._get_measurements(truth_telem)
+	time_idx = np.array([tester._time_index[t] for t in truth_meas[:, 0]], dtype=int)
+	_, is_fine = tester._coarse_pass(truth_meas, time_idx, stride)
+	nominal_code = tester._mode_codes[tester._mode_index["Nominal"]]
+	changes = np.asarray(serial_mode_ids) != np.append(nominal_code, serial_mode_ids[:-1])
+	return np.count_nonzero(changes & ~is_fine)
+
+def equivalence_checks(checkpoint_dir: str, gated: bool) -> Dict[str, Callable[[FaultIdentifier, pd.DataFrame], np.ndarray]]:
+	""" Returns every path that must reproduce the mode ID's of the serial run 
+	(FaultIdentifier.run_offline_fault_ID()). Every check gets its own copy of the tester. 
+	Only the checkpoint and bank update checks support detection-gated testers.
+	"""
+	checks = {"checkpoints": lambda tester, truth: checkpointed_run(tester, truth, os.path.join(checkpoint_dir, "run.pkl")),
+			"checkpoint/resume": lambda tester, truth: resumed_run(tester, truth, os.path.join(checkpoint_dir, "resume.pkl")),
+			"bank update": updated_run}
+	if not gated:
+		checks.update({"shards": lambda tester, truth: tester.run_sharded(truth, num_shards=3),
+					"chunks": lambda tester, truth: tester.run_time_partitioned(truth, num_chunks=3),
+					"families": generic_run,
+					# the default point of the sweep is the serial configuration
+					"sweep": lambda tester, truth: next(iter(tester.run_parameter_sweep(truth).values()))})
+	return checks
+
+def run_checks(sim_dir_path: str, telem_csv_path: str, noise_levels=(0.05, 0.15)) -> int:
+	""" Runs every equivalence check on every tester of one example for every noise level.
+
+	Output: int -- the number of failed checks
+	"""
+	test_manager = TestManager(sim_dir_path, telem_csv_path)
+	testers = test_manager.get_testers()
+	num_failed = 0
+	with tempfile.TemporaryDirectory() as checkpoint_dir:
+		for noise_std in noise_levels:
+			truth_telem = noisy_truth(test_manager.truth_telem_df, noise_std)
+			for gate_quiet_period in (None, 50):
+				checks = equivalence_checks(checkpoint_dir, gate_quiet_period is not None)
+				for test_key, tester in testers.items():
+					tester = copy.deepcopy(tester)
+					tester.set_detection_gate(gate_quiet_period)
+					serial_mode_ids = copy.deepcopy(tester).run_offline_fault_ID(truth_telem)
+					for check_name, check in checks.items():
+						mode_ids = check(copy.deepcopy(tester), truth_telem)
+						num_diffs = np.count_nonzero(np.asarray(mode_ids) != serial_mode_ids)
+						if num_diffs > 0:
+							num_failed += 1
+							print("Equivalence Checks: FAILED %s of %s with noise %g and gate %s (%d of %d samples differ)." 
+								%(check_name, test_key, noise_std, gate_quiet_period, num_diffs, len(serial_mode_ids)))
+					if gate_quiet_period is None:
+						for stride in COARSE_STRIDES:
+							num_uncovered = uncovered_decision_changes(tester, truth_telem, serial_mode_ids, stride)
+							if num_uncovered > 0:
+								num_failed += 1
+								print("Equivalence Checks: FAILED coarse pass of %s with noise %g and stride %d (%d decision changes are not flagged)." 
+									%(test_key, noise_std, stride, num_uncovered))
+	return num_failed
+
+if __name__ == '__main__':
+	''' Checks that every alternative Fault ID path reproduces the serial mode ID's on 
+	noisy versions of every example (see run_tests.sh for the examples). 
+	Exits with status 1 if any check fails.
+	'''
+	num_failed = 0
+	for example in sorted(os.listdir("examples/Telemetry")):
+		num_failed += run_checks("examples/Simulations/" + example, "examples/Telemetry/" + example + "/telemetry.csv")
+	print("Equivalence Checks: %s." %("all checks passed" if num_failed == 0 else "%d checks failed" %num_failed))
+	sys.exit(1 if num_failed > 0 else 0)
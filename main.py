@@ -20,34 +20,99 @@
 
 import sys
 import os
+import copy
 import getopt # command line parsing
-from typing import List, Tuple
+from typing import List, Tuple, Dict
 from src.TestManager import TestManager
 
 
-def cmd_parser(argv: List[str]) -> Tuple[str, str]:
+def parse_test_option(arg: str) -> Tuple[str, List[str]]:
+	""" Splits a per-test option (e.g. BATTERY_CAP_ID=10:avg) into the test type and its parameters. """
+	test_key, params = arg.split("=")
+	return test_key, params.split(":")
+
+def parse_rate(arg: str) -> Tuple[str, Tuple[int, bool]]:
+	""" Parses --rate into (test type, (decimation factor, pre-average)). """
+	test_key, rate = parse_test_option(arg)
+	return test_key, (int(rate[0]), len(rate) > 1 and rate[1] == "avg")
+
+def parse_engine(arg: str) -> Tuple[str, Tuple]:
+	""" Parses --engine into (test type, (engine, parameters...)). """
+	test_key, engine = parse_test_option(arg)
+	return test_key, (engine[0],) + tuple(float(param) for param in engine[1:])
+
+def parse_covariance(arg: str) -> Tuple[str, int]:
+	""" Parses --covariance into (model, number of truth rows). """
+	covariance = arg.split(":")
+	return covariance[0], int(covariance[1]) if len(covariance) > 1 else None
+
+# the optional arguments: (long option, short option, options key, default, parser, help). 
+# Flags have no parser and become True, repeatable per-test options (e.g. --rate) 
+# collect the (test type, value) pairs their parser returns in a dictionary.
+OPTIONAL_ARGS = [("checkpoint", "c", "checkpoint_dir", None, str, "A directory to periodically checkpoint the Fault ID state to (e.g. <path/to/checkpoints>)"),
+				("resume", "r", "resume", False, None, "Resume from the latest checkpoint inside --checkpoint."),
+				("cache", None, "cache_dir", None, str, "A directory to cache Fault ID results in. Tests whose inputs are unchanged are not re-run."),
+				("trace", None, "trace_dir", None, str, "A directory to record the distance of every mode at every time step in (e.g. <path/to/traces>)"),
+				("trace-decimation", None, "trace_decimation", 1, int, "Only record every nth time step with --trace (default 1)"),
+				("top-k", None, "top_k", 0, int, "Also export the k closest modes of every time step and their scores (saved in ./results/top_k)"),
+				("gated", None, "gate", None, int, "Only test the fault modes after Nominal is rejected, until Nominal is ID'd for this many steps in a row"),
+				("rate", None, "rates", {}, parse_rate, "Evaluate a test type every nth measurement only, optionally averaging over them (e.g. BATTERY_CAP_ID=10:avg). Repeatable."),
+				("engine", None, "engines", {}, parse_engine, "Decide a test type with the window (default) or the recursive posterior engine, optionally with its switch probability and posterior odds (e.g. RW_FRICTION_ID=posterior:0.001:99). Repeatable."),
+				("fused", None, "fused", False, None, "Run every subsystem in a single time loop (no checkpoints, cache, traces, top-k, gates or rates)"),
+				("shards", None, "shards", 1, int, "Split the modes of every test across this many worker processes"),
+				("chunks", None, "chunks", 1, int, "Split the time axis of every test into this many chunks that are evaluated by parallel worker processes"),
+				("sim-cache", None, "sim_cache_dir", None, str, "A directory to cache the parsed simulation database and truth telemetry in (one subdirectory per database). Only new or changed files are parsed again."),
+				("ingest-workers", None, "ingest_workers", 1, int, "Parse this many telemetry.csv files of the simulation database concurrently (default 1)"),
+				("metrics", None, "metrics_path", None, str, "A file to write per-sample latency histograms to in the Prometheus text format (e.g. <path/to>/mbfid.prom)"),
+				("metrics-interval", None, "metrics_interval", 10.0, float, "Rewrite the --metrics file every this many seconds (default 10)"),
+				("results-format", None, "results_format", "csv", str, "Write the results as csv (default) or binary (./results/<example ID>.bin/). Both are streamed to disk while the tests run."),
+				("covariance", None, "covariance", (None, None), parse_covariance, "Use the full innovation covariance: model (C Px C^T + R) or nominal[:rows] (model plus the covariance of the truth residuals against Nominal)"),
+				("candidate-index", None, "candidate_block", None, int, "Only compute the distances of the modes a KD-tree over blocks of this many time steps cannot rule out (e.g. 64)"),
+				("coarse", None, "coarse_stride", 1, int, "Identify on blocks of this many time steps first and only re-run at full resolution where Nominal is rejected"),
+				("replay", None, "replay", None, float, "Replay the truth telemetry sample by sample at this speed (1 is real time, 0 is as fast as possible and takes no --replay-jitter or --replay-queue) and report the throughput"),
+				("replay-loops", None, "replay_loops", 1, int, "Replay the truth telemetry this many times (default 1)"),
+				("replay-jitter", None, "replay_jitter", 0.0, float, "Delay the release of every replayed sample by up to this many seconds (default 0)"),
+				("replay-queue", None, "replay_queue", None, int, "Drop the oldest replayed samples once more than this many are waiting (default: never)"),
+				("monte-carlo", "m", "monte_carlo", 0, int, "Evaluate this many noisy replicas of the truth data instead (stats are saved in ./stats/monte_carlo)"),
+				("noise", "n", "noise_std", 0.0, float, "The standard deviation of the noise injected into every truth column by --monte-carlo (default 0.0)")]
+
+def cmd_parser(argv: List[str]) -> Tuple[str, str, Dict[str, object]]:
 	""" Parses the command line arguments.
 	Keyword arguments:
 	argv -- the list of all command line arguments
 	
 	Parses the command line arguments and returns a 
-	tuple of strings (path_2_sim, path_2_telem) that point 
+	tuple (path_2_sim, path_2_telem, options) where the strings point 
 	to the digital twin simulations and the telemetry.csv 
 	file, respectively, for a particular BSK truth simulation. 
+	options is a dictionary holding the optional arguments (see OPTIONAL_ARGS).
 	"""
 	sim_dir_path = ''
 	truth_csv_path = ''
-	opts, args = getopt.getopt(argv,"hs:t:",["help","simulations=","truth="])
+	options = {key: copy.deepcopy(default) for _, _, key, default, _, _ in OPTIONAL_ARGS}
+	opt_args = {}
+	for long_opt, short_opt, key, default, parser, _ in OPTIONAL_ARGS:
+		opt_args["--" + long_opt] = (key, parser)
+		if short_opt is not None:
+			opt_args["-" + short_opt] = (key, parser)
+	short_opts = "hs:t:" + "".join(short_opt + ("" if parser is None else ":") 
+									for _, short_opt, _, _, parser, _ in OPTIONAL_ARGS if short_opt is not None)
+	long_opts = ["help","simulations=","truth="] + [long_opt + ("" if parser is None else "=") 
+													for long_opt, _, _, _, parser, _ in OPTIONAL_ARGS]
+	opts, args = getopt.getopt(argv, short_opts, long_opts)
 	for opt, arg in opts:
 		if opt in ("-h", "--help"):
 			print("MBFID Help:")
 			print("-----")
 			print("Required Args:")
-			print("--simulations,-s		The path to a simulation database (e.g. <path/to/simulations>)")
-			print("--truth,-t			The path to the telemetry data. (e.g.  <path/to/truth>/telemetry.csv)")
+			print("%-24s%s" %("--simulations,-s", "The path to a simulation database (e.g. <path/to/simulations>)"))
+			print("%-24s%s" %("--truth,-t", "The path to the telemetry data. (e.g.  <path/to/truth>/telemetry.csv)"))
 			print("-----")
 			print("Optional Args:")
-			print("--help,-h			Explains how to run MBFID.")
+			print("%-24s%s" %("--help,-h", "Explains how to run MBFID."))
+			for long_opt, short_opt, _, _, _, help_text in OPTIONAL_ARGS:
+				name = "--" + long_opt + ("" if short_opt is None else ",-" + short_opt)
+				print("%-24s%s" %(name, help_text))
 			print("-----")
 			print("Note: if --help or -h exists in the command line arguments, the MBFID tool will not run.")
 			sys.exit()
@@ -57,11 +122,20 @@ def cmd_parser(argv: List[str]) -> Tuple[str, str]:
 				sim_dir_path += "/"
 		elif opt in ("-t", "--truth"):
 			truth_csv_path = arg
+		elif opt in opt_args:
+			key, parser = opt_args[opt]
+			if parser is None:
+				options[key] = True
+			elif isinstance(options[key], dict):
+				options[key].update([parser(arg)])
+			else:
+				options[key] = parser(arg)
 	
 	# make sure that the paths exists and point to meaningful data
 	assert os.path.exists(sim_dir_path), "The path to the simulation database does not exist."
 	assert os.path.isfile(truth_csv_path), "The path to the telemetry.csv file does not exist."
-	return sim_dir_path, truth_csv_path
+	assert not options["resume"] or options["checkpoint_dir"] is not None, "--resume requires --checkpoint."
+	return sim_dir_path, truth_csv_path, options
 
 if __name__ == '__main__':
 	# parse the command line
@@ -69,7 +143,23 @@ if __name__ == '__main__':
 	arguments, runs the MBFID framework, and exports the results.
 	run main.py --help for more information on how to run the code
 	''' 
-	sim_dir_path, telem_csv_path = cmd_parser(sys.argv[1:])
-	tester = TestManager(sim_dir_path, telem_csv_path)
-	tester.run_offline_fault_ID()
-	tester.export_results()
+	sim_dir_path, telem_csv_path, options = cmd_parser(sys.argv[1:])
+	tester = TestManager(sim_dir_path, telem_csv_path, checkpoint_dir=options["checkpoint_dir"], 
+						cache_dir=options["cache_dir"], trace_dir=options["trace_dir"], 
+						trace_decimation=options["trace_decimation"], top_k=options["top_k"], 
+						gate_quiet_period=options["gate"], rates=options["rates"], 
+						num_shards=options["shards"], sim_cache_dir=options["sim_cache_dir"], 
+						metrics_path=options["metrics_path"], metrics_interval=options["metrics_interval"], 
+						ingest_workers=options["ingest_workers"], covariance=options["covariance"][0], 
+						covariance_rows=options["covariance"][1], results_format=options["results_format"], 
+						candidate_block=options["candidate_block"], coarse_stride=options["coarse_stride"], 
+						engines=options["engines"], num_chunks=options["chunks"])
+	if options["replay"] is not None:
+		tester.run_replay(speed=options["replay"], loops=options["replay_loops"], jitter=options["replay_jitter"], 
+						max_queue=options["replay_queue"])
+	elif options["monte_carlo"] > 0:
+		mc_mode_ids, mc_stats = tester.run_monte_carlo(num_replicas=options["monte_carlo"], noise_std=options["noise_std"])
+		tester.export_monte_carlo(mc_stats)
+	else:
+		tester.run_offline_fault_ID(resume=options["resume"], fused=options["fused"])
+		tester.export_results()
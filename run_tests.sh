@@ -5,4 +5,7 @@ for file in "examples/Telemetry"/*; do
     simpath="examples/Simulations/"$example
     testpath="examples/Telemetry/"$example"/telemetry.csv"
     clear; python3 main.py -s $simpath -t $testpath
-done
\ No newline at end of file
+done
+
+# check that every alternative Fault ID path reproduces the serial results on noisy truth
+python3 equivalence_checks.py
@@ -0,0 +1,126 @@
+"""
+# ISC License (ISC)
+
+# Copyright 2023 ARIA Systems Research, University of Colorado at Boulder
+
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+# Author: Justin Kottinger
+"""
+
+import os
+import numpy as np
+from typing import Dict, List
+
+
+class DistanceRecorder:
+    """ Records the Mahalanobis distance of every mode and whether its 
+    chi-squared sphere contains the origin at every (decimated) time step 
+    of a FaultIdentifier (see FaultIdentifier.set_recorder()). A trace is 
+    a directory holding:
+        modes.txt -- the mode of every column (one per line)
+        times.npy -- the (T',) recorded time stamps (in ns)
+        distances.npy -- the (T', M) distances
+        mask.npy -- the (T', M) containment mask, or if rle is True
+        mask_starts.npy and mask_values.npy -- the rows at which the mask 
+        changes and the (R, M) mask from each of those rows onwards
+    where T' = ceil(num_times / decimation). The .npy files are written 
+    through memory maps, so they can be opened with numpy.load(mmap_mode="r") 
+    (see load_distance_trace()) while or after the identifier runs.
+    """
+    def __init__(self, trace_dir: str, modes: List[str], num_times: int, decimation: int = 1, 
+                rle: bool = True, dtype=np.float64, name: str = "Distance Recorder"):
+        assert decimation >= 1, "The decimation factor must be at least 1."
+        self.trace_dir = trace_dir
+        self.decimation = decimation
+        self.rle = rle
+        self.__name = name
+        self.__num_rows = -(-num_times // decimation)
+        self.__mask_starts = []
+        self.__mask_values = []
+        if not os.path.exists(self.trace_dir):
+            os.makedirs(self.trace_dir)
+        with open(os.path.join(self.trace_dir, "modes.txt"), "w") as f:
+            f.write("\n".join(modes) + "\n")
+        self.__times = np.lib.format.open_memmap(os.path.join(self.trace_dir, "times.npy"), mode="w+", 
+                                                dtype=np.float64, shape=(self.__num_rows,))
+        self.__distances = np.lib.format.open_memmap(os.path.join(self.trace_dir, "distances.npy"), mode="w+", 
+                                                    dtype=dtype, shape=(self.__num_rows, len(modes)))
+        self.__times[:] = np.nan
+        self.__distances[:] = np.nan
+        self.__mask = None
+        if not self.rle:
+            self.__mask = np.lib.format.open_memmap(os.path.join(self.trace_dir, "mask.npy"), mode="w+", 
+                                                    dtype=bool, shape=(self.__num_rows, len(modes)))
+
+    def record(self, step: int, time: float, distances: np.ndarray, contains_zero: np.ndarray) -> None:
+        """ Records the distances and containment mask of the step-th measurement 
+        if step is a multiple of self.decimation. 
+
+        Keyword arguments:
+        step: int -- the index of the measurement
+        time: float -- the time stamp of the measurement (in ns)
+        distances: np.ndarray -- the (M,) distances of every mode
+        contains_zero: np.ndarray -- the (M,) containment mask of every mode
+        """
+        if step % self.decimation != 0:
+            return None
+        row = step // self.decimation
+        self.__times[row] = time
+        self.__distances[row] = distances
+        if self.__mask is not None:
+            self.__mask[row] = contains_zero
+        elif len(self.__mask_values) == 0 or not np.array_equal(self.__mask_values[-1], contains_zero):
+            self.__mask_starts.append(row)
+            self.__mask_values.append(contains_zero.copy())
+        return None
+
+    def close(self) -> None:
+        """ Flushes the memory maps and writes the run-length encoded mask. """
+        self.__times.flush()
+        self.__distances.flush()
+        if self.__mask is not None:
+            self.__mask.flush()
+        else:
+            num_modes = self.__distances.shape[1]
+            np.save(os.path.join(self.trace_dir, "mask_starts.npy"), np.array(self.__mask_starts, dtype=np.int64))
+            np.save(os.path.join(self.trace_dir, "mask_values.npy"), 
+                    np.array(self.__mask_values, dtype=bool).reshape(-1, num_modes))
+        print("%s: Saved the distance trace to %s." %(self.__name, self.trace_dir))
+        return None
+
+
+def decode_mask(mask_starts: np.ndarray, mask_values: np.ndarray, num_rows: int) -> np.ndarray:
+    """ Expands a run-length encoded containment mask into a (num_rows, M) array. """
+    run_lengths = np.diff(np.append(mask_starts, num_rows))
+    return np.repeat(mask_values, run_lengths, axis=0)
+
+def load_distance_trace(trace_dir: str, mmap_mode: str = "r") -> Dict[str, object]:
+    """ Loads a trace written by DistanceRecorder. 
+
+    Keyword arguments:
+    trace_dir: str -- the trace directory
+    mmap_mode: str -- the numpy.load() memory map mode (None loads everything into memory)
+
+    Output: Dict[str, object] -- the "modes", "times", "distances" and (decoded) "mask" of the trace
+    """
+    with open(os.path.join(trace_dir, "modes.txt")) as f:
+        modes = f.read().splitlines()
+    times = np.load(os.path.join(trace_dir, "times.npy"), mmap_mode=mmap_mode)
+    distances = np.load(os.path.join(trace_dir, "distances.npy"), mmap_mode=mmap_mode)
+    if os.path.isfile(os.path.join(trace_dir, "mask.npy")):
+        mask = np.load(os.path.join(trace_dir, "mask.npy"), mmap_mode=mmap_mode)
+    else:
+        mask = decode_mask(np.load(os.path.join(trace_dir, "mask_starts.npy")), 
+                           np.load(os.path.join(trace_dir, "mask_values.npy")), len(times))
+    return {"modes": modes, "times": times, "distances": distances, "mask": mask}
@@ -18,14 +18,71 @@
 # Author: Justin Kottinger
 """
 
+import os
 import time
+import pickle
+import hashlib
 import pandas as pd
 import numpy as np
-import scipy
-import collections
-from typing import List, Dict
+from time import perf_counter_ns
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Dict, Tuple
 
 
+# Every FaultIdentifier records its mode ID's as small integer codes 
+# into FaultIdentifier.mode_labels. These two codes are reserved.
+UNKNOWN_MODE_CODE = 0
+NOMINAL_MODE_CODE = 1
+
+# Chi-Squared values (scipy.stats.chi2.ppf(confidence, dim)) of the common confidences 
+# for dim = 1, ..., 8. Looking them up spares importing scipy.stats, which dominates start-up.
+CHI2_THRESHOLDS = {0.9: (2.705543454095404, 4.605170185988092, 6.251388631170325, 7.779440339734858, 
+                         9.236356899781123, 10.644640675668422, 12.017036623780532, 13.36156613651173), 
+                   0.95: (3.841458820694124, 5.991464547107979, 7.814727903251179, 9.487729036781154, 
+                          11.070497693516351, 12.591587243743977, 14.067140449340169, 15.50731305586545), 
+                   0.99: (6.6348966010212145, 9.21034037197618, 11.344866730144373, 13.276704135987622, 
+                          15.08627246938899, 16.811893829770927, 18.475306906582357, 20.090235029663233)}
+
+def chi2_threshold(confidence: float, dim: int) -> float:
+    """ Returns the Chi-Squared value of a confidence interval with dim DoF. 
+    scipy is only imported if the value is not in CHI2_THRESHOLDS.
+
+    Keyword arguments:
+    confidence: float -- the confidence of the interval (e.g. 0.95)
+    dim: int -- the DoF
+
+    Output: float -- the Chi-Squared value
+    """
+    thresholds = CHI2_THRESHOLDS.get(confidence, ())
+    if 0 < dim <= len(thresholds):
+        return thresholds[dim - 1]
+    import scipy.stats
+    return float(scipy.stats.chi2.ppf(confidence, dim))
+
+def whiten(innov: np.ndarray, chol: np.ndarray) -> np.ndarray:
+    """ Solves chol @ x = innov for every innovation by forward substitution, 
+    so that |x| is the Mahalanobis distance of innov under chol @ chol.T. 
+    A single factor solves every innovation at once with one (BLAS) triangular 
+    solve and a stack of per-mode factors is solved by a substitution that 
+    is vectorized over the modes. No inverse is ever formed.
+
+    Keyword arguments:
+    innov: np.ndarray -- a (..., dim) array of innovations
+    chol: np.ndarray -- a (dim, dim) lower Cholesky factor or a (..., dim, dim) stack 
+    of them that broadcasts against the innovations
+
+    Output: np.ndarray -- the (..., dim) whitened innovations
+    """
+    if chol.ndim == 2:
+        # scipy is only imported once a full covariance is in use
+        from scipy.linalg.blas import dtrsm
+        flat_innov = np.ascontiguousarray(innov, dtype=float).reshape(-1, chol.shape[0])
+        return dtrsm(1.0, chol, flat_innov, side=1, lower=1, trans_a=1).reshape(np.shape(innov))
+    whitened = np.empty(np.broadcast_shapes(np.shape(innov), chol.shape[:-1]))
+    for idx in range(chol.shape[-1]):
+        partial_sum = np.sum(chol[..., idx, :idx] * whitened[..., :idx], axis=-1)
+        whitened[..., idx] = (innov[..., idx] - partial_sum) / chol[..., idx, idx]
+    return whitened
 
 class FaultIdentifier:
     """ This is an Abstract Class that runs the main 
@@ -35,23 +92,272 @@ class FaultIdentifier:
     To implement the class, one must implement self.get_measurement()
     """
     def __init__(self, name: str, dim: int):
-        self.mode_ids = []
+        self.mode_labels = ["Unknown Mode", "Nominal"]
         self._name = name
         self._dim = dim
-        self._sim_data = {}
-        self._innov_hist_dict = {}
+        self._columns = []
+        self._modes = []
+        self._mode_index = {}
+        self._mode_codes = np.array([UNKNOWN_MODE_CODE], dtype=np.uint8)
+        self._time_index = {}
+        self._sim_bank = np.empty((0, self._dim))
+        self._nominal_sim = self._sim_bank
+        self._divergence = np.empty(0, dtype=np.int64)
+        self._suffix_offset = np.empty(0, dtype=np.int64)
+        self._nominal = -1
+        self._innov_window = np.empty((0, 0, self._dim))
+        self._window_len = 0
+        self._cursor = 0
+        # Nominal followed by the modes in the order they diverge (see self.__update_diverged_innovations())
+        self.__divergence_order = np.empty(0, dtype=np.int64)
+        self.__num_diverged = 0
+        self.__mode_id_buffer = np.empty(0, dtype=np.uint8)
+        self.__prev_mode = -1
+        self.recorder = None
+        self.monitor = None
+        self.writer = None
+        self.top_k = 0
+        self.gate_quiet_period = None
+        self.candidate_block = None
+        self.decision_engine = "window"
+        # (single-channel modes, their channels, every other mode) (see self._set_channel_families())
+        self.__channel_families = None
+        self.__families_enabled = False
+        self.__top_k_buffers = (np.empty((0, 0), dtype=np.uint8), np.empty((0, 0)), np.empty((0, 0)))
         self.__Q = 0.0 * np.identity(self._dim)
         self.__R = 0.1 * np.identity(self._dim)
         self.__Px = self.__Q
         self.__C = np.identity(self._dim)
-        self.__innov_uncertainty_dict = {}
-        self.__sphere_contains_zero_dict = {}
+        self.__innov_uncertainty = None
+        # the lower Cholesky factor(s) of the full innovation covariance (None uses its diagonal)
+        self.__chol = None
+        self.__mode_dists = np.empty(0)
+        self.__sphere_contains_zero = np.empty(0, dtype=bool)
         self.__N = 6
         # Chi-Squared constant for 95% confidence interval depends on system DoF
-        self.__chi = scipy.stats.chi2.ppf(0.95, self._dim) 
+        self.__chi = chi2_threshold(0.95, self._dim)
         assert self.__chi > 0, "Chi-Squared value must be larger than 0."
 
-    def run_offline_fault_ID(self, truth_telem: pd.DataFrame) -> List[str]:
+    @property
+    def mode_ids(self) -> np.ndarray:
+        """ The mode ID's identified so far as codes into self.mode_labels. 
+        Element i is the mode ID'd given the ith measurement. 
+        """
+        return self.__mode_id_buffer[:self._cursor]
+
+    def decode_mode_ids(self, mode_ids: np.ndarray = None) -> pd.Categorical:
+        """ Decodes mode ID codes (self.mode_ids by default) into a categorical of mode labels. """
+        mode_ids = self.mode_ids if mode_ids is None else mode_ids
+        return pd.Categorical.from_codes(mode_ids, categories=self.mode_labels)
+
+    def set_recorder(self, recorder) -> None:
+        """ Records the distance and containment of every mode at every measurement 
+        with recorder (see src.DistanceRecorder.DistanceRecorder). None disables recording. 
+        """
+        self.recorder = recorder
+        return None
+
+    def set_writer(self, writer) -> None:
+        """ Streams the code of every identified mode to writer as soon as it is identified 
+        (see src.ResultsWriter.ResultsColumn). None disables streaming. 
+        """
+        self.writer = writer
+        return None
+
+    def set_monitor(self, monitor) -> None:
+        """ Measures the latency of every phase of every measurement with monitor 
+        (see src.LatencyMonitor.LatencyMonitor). None disables the measurements. 
+        """
+        if monitor is not None:
+            monitor.register(self._name)
+        self.monitor = monitor
+        return None
+
+    def set_innovation_covariance(self, covariance: np.ndarray = None) -> None:
+        """ Switches to the full-covariance Mahalanobis test. The covariance is 
+        Cholesky-factored once and every distance is computed by triangular solves 
+        (see whiten()), so correlations between the measurement channels are 
+        taken into account. None restores the default test, which only uses the 
+        diagonal of the innovation covariance. Only the incremental and Monte-Carlo 
+        paths support a full covariance.
+
+        Keyword arguments:
+        covariance: np.ndarray -- a (self._dim, self._dim) covariance shared by every 
+        mode or a (num_modes, self._dim, self._dim) covariance per mode 
+        (e.g. from self.estimate_innovation_covariance())
+        """
+        if covariance is None:
+            self.__chol = None
+            return None
+        covariance = np.asarray(covariance, dtype=float)
+        assert covariance.shape in ((self._dim, self._dim), (len(self._modes), self._dim, self._dim)), \
+            "%s: The covariance must be a (%d, %d) or (%d, %d, %d) array." \
+            %(self._name, self._dim, self._dim, len(self._modes), self._dim, self._dim)
+        try:
+            self.__chol = np.linalg.cholesky(covariance)
+        except np.linalg.LinAlgError:
+            raise ValueError("%s: The covariance must be positive definite." %self._name)
+        return None
+
+    def estimate_innovation_covariance(self, truth_telem: pd.DataFrame, num_rows: int = None) -> np.ndarray:
+        """ Estimates the full innovation covariance from the residuals of the truth 
+        against "Nominal": the modelled covariance (C Px C^T + R) plus the sample 
+        covariance of the residuals, which captures the correlated model mismatch. 
+
+        Keyword arguments:
+        truth_telem: pandas.DataFrame -- the truth telemetry data
+        num_rows: int -- only the first num_rows rows are used (e.g. a known nominal 
+        stretch of the telemetry). None uses every row and 0 returns the modelled covariance.
+
+        Output: np.ndarray -- the (self._dim, self._dim) covariance
+        """
+        assert "Nominal" in self._mode_index, "%s: Estimating the covariance requires a Nominal mode." %self._name
+        truth_meas = self._get_measurements(truth_telem)[:num_rows]
+        rows = np.array([self._time_index.get(t, -1) for t in truth_meas[:, 0]], dtype=int)
+        residuals = truth_meas[rows >= 0, 1:] - self._nominal_sim[rows[rows >= 0]]
+        residuals = residuals[np.all(np.isfinite(residuals), axis=1)]
+        self.__update_innovation_uncertainty()
+        covariance = np.array(self.__innov_uncertainty, dtype=float)
+        if len(residuals) > 1:
+            covariance += np.cov(residuals, rowvar=False).reshape(self._dim, self._dim)
+        return covariance
+
+    def set_detection_gate(self, quiet_period: int = None) -> None:
+        """ Enables detection-gated identification: the truth is only compared 
+        against "Nominal" until "Nominal" leaves its chi-squared sphere. The fault 
+        banks are then activated with innovation windows rebuilt from a ring buffer 
+        of the most recent truth measurements and stay active until "Nominal" is 
+        identified for quiet_period consecutive measurements. 
+
+        Keyword arguments:
+        quiet_period: int -- the number of consecutive "Nominal" ID's after which the 
+        fault banks are deactivated (None disables the gate)
+
+        Note: while the fault banks are inactive, a fault that is closer than "Nominal" 
+        but indistinguishable from it is not reported, so the results can differ from 
+        the ungated ones.
+        """
+        assert quiet_period is None or quiet_period > 0, "The quiet period must be positive."
+        assert quiet_period is None or "Nominal" in self._mode_index, \
+            "%s: Detection gating requires a Nominal mode." %self._name
+        self.gate_quiet_period = quiet_period
+        self.__gate_active = False
+        self.__quiet_steps = 0
+        self.__active_steps = 0
+        self.__recent_len = 0
+        self.__recent_truth = np.zeros((self.__N, self._dim))
+        self.__recent_rows = np.zeros(self.__N, dtype=np.int64)
+        self.__gated_dists = np.full(len(self._modes), np.nan)
+        self.__gated_contains = np.zeros(len(self._modes), dtype=bool)
+        return None
+
+    def set_candidate_index(self, block_size: int = None) -> None:
+        """ Enables the candidate index: the time rows are split into blocks of 
+        block_size rows and a KD-tree is built (once per block) over the whitened 
+        expected measurements of the modes. Every mode whose expected measurements 
+        over the block lie within a ball of radius r_m <= threshold is indexed by the 
+        center of its ball. Its window mean lies inside the same ball, so a mode whose 
+        center is farther than threshold + max(r_m) from the whitened mean truth 
+        cannot contain the origin. A radius query thus returns every mode that could 
+        pass and the exact distances are only computed for those (and for the modes 
+        with wider balls or missing data). Every other mode is reported with an 
+        infinite distance outside of its sphere, so the mode ID's are identical to 
+        the exhaustive test. 
+
+        Keyword arguments:
+        block_size: int -- the number of time rows per block (None disables the index)
+
+        Note: the index does not support detection gates, traces, top-K candidates, 
+        checkpoints or per-mode covariances.
+        """
+        assert block_size is None or block_size > 0, "The block size must be positive."
+        assert block_size is None or (self.gate_quiet_period is None and self.recorder is None and self.top_k == 0), \
+            "%s: The candidate index does not support detection gates, traces or top-K candidates." %self._name
+        assert block_size is None or self.__chol is None or self.__chol.ndim == 2, \
+            "%s: The candidate index does not support per-mode covariances." %self._name
+        self.candidate_block = block_size
+        # (block, first row, last row, KD-tree, indexed modes, unindexed modes, query radius)
+        self.__candidate_index = (-1, 0, -1, None, None, None, 0.0)
+        self.__candidate_count = 0
+        self.__recent_len = 0
+        self.__recent_truth = np.zeros((self.__N, self._dim))
+        self.__recent_rows = np.zeros(self.__N, dtype=np.int64)
+        return None
+
+    def set_decision_engine(self, engine: str = "window", switch_prob: float = 1e-3, posterior_odds: float = 99.0) -> None:
+        """ Selects how the modes are decided. "window" (the default) tests the mean 
+        innovation of the self.__N most recent measurements against the chi-squared 
+        sphere of every mode. "posterior" runs a recursive Bayesian (HMM forward) 
+        filter instead: the log-posterior of every mode is updated with the Gaussian 
+        log-likelihood of the most recent innovation in O(num_modes * self._dim) per 
+        measurement. Between two measurements, the posterior switches to a uniformly 
+        random mode with probability switch_prob. "Unknown Mode" is an extra hypothesis 
+        whose likelihood is that of an innovation on the sphere of the chi-squared 
+        test. The identified mode only changes once the posterior odds of the most 
+        probable mode against the current one reach posterior_odds, so modes that 
+        cannot be told apart keep the current ID. 
+
+        Keyword arguments:
+        engine: str -- "window" or "posterior"
+        switch_prob: float -- the probability of a mode transition between two measurements
+        posterior_odds: float -- the posterior odds required to change the identified mode
+
+        Note: the posterior engine does not support detection gates, traces, top-K 
+        candidates, candidate indices, checkpoints or per-mode covariances.
+        """
+        assert engine in ("window", "posterior"), "Unknown decision engine %s." %engine
+        assert 0 < switch_prob < 1 and posterior_odds >= 1, "Invalid posterior engine parameters."
+        assert engine == "window" or (self.gate_quiet_period is None and self.recorder is None and self.top_k == 0 
+                                      and self.candidate_block is None), \
+            "%s: The posterior engine does not support detection gates, traces, top-K candidates or candidate indices." %self._name
+        assert engine == "window" or self.__chol is None or self.__chol.ndim == 2, \
+            "%s: The posterior engine does not support per-mode covariances." %self._name
+        self.decision_engine = engine
+        self.__engine_params = (switch_prob, posterior_odds)
+        # the last element is "Unknown Mode"
+        num_hypotheses = len(self._modes) + 1
+        self.__log_posterior = np.full(num_hypotheses, -np.log(num_hypotheses))
+        self.__log_stay = np.log1p(-switch_prob)
+        self.__log_switch = np.log(switch_prob / num_hypotheses)
+        self.__log_odds = np.log(posterior_odds)
+        return None
+
+    def set_top_k(self, top_k: int) -> None:
+        """ Ranks the top_k closest modes at every measurement from now on 
+        (see self.get_top_k()). 0 disables the ranking. 
+        """
+        assert top_k >= 0, "top_k must not be negative."
+        self.top_k = min(top_k, len(self._modes))
+        self.__top_k_buffers = (np.full((len(self.__mode_id_buffer), self.top_k), UNKNOWN_MODE_CODE, dtype=self._mode_codes.dtype),
+                                np.full((len(self.__mode_id_buffer), self.top_k), np.nan),
+                                np.full((len(self.__mode_id_buffer), self.top_k), np.nan))
+        return None
+
+    def get_top_k(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Returns the ranked candidates of every measurement so far (see self.set_top_k()).
+
+        Output: Tuple[np.ndarray, np.ndarray, np.ndarray] -- the (num_measurements, self.top_k) 
+        mode codes (see self.mode_labels), distances and scores of the closest modes, closest first. 
+        The score of a mode is its Gaussian likelihood normalized over all modes.
+        """
+        return tuple(buffer[:self._cursor] for buffer in self.__top_k_buffers)
+
+    def reserve(self, num_measurements: int) -> None:
+        """ Preallocates room for num_measurements mode ID's in total. """
+        if num_measurements > len(self.__mode_id_buffer):
+            mode_id_buffer = np.empty(num_measurements, dtype=self.__mode_id_buffer.dtype)
+            mode_id_buffer[:self._cursor] = self.mode_ids
+            self.__mode_id_buffer = mode_id_buffer
+            top_k_buffers = []
+            for buffer in self.__top_k_buffers:
+                top_k_buffer = np.empty((num_measurements, buffer.shape[1]), dtype=buffer.dtype)
+                top_k_buffer[:self._cursor] = buffer[:self._cursor]
+                top_k_buffers.append(top_k_buffer)
+            self.__top_k_buffers = tuple(top_k_buffers)
+        return None
+
+    def run_offline_fault_ID(self, truth_telem: pd.DataFrame, checkpoint_path: str = None,
+                            checkpoint_interval: int = 500) -> np.ndarray:
         """ This is the main fault ID function for "offline" operation.
         This function iterates through the truth telemetry data and 
         treats every row as a measurement. A single mode is identified for 
@@ -59,27 +365,536 @@ class FaultIdentifier:
 
         Keyword arguments:
         truth_telem: pandas.DataFrame -- the truth telemetry data 
+        checkpoint_path: str -- if given, the identifier state is saved here every 
+        checkpoint_interval measurements and once more at the end of the run
+        checkpoint_interval: int -- the number of measurements between checkpoints
 
-        Output: A list of strings representing the identified fault for every measurement
+        Note: rows before self._cursor are skipped, so a run resumed 
+        with self.load_checkpoint() picks up where the checkpoint left off.
+
+        Output: np.ndarray -- the codes (see self.mode_labels) of the identified fault for every measurement
         """
         print("%s: Running Fault ID algorithm." %self._name)
         start_time = time.time()
         truth_meas = self._get_measurements(truth_telem)
-        for meas in truth_meas:
-            curr_time = meas[0]
-            curr_exp_meas_dict = self.__get_expected_measurements(curr_time)
-            curr_truth_meas = np.resize(meas[1:], (self._dim, 1))
-            self.__update_innovations(curr_exp_meas_dict, curr_truth_meas)
-            self.__update_innovation_uncertainty()
-            self.__update_chi_squared_spheres()
-            self.__determine_mode()
+        self.reserve(truth_meas.shape[0])
+        if self._cursor > 0:
+            print("%s: Resuming from measurement %d." %(self._name, self._cursor))
+        start_cursor = self._cursor
+        assert (self.candidate_block is None and self.decision_engine == "window") or checkpoint_path is None, \
+            "%s: Candidate indices and the posterior engine do not support checkpoints." %self._name
+        for meas in truth_meas[self._cursor:]:
+            self.process_measurement(meas[0], meas[1:])
+            if checkpoint_path is not None and self._cursor % checkpoint_interval == 0:
+                self.save_checkpoint(checkpoint_path)
             # Uncomment for debugging, as needed
-            # print(curr_time, self.mode_ids[-1])
-            # print(self.__sphere_contains_zero_dict)
+            # print(meas[0], self.mode_labels[self.mode_ids[-1]])
+            # print(self.__sphere_contains_zero)
             # input("enter to continue")
+        if checkpoint_path is not None:
+            self.save_checkpoint(checkpoint_path)
+        if self.gate_quiet_period is not None:
+            print("%s: The fault banks were active for %d of %d measurements." 
+                %(self._name, self.__active_steps, self._cursor - start_cursor))
+        if self.candidate_block is not None and self._cursor > start_cursor:
+            print("%s: The candidate index tested %0.1f of %d modes per measurement." 
+                %(self._name, self.__candidate_count / (self._cursor - start_cursor), len(self._modes)))
         print("%s: Fault ID completed in %0.3f seconds." %(self._name, (time.time() - start_time)))
         return self.mode_ids
 
+    def process_measurement(self, time: float, meas: np.ndarray) -> int:
+        """ Runs the fault ID algorithm on a single measurement. This is 
+        the incremental ("streaming") counterpart of self.run_offline_fault_ID().
+
+        Keyword arguments:
+        time: float -- the time stamp (in ns)
+        meas: np.ndarray -- the (self._dim,) truth measurement
+
+        Output: int -- the code (see self.mode_labels) of the identified mode for this measurement
+        """
+        stamps = None if self.monitor is None else [perf_counter_ns()]
+        curr_truth_meas = np.resize(meas, (self._dim,))
+        if self.gate_quiet_period is None:
+            time_row = self._time_index[time]
+            if stamps is not None:
+                stamps.append(perf_counter_ns())
+            if self.decision_engine == "posterior":
+                # the posterior update is accounted to the distance phase
+                if stamps is not None:
+                    stamps.append(perf_counter_ns())
+                self.__update_posterior(time_row, curr_truth_meas)
+            elif self.__uses_channel_families():
+                self.__update_family_innovations(time_row, curr_truth_meas)
+                self.__update_innovation_uncertainty()
+                if stamps is not None:
+                    stamps.append(perf_counter_ns())
+                self.__update_family_spheres()
+            elif self.__uses_divergence_order():
+                self.__update_diverged_innovations(time_row, curr_truth_meas)
+                self.__update_innovation_uncertainty()
+                if stamps is not None:
+                    stamps.append(perf_counter_ns())
+                self.__update_diverged_spheres()
+            elif self.candidate_block is None:
+                self.__update_innovations(time_row, curr_truth_meas)
+                self.__update_innovation_uncertainty()
+                if stamps is not None:
+                    stamps.append(perf_counter_ns())
+                self.__update_chi_squared_spheres()
+            else:
+                # the indexed update is accounted to the distance phase
+                if stamps is not None:
+                    stamps.append(perf_counter_ns())
+                self.__update_indexed_spheres(time_row, curr_truth_meas)
+        else:
+            # the gated update is accounted to the distance phase
+            if stamps is not None:
+                stamps += [perf_counter_ns(), perf_counter_ns()]
+            self.__update_gated_spheres(time, curr_truth_meas)
+        if stamps is not None:
+            stamps.append(perf_counter_ns())
+        if self.recorder is not None:
+            self.recorder.record(self._cursor, time, self.__mode_dists, self.__sphere_contains_zero)
+        if self.decision_engine == "posterior":
+            self.__determine_posterior_mode()
+        else:
+            self.__determine_mode()
+        if self.gate_quiet_period is not None and self.__gate_active:
+            self.__update_gate()
+        if self._cursor == len(self.__mode_id_buffer):
+            self.reserve(max(2 * self._cursor, 1024))
+        self.__mode_id_buffer[self._cursor] = self._mode_codes[self.__prev_mode]
+        if self.writer is not None:
+            self.writer.write(self.__mode_id_buffer[self._cursor])
+        if self.top_k > 0:
+            self.__rank_modes()
+        self._cursor += 1
+        if stamps is not None:
+            stamps.append(perf_counter_ns())
+            self.monitor.record(self._name, stamps)
+        return self.__mode_id_buffer[self._cursor - 1]
+
+    def run_monte_carlo(self, truth_telem: pd.DataFrame, replicas: np.ndarray = None, 
+                        num_replicas: int = 100, noise_std=0.0, seed: int = None) -> np.ndarray:
+        """ Runs the fault ID algorithm on K replicas of the truth telemetry 
+        data in one batched computation. The hypothesis bank is shared by 
+        every replica, so the set-up cost is only paid once. Replicas either 
+        come from the caller or are generated by adding zero-mean Gaussian 
+        noise to the truth measurements. The state of the identifier 
+        (self.mode_ids, windows, cursor) is not modified.
+
+        Keyword arguments:
+        truth_telem: pandas.DataFrame -- the truth telemetry data (provides the time stamps)
+        replicas: np.ndarray -- a (K, num_times, self._dim) array of truth measurements. 
+        If None, num_replicas noisy replicas of truth_telem are generated.
+        num_replicas: int -- the number of replicas to generate
+        noise_std: float or np.ndarray -- the standard deviation of the injected 
+        noise, either a scalar or one value per measurement column
+        seed: int -- the seed of the noise generator
+
+        Output: np.ndarray -- a (K, num_times) array where element [k, i] is the
+        code (see self.mode_labels) of the mode identified for the ith measurement of replica k
+        """
+        print("%s: Running Monte-Carlo Fault ID algorithm." %self._name)
+        start_time = time.time()
+        truth_meas = self._get_measurements(truth_telem)
+        if replicas is None:
+            rng = np.random.default_rng(seed)
+            noise = rng.standard_normal((num_replicas, truth_meas.shape[0], self._dim))
+            replicas = truth_meas[:, 1:] + noise * np.asarray(noise_std, dtype=float)
+        assert replicas.shape[1:] == (truth_meas.shape[0], self._dim), \
+            "Replicas must be a (K, %d, %d) array." %(truth_meas.shape[0], self._dim)
+        self.__update_innovation_uncertainty()
+        num_modes = len(self._modes)
+        innov_window = np.zeros((replicas.shape[0], num_modes, self.__N, self._dim))
+        mode_codes = np.empty(replicas.shape[:2], dtype=int)
+        prev_codes = np.full(replicas.shape[0], self._mode_index.get("Nominal", -1))
+        for idx, curr_time in enumerate(truth_meas[:, 0]):
+            mode_innov = replicas[:, idx, np.newaxis, :] - self.__get_expected_measurements(curr_time)
+            window_len = min(idx + 1, self.__N)
+            if idx < self.__N:
+                innov_window[:, :, idx] = mode_innov
+            else:
+                innov_window[:, :, :-1] = innov_window[:, :, 1:]
+                innov_window[:, :, -1] = mode_innov
+            mode_dists = self.__mahalanobis_distances(np.mean(innov_window[:, :, :window_len], axis=2))
+            contains_zero = mode_dists <= (np.sqrt(self.__chi / self.__N))
+            prev_codes = self._determine_modes(contains_zero, mode_dists, prev_codes)
+            mode_codes[:, idx] = prev_codes
+        print("%s: Monte-Carlo Fault ID on %d replicas completed in %0.3f seconds." 
+            %(self._name, replicas.shape[0], (time.time() - start_time)))
+        return self._mode_codes[mode_codes]
+
+    def run_sharded(self, truth_telem: pd.DataFrame, num_shards: int = os.cpu_count(), 
+                    executor: Executor = None) -> np.ndarray:
+        """ Runs the fault ID algorithm with the modes split into num_shards shards. 
+        Every shard computes the distances and sphere containment of its modes for 
+        every measurement on its own worker and the mode is determined afterwards 
+        on the merged results (see self._resolve_modes()), so the results are 
+        identical to self.run_offline_fault_ID(). The state of the identifier 
+        (self.mode_ids, windows, cursor) is not modified.
+
+        Keyword arguments:
+        truth_telem: pandas.DataFrame -- the truth telemetry data
+        num_shards: int -- the number of shards (at most one per mode)
+        executor: concurrent.futures.Executor -- runs the shards. Any executor whose 
+        submit() ships the arguments to its workers (e.g. across machines) can be 
+        used. If None, a ProcessPoolExecutor with one process per shard is used.
+
+        Output: np.ndarray -- the (num_times,) codes (see self.mode_labels) of the 
+        identified fault for every measurement
+        """
+        print("%s: Running Fault ID algorithm on %d shards." %(self._name, num_shards))
+        start_time = time.time()
+        truth_meas = self._get_measurements(truth_telem)
+        time_idx = np.array([self._time_index[t] for t in truth_meas[:, 0]], dtype=int)
+        s_inv, threshold, window_size = self._innovation_weights()
+        shards = np.array_split(np.arange(len(self._modes)), min(num_shards, len(self._modes)))
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=len(shards))
+        try:
+            futures = [executor.submit(FaultIdentifier._shard_distances, truth_meas[:, 1:], 
+                                       self._expected_measurements(time_idx, shard), s_inv, threshold, window_size) 
+                       for shard in shards]
+            shard_results = [future.result() for future in futures]
+        finally:
+            if own_executor:
+                executor.shutdown()
+        mode_dists = np.concatenate([dists for dists, contains_zero in shard_results], axis=1)
+        contains_zero = np.concatenate([contains_zero for dists, contains_zero in shard_results], axis=1)
+        mode_codes = self._resolve_modes(contains_zero, mode_dists, self._mode_index.get("Nominal", -1))
+        print("%s: Fault ID completed in %0.3f seconds." %(self._name, (time.time() - start_time)))
+        return self._mode_codes[mode_codes]
+
+    def run_coarse_to_fine(self, truth_telem: pd.DataFrame, stride: int = 10) -> np.ndarray:
+        """ Runs the fault ID algorithm in two passes. The coarse pass runs on the 
+        truth and simulated measurements averaged over blocks of stride measurements 
+        (with a window covering at least self.__N measurements and its threshold scaled 
+        to the number of measurements the window averages) and flags every block where 
+        a fault could be identified (see self._coarse_pass()). The fine pass then re-runs 
+        the full-resolution algorithm inside the flagged blocks, padded by the window 
+        size on both sides, and every other measurement keeps the coarse decision. 
+        The state of the identifier (self.mode_ids, windows, cursor) is not modified.
+
+        Keyword arguments:
+        truth_telem: pandas.DataFrame -- the truth telemetry data
+        stride: int -- the number of measurements per coarse block
+
+        Note: blocks are refined wherever the innovations of a mode, interpolated between 
+        the coarse windows, pass through its sphere. A mode whose innovations turn around 
+        within a block can still be missed, so with a stride well above the window size 
+        the results can differ from self.run_offline_fault_ID().
+
+        Output: np.ndarray -- the (num_times,) codes (see self.mode_labels) of the 
+        identified fault for every measurement
+        """
+        print("%s: Running coarse-to-fine Fault ID algorithm with a stride of %d." %(self._name, stride))
+        start_time = time.time()
+        assert stride >= 1, "The stride must be at least 1."
+        truth_meas = self._get_measurements(truth_telem)
+        time_idx = np.array([self._time_index[t] for t in truth_meas[:, 0]], dtype=int)
+        s_inv, threshold, window_size = self._innovation_weights()
+        nominal = self._mode_index.get("Nominal", -1)
+        mode_codes, is_fine = self._coarse_pass(truth_meas, time_idx, stride)
+
+        # fine pass on the flagged blocks, padded by the window size
+        edges = np.diff(np.concatenate(([0], is_fine.astype(np.int8), [0])))
+        for start, end in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+            # the window is warmed up on the measurements before the interval
+            warm_start = max(start - window_size + 1, 0)
+            dists, contains = FaultIdentifier._shard_distances(truth_meas[warm_start:end, 1:], 
+                                                               self._expected_measurements(time_idx[warm_start:end]), 
+                                                               s_inv, threshold, window_size)
+            prev_code = mode_codes[warm_start - 1] if warm_start > 0 else nominal
+            mode_codes[start:end] = self._resolve_modes(contains, dists, prev_code)[start - warm_start:]
+        print("%s: %d intervals (%0.1f%% of the measurements) were identified at full resolution." 
+            %(self._name, np.count_nonzero(edges == 1), 100 * np.count_nonzero(is_fine) / max(len(time_idx), 1)))
+        print("%s: Fault ID completed in %0.3f seconds." %(self._name, (time.time() - start_time)))
+        return self._mode_codes[mode_codes]
+
+    def _coarse_pass(self, truth_meas: np.ndarray, time_idx: np.ndarray, stride: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ Runs the coarse pass of self.run_coarse_to_fine() on the truth and simulated 
+        measurements averaged over blocks of stride measurements and flags every block 
+        where "Nominal" is rejected, the decision changes or a mode that differs from 
+        "Nominal" could be identified at full resolution. 
+
+        Keyword arguments:
+        truth_meas: np.ndarray -- the (num_times, 1 + self._dim) truth measurements (see self._get_measurements())
+        time_idx: np.ndarray -- the (num_times,) rows of the simulation bank of the truth measurements
+        stride: int -- the number of measurements per coarse block
+
+        Output: Tuple[np.ndarray, np.ndarray] -- the (num_times,) mode indices of the coarse 
+        decisions and whether each measurement lies in a flagged block padded by the window size
+        """
+        s_inv, threshold, window_size = self._innovation_weights()
+        nominal = self._mode_index.get("Nominal", -1)
+        num_times = len(time_idx)
+
+        # the simulations are averaged a chunk of blocks at a time
+        block_starts = np.arange(0, num_times, stride)
+        block_sizes = np.diff(np.append(block_starts, num_times))[:, np.newaxis]
+        coarse_truth = np.add.reduceat(truth_meas[:, 1:], block_starts, axis=0) / block_sizes
+        chunk_size = 1024 * stride
+        coarse_exp = np.concatenate([np.add.reduceat(self._expected_measurements(time_idx[start:start + chunk_size]), 
+                                                     np.arange(0, min(chunk_size, num_times - start), stride), axis=1) 
+                                     for start in range(0, num_times, chunk_size)], axis=1) / block_sizes
+        # the coarse window averages stride * coarse_window measurements, so the innovation 
+        # variance of its mean shrinks by that many samples instead of self.__N
+        coarse_window = -(-window_size // stride)
+        coarse_threshold = threshold * np.sqrt(window_size / (stride * coarse_window))
+        coarse_dists, coarse_contains = FaultIdentifier._shard_distances(coarse_truth, coarse_exp, s_inv, 
+                                                                         coarse_threshold, coarse_window)
+        coarse_codes = self._resolve_modes(coarse_contains, coarse_dists, nominal)
+        flagged = (coarse_codes != nominal) | (coarse_codes != np.append(nominal, coarse_codes[:-1]))
+        # the closest possible mode wins, so a fault can be identified while "Nominal" is still possible. 
+        # The full-resolution windows that end inside a block lie between the coarse windows that end with 
+        # the block and with the one before it, so every block where the segment between their means enters 
+        # the (wider) sphere of a full-resolution window is refined for every mode that differs from "Nominal".
+        window_sums = np.cumsum((coarse_truth - coarse_exp) * block_sizes, axis=1)
+        window_sums[:, coarse_window:] -= window_sums[:, :-coarse_window].copy()
+        window_counts = np.cumsum(block_sizes[:, 0])
+        window_counts[coarse_window:] -= window_counts[:-coarse_window].copy()
+        window_means = np.swapaxes(window_sums / window_counts[:, np.newaxis], 0, 1)
+        prev_means = np.concatenate((window_means[:1], window_means[:-1]))
+        steps = window_means - prev_means
+        step_norms = np.sum(steps * s_inv * steps, axis=-1)
+        closest = np.clip(-np.sum(prev_means * s_inv * steps, axis=-1) / np.where(step_norms > 0, step_norms, 1), 0, 1)
+        closest_means = prev_means + closest[..., np.newaxis] * steps
+        segment_dists = np.sqrt(np.sum(closest_means * s_inv * closest_means, axis=-1))
+        differs = np.any(window_means != window_means[:, [nominal]], axis=-1) if nominal >= 0 else np.ones_like(coarse_contains)
+        differs |= np.concatenate((differs[:1], differs[:-1]))
+        flagged |= np.any((segment_dists <= threshold) & differs, axis=1)
+
+        flagged_rows = np.cumsum(np.concatenate(([0], np.repeat(flagged, block_sizes[:, 0]))))
+        rows = np.arange(num_times)
+        is_fine = flagged_rows[np.minimum(rows + window_size + 1, num_times)] > flagged_rows[np.maximum(rows - window_size, 0)]
+        return np.repeat(coarse_codes, block_sizes[:, 0]), is_fine
+
+    def run_time_partitioned(self, truth_telem: pd.DataFrame, num_chunks: int = os.cpu_count(), 
+                             executor: Executor = None) -> np.ndarray:
+        """ Runs the fault ID algorithm with the time axis split into num_chunks chunks. 
+        Every chunk is prefixed by the self.__N - 1 measurements before it, so its 
+        innovation windows are exact from its first measurement on, and is evaluated 
+        on its own worker (see self._chunk_modes()). Only the tie-break recurrence of 
+        self.__determine_mode() depends on the previous ID, so it is replayed 
+        sequentially across the chunks afterwards and the results are identical to 
+        self.run_offline_fault_ID(). The state of the identifier (self.mode_ids, 
+        windows, cursor) is not modified.
+
+        Keyword arguments:
+        truth_telem: pandas.DataFrame -- the truth telemetry data
+        num_chunks: int -- the number of chunks
+        executor: concurrent.futures.Executor -- runs the chunks (see self.run_sharded()). 
+        If None, a ProcessPoolExecutor with one process per chunk is used.
+
+        Output: np.ndarray -- the (num_times,) codes (see self.mode_labels) of the 
+        identified fault for every measurement
+        """
+        print("%s: Running Fault ID algorithm on %d time chunks." %(self._name, num_chunks))
+        start_time = time.time()
+        truth_meas = self._get_measurements(truth_telem)
+        time_idx = np.array([self._time_index[t] for t in truth_meas[:, 0]], dtype=int)
+        s_inv, threshold, window_size = self._innovation_weights()
+        bounds = np.linspace(0, len(time_idx), max(min(num_chunks, len(time_idx)), 1) + 1).astype(int)
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=len(bounds) - 1)
+        try:
+            futures = []
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                warm_start = max(start - window_size + 1, 0)
+                futures.append(executor.submit(FaultIdentifier._chunk_modes, truth_meas[warm_start:end, 1:], 
+                                               self._expected_measurements(time_idx[warm_start:end]), s_inv, 
+                                               threshold, window_size, start - warm_start))
+            chunk_results = [future.result() for future in futures]
+        finally:
+            if own_executor:
+                executor.shutdown()
+        # replay the tie-break recurrence across the chunks
+        mode_codes = np.concatenate([codes for codes, ambiguous, ties in chunk_results])
+        nominal = self._mode_index.get("Nominal", -1)
+        for start, (codes, ambiguous, ties) in zip(bounds[:-1], chunk_results):
+            for idx, tie in zip(start + ambiguous, ties):
+                prev = mode_codes[idx - 1] if idx > 0 else nominal
+                # this logic represents the situation where faults and nominal data are indistinguishable 
+                if prev >= 0 and tie[prev]:
+                    mode_codes[idx] = prev
+        print("%s: Fault ID completed in %0.3f seconds." %(self._name, (time.time() - start_time)))
+        return self._mode_codes[mode_codes]
+
+    @staticmethod
+    def _chunk_modes(truth_meas: np.ndarray, exp_meas: np.ndarray, s_inv: np.ndarray, threshold: float, 
+                     window_size: int, warm_up: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """ Decides every measurement of a time chunk (see self.run_time_partitioned()) 
+        that does not depend on the previous ID and leaves the rest to the caller.
+
+        Keyword arguments:
+        truth_meas: np.ndarray -- the (num_times, dim) truth measurements (warm-up included)
+        exp_meas: np.ndarray -- the (num_modes, num_times, dim) expected measurements
+        s_inv: np.ndarray -- the (dim,) inverse innovation variances
+        threshold: float -- the distance threshold of the chi-squared spheres
+        window_size: int -- the window size
+        warm_up: int -- the number of leading measurements that only warm up the windows
+
+        Output: Tuple[np.ndarray, np.ndarray, np.ndarray] -- the closest possible mode of every 
+        measurement after the warm-up (-1 if there is none), the measurements with several 
+        possible modes and, for each of those, which modes are tied with the closest one
+        """
+        mode_dists, contains_zero = FaultIdentifier._shard_distances(truth_meas, exp_meas, s_inv, threshold, window_size)
+        num_possible = np.count_nonzero(contains_zero[warm_up:], axis=1)
+        possible_dists = np.where(contains_zero[warm_up:], mode_dists[warm_up:], np.inf)
+        closest_mode = np.argmin(possible_dists, axis=1)
+        ambiguous = np.flatnonzero(num_possible > 1)
+        ties = possible_dists[ambiguous] == possible_dists[ambiguous, closest_mode[ambiguous]][:, np.newaxis]
+        return np.where(num_possible == 0, -1, closest_mode), ambiguous, ties
+
+    @staticmethod
+    def _shard_distances(truth_meas: np.ndarray, exp_meas: np.ndarray, s_inv: np.ndarray, 
+                         threshold: float, window_size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """ Computes the distances of a shard of modes (see self.run_sharded()) with 
+        the same moving window as self.process_measurement().
+
+        Keyword arguments:
+        truth_meas: np.ndarray -- the (num_times, dim) truth measurements
+        exp_meas: np.ndarray -- the (num_modes, num_times, dim) expected measurements of the shard
+        s_inv: np.ndarray -- the (dim,) inverse innovation variances
+        threshold: float -- the distance threshold of the chi-squared spheres
+        window_size: int -- the window size
+
+        Output: Tuple[np.ndarray, np.ndarray] -- the (num_times, num_modes) distances 
+        and whether the sphere of each mode contains the origin
+        """
+        num_modes, num_times, dim = exp_meas.shape
+        innov_window = np.zeros((num_modes, window_size, dim))
+        mode_dists = np.empty((num_times, num_modes))
+        for idx in range(num_times):
+            mode_innov = np.subtract(truth_meas[idx], exp_meas[:, idx])
+            if idx < window_size:
+                innov_window[:, idx] = mode_innov
+            else:
+                innov_window[:, :-1] = innov_window[:, 1:]
+                innov_window[:, -1] = mode_innov
+            mode_innov_mean = np.mean(innov_window[:, :min(idx + 1, window_size)], axis=1)
+            mode_dists[idx] = np.sqrt(np.sum(mode_innov_mean * s_inv * mode_innov_mean, axis=-1))
+        return mode_dists, mode_dists <= threshold
+
+    def run_parameter_sweep(self, truth_telem: pd.DataFrame, window_sizes: List[int] = None, 
+                            r_scales: List[float] = None, confidences: List[float] = None) -> Dict[Tuple[int, float, float], np.ndarray]:
+        """ Runs the fault ID algorithm for every combination of window size 
+        (self.__N), measurement noise scale (multiplies self.__R) and chi-squared 
+        confidence. The innovations do not depend on these parameters, so they 
+        are computed once. The moving window means of every window size are 
+        summed in the same (chronological) order as self.process_measurement(), 
+        so modes whose windows match bit for bit get identical distances and the 
+        tie-break (see self._resolve_modes()) reproduces the serial mode ID's. 
+        The state of the identifier (self.mode_ids, windows, cursor) is not modified.
+
+        Note: only self.__R is scaled. The subclasses' self.R attributes are not 
+        used by the fault ID algorithm, so every identifier sweeps around R = 0.1 I.
+
+        Keyword arguments:
+        truth_telem: pandas.DataFrame -- the truth telemetry data 
+        window_sizes: List[int] -- the window sizes to test (defaults to self.__N)
+        r_scales: List[float] -- the factors self.__R is scaled by (defaults to 1.0)
+        confidences: List[float] -- the chi-squared confidences to test (defaults to 0.95)
+
+        Output: Dict[Tuple[int, float, float], np.ndarray] -- the mode ID codes 
+        (see self.mode_labels) of every (window size, R scale, confidence) combination
+        """
+        print("%s: Running Fault ID parameter sweep." %self._name)
+        start_time = time.time()
+        window_sizes = [self.__N] if window_sizes is None else window_sizes
+        r_scales = [1.0] if r_scales is None else r_scales
+        confidences = [0.95] if confidences is None else confidences
+        assert self.__chol is None, "%s: Parameter sweeps only support the diagonal covariance test." %self._name
+        truth_meas = self._get_measurements(truth_telem)
+        num_times = truth_meas.shape[0]
+        time_idx = np.array([self._time_index[t] for t in truth_meas[:, 0]], dtype=int)
+        mode_innov = truth_meas[:, np.newaxis, 1:] - self._expected_measurements(time_idx).transpose(1, 0, 2)
+        sweep_mode_ids = {}
+        for window_size in window_sizes:
+            # a cumulative sum would be cheaper, but its rounding depends on the whole history 
+            # and breaks the exact ties between modes whose windows are identical
+            window_len = np.minimum(np.arange(1, num_times + 1), window_size)
+            window_start = np.arange(num_times) - window_len + 1
+            innov_sum = mode_innov[window_start]
+            for offset in range(1, window_size):
+                rows = np.flatnonzero(window_len > offset)
+                innov_sum[rows] += mode_innov[window_start[rows] + offset]
+            mode_innov_mean = innov_sum / window_len[:, np.newaxis, np.newaxis]
+            for r_scale in r_scales:
+                s_inv = 1/(self.__C @ self.__Px @ self.__C.transpose() + r_scale * self.__R).diagonal()
+                mode_dists = np.sqrt(np.sum(mode_innov_mean * s_inv * mode_innov_mean, axis=-1))
+                for confidence in confidences:
+                    chi = chi2_threshold(confidence, self._dim)
+                    contains_zero = mode_dists <= np.sqrt(chi / window_size)
+                    mode_codes = self._resolve_modes(contains_zero, mode_dists, self._mode_index.get("Nominal", -1))
+                    sweep_mode_ids[(window_size, r_scale, confidence)] = self._mode_codes[mode_codes]
+        print("%s: Parameter sweep of %d configurations completed in %0.3f seconds." 
+            %(self._name, len(sweep_mode_ids), (time.time() - start_time)))
+        return sweep_mode_ids
+
+    @staticmethod
+    def _resolve_modes(contains_zero: np.ndarray, mode_dists: np.ndarray, prev_code: int) -> np.ndarray:
+        """ Replays self.__determine_mode() over a whole trace. Every sample 
+        with zero or one possible mode is decided at once and only the 
+        ambiguous samples run through the (sequential) tie-break logic. 
+        Modes are referred to by their index in self._modes and "Unknown Mode" by -1.
+
+        Keyword arguments:
+        contains_zero: np.ndarray -- a (num_times, num_modes) boolean array, True if 
+        the mode's ellipsoid contains the origin
+        mode_dists: np.ndarray -- a (num_times, num_modes) array of Mahalanobis distances
+        prev_code: int -- the mode identified before the trace ("Nominal" before the first ID)
+
+        Output: np.ndarray -- the (num_times,) identified modes
+        """
+        num_possible = np.count_nonzero(contains_zero, axis=1)
+        possible_dists = np.where(contains_zero, mode_dists, np.inf)
+        closest_mode = np.argmin(possible_dists, axis=1)
+        val = possible_dists[np.arange(len(closest_mode)), closest_mode]
+        mode_codes = np.where(num_possible == 0, -1, closest_mode)
+        for idx in np.flatnonzero(num_possible > 1):
+            prev = mode_codes[idx - 1] if idx > 0 else prev_code
+            # this logic represents the situation where faults and nominal data are indistinguishable 
+            if prev >= 0 and possible_dists[idx, prev] == val[idx]:
+                mode_codes[idx] = prev
+        return mode_codes
+
+    @staticmethod
+    def _determine_modes(contains_zero: np.ndarray, mode_dists: np.ndarray, prev_codes: np.ndarray) -> np.ndarray:
+        """ A vectorized version of self.__determine_mode() for a batch of 
+        independent runs. Modes are referred to by their index in self._modes 
+        and "Unknown Mode" by -1.
+
+        Keyword arguments:
+        contains_zero: np.ndarray -- a (K, num_modes) boolean array, True if 
+        the mode's ellipsoid contains the origin
+        mode_dists: np.ndarray -- a (K, num_modes) array of Mahalanobis distances
+        prev_codes: np.ndarray -- the (K,) previously identified modes ("Nominal" before the first ID)
+
+        Output: np.ndarray -- the (K,) identified modes
+        """
+        num_possible = np.count_nonzero(contains_zero, axis=1)
+        possible_dists = np.where(contains_zero, mode_dists, np.inf)
+        closest_mode = np.argmin(possible_dists, axis=1)
+        rows = np.arange(len(prev_codes))
+        val = possible_dists[rows, closest_mode]
+        # this logic represents the situation where faults and nominal data are indistinguishable 
+        keep_prev = (prev_codes >= 0) & (possible_dists[rows, prev_codes] == val)
+        mode_codes = np.where(keep_prev & (num_possible > 1), prev_codes, closest_mode)
+        return np.where(num_possible == 0, -1, mode_codes)
+
+    def _innovation_weights(self) -> Tuple[np.ndarray, float, int]:
+        """ Returns the (self._dim,) inverse innovation variances, the distance threshold 
+        of the chi-squared sphere and the window size. Used to fuse identifiers 
+        (see src.FusedFaultIdentifier.FusedFaultIdentifier).
+        """
+        assert self.__chol is None, "%s: Only the diagonal covariance test can be fused or sharded." %self._name
+        self.__update_innovation_uncertainty()
+        return 1/self.__innov_uncertainty.diagonal(), np.sqrt(self.__chi / self.__N), self.__N
+
     def _get_measurements(self, telemetry: pd.DataFrame) -> np.ndarray:
         """ Gets the fault-specific measurement from a single-row of telemetry data 
 
@@ -90,45 +905,492 @@ class FaultIdentifier:
         """
         pass
 
-    def __get_expected_measurements(self, time: float) -> Dict[str, np.ndarray]:
+    def _set_sim_data(self, sim_data: Dict[str,pd.DataFrame], columns: List[str]) -> None:
+        """ Stacks the simulated telemetry of every mode into the simulation bank 
+        (see self._expected_measurements()). Row i of every mode corresponds to 
+        the time stamp t where self._time_index[t] == i. Time stamps a mode was 
+        not simulated at are filled with NaN and, thus, can never be identified.
+        Most fault modes are identical to "Nominal" until their fault is injected, 
+        so only the rows from the first one that differs (bit for bit) from 
+        "Nominal" onwards are stored for every mode and, until then, the mode 
+        reuses the distance of "Nominal" (see self.__update_diverged_innovations()).
+
+        Keyword arguments:
+        sim_data: Dict[str, pandas.DataFrame] -- a dictionary where str is the fault mode
+        and the pandas.DataFrame holds the simulated telemetry for that mode
+        columns: List[str] -- the measurement columns (excluding 'Time (ns)')
+        """
+        mode_telem = [df[['Time (ns)'] + columns].to_numpy(dtype=float) for df in sim_data.values()]
+        times = np.unique(np.concatenate([telem[:, 0] for telem in mode_telem]))
+        self._columns = list(columns)
+        self._modes = list(sim_data.keys())
+        self.mode_labels = ["Unknown Mode", "Nominal"] + [mode for mode in self._modes if mode != "Nominal"]
+        self.__set_mode_codes()
+        self.__mode_id_buffer = np.empty(0, dtype=self._mode_codes.dtype)
+        self.__prev_mode = self._mode_index.get("Nominal", -1)
+        self._time_index = {t: idx for idx, t in enumerate(times.tolist())}
+        sim_array = np.full((len(self._modes), len(times), self._dim), np.nan)
+        for idx, telem in enumerate(mode_telem):
+            sim_array[idx, np.searchsorted(times, telem[:, 0])] = telem[:, 1:]
+        self.__set_sim_bank(sim_array)
+        return None
+
+    def __set_mode_codes(self) -> None:
+        """ Indexes self._modes and maps every mode to its code in self.mode_labels. """
+        self._mode_index = {mode: idx for idx, mode in enumerate(self._modes)}
+        label_codes = {label: code for code, label in enumerate(self.mode_labels)}
+        # self._mode_codes[i] is the code of self._modes[i] and self._mode_codes[-1] that of "Unknown Mode"
+        self._mode_codes = np.array([label_codes[mode] for mode in self._modes] + [UNKNOWN_MODE_CODE], 
+                                    dtype=np.min_scalar_type(len(self.mode_labels) - 1))
+        return None
+
+    def __set_sim_bank(self, sim_array: np.ndarray) -> None:
+        """ Stores the simulated measurements of every mode (see self._set_sim_data()).
+
+        Keyword arguments:
+        sim_array: np.ndarray -- the (num_modes, num_times, self._dim) simulated measurements 
+        of self._modes where row i corresponds to the time stamp t with self._time_index[t] == i
+        """
+        num_times = sim_array.shape[1]
+        # find the first row at which every mode diverges from Nominal
+        self._nominal = self._mode_index.get("Nominal", -1)
+        self._divergence = np.zeros(len(self._modes), dtype=np.int64)
+        nominal_sim = np.full((num_times, self._dim), np.nan)
+        if self._nominal >= 0:
+            nominal_sim = sim_array[self._nominal]
+            same_rows = np.all(sim_array.view(np.int64) == nominal_sim.view(np.int64), axis=-1)
+            self._divergence = np.where(np.all(same_rows, axis=1), num_times, np.argmin(same_rows, axis=1))
+        # the bank holds the Nominal rows followed by the rows of every mode from its divergence onwards 
+        # and row i >= self._divergence[m] of mode m is self._sim_bank[self._suffix_offset[m] + i]
+        suffix_lens = num_times - self._divergence
+        self._suffix_offset = num_times + np.concatenate(([0], np.cumsum(suffix_lens)[:-1])) - self._divergence
+        self._sim_bank = np.concatenate([nominal_sim] + [sim_array[idx, div:] for idx, div in enumerate(self._divergence)])
+        self._nominal_sim = self._sim_bank[:num_times]
+        self._innov_window = np.zeros((len(self._modes), self.__N, self._dim))
+        # Nominal comes first (and is read from the Nominal rows), then every mode in the order it diverges
+        divergence = np.where(np.arange(len(self._modes)) == self._nominal, -1, self._divergence)
+        self.__divergence_order = np.argsort(divergence, kind="stable")
+        self.__inverse_order = np.argsort(self.__divergence_order)
+        self.__sorted_divergence = divergence[self.__divergence_order]
+        self.__sorted_offset = np.where(self.__sorted_divergence < 0, 0, self._suffix_offset[self.__divergence_order])
+        self.__sorted_window = np.zeros_like(self._innov_window)
+        self.__window_rows = np.zeros(self.__N, dtype=np.int64)
+        self.__num_diverged = 0
+        return None
+
+    def _expected_measurements(self, rows: np.ndarray, modes: np.ndarray = slice(None)) -> np.ndarray:
+        """ Returns the expected measurements of the simulation bank.
+
+        Keyword arguments:
+        rows: np.ndarray -- the (num_rows,) rows (see self._time_index)
+        modes: np.ndarray -- the indices of the modes (all of them by default)
+
+        Output: np.ndarray -- a (num_modes, num_rows, self._dim) array
+        """
+        rows = np.asarray(rows)[np.newaxis, :]
+        diverged = rows >= self._divergence[modes][:, np.newaxis]
+        return self._sim_bank[np.where(diverged, self._suffix_offset[modes][:, np.newaxis] + rows, rows)]
+
+    def _set_channel_families(self, enabled: bool = True) -> None:
+        """ Finds the modes that differ from "Nominal" in a single measurement channel 
+        only (e.g. a single faulty sensor). The window mean innovation of such a mode 
+        equals that of "Nominal" but in its channel, so with the diagonal covariance 
+        test its squared distance is the squared distance of "Nominal" with the term of 
+        that channel swapped out. Their innovation windows then only hold that channel 
+        and their distances are O(1) corrections to the "Nominal" distance (see 
+        self.__update_family_spheres()). Every other mode is tested as usual.
+
+        Keyword arguments:
+        enabled: bool -- False tests every mode as usual (e.g. to compare against)
+        """
+        self.__channel_families = None
+        self.__families_enabled = enabled
+        if not enabled or self._nominal < 0:
+            return None
+        num_times = len(self._nominal_sim)
+        modes, channels = [], []
+        for idx, div in enumerate(self._divergence):
+            suffix = self._sim_bank[self._suffix_offset[idx] + div:self._suffix_offset[idx] + num_times]
+            # the channels are compared bit for bit, like the divergence (see self._set_sim_data())
+            differs = np.any(suffix.view(np.int64) != self._nominal_sim[div:].view(np.int64), axis=0)
+            if idx != self._nominal and np.count_nonzero(differs) <= 1:
+                modes.append(idx)
+                channels.append(int(np.argmax(differs)))
+        if len(modes) == 0:
+            return None
+        others = np.setdiff1d(np.arange(len(self._modes)), modes)
+        self.__channel_families = (np.array(modes), np.array(channels), others, int(np.searchsorted(others, self._nominal)))
+        self.__family_window = np.zeros((len(modes), self.__N))
+        self.__others_window = np.zeros((len(others), self.__N, self._dim))
+        print("%s: %d of %d modes differ from Nominal in a single channel." %(self._name, len(modes), len(self._modes)))
+        return None
+
+    def update_modes(self, sim_data: Dict[str, pd.DataFrame], removed: List[str] = (), 
+                     recent_truth: pd.DataFrame = None) -> None:
+        """ Extends the hypothesis bank in place, e.g. when modes are added to the 
+        simulation database of a long-running process. The modes of sim_data are added 
+        (or replace the simulated telemetry of the mode with the same name) and the 
+        removed modes are dropped. The identifier keeps its cursor, its mode ID's and 
+        the order of its other modes, so a run continues where it left off. New modes 
+        are appended to self.mode_labels and every existing label keeps its code (also 
+        the labels of removed modes, so the mode ID's so far still decode). 
+
+        Keyword arguments:
+        sim_data: Dict[str, pandas.DataFrame] -- the simulated telemetry of the new or changed modes. 
+        Time stamps that are not in self._time_index are ignored.
+        removed: List[str] -- the modes to drop
+        recent_truth: pandas.DataFrame -- the truth telemetry of the measurements held by the 
+        innovation windows (the last self._window_len measurements). The windows of every mode 
+        are rebuilt from it exactly as the measurements would have filled them. If None, the 
+        windows start over empty.
+
+        Note: the posterior engine (see self.set_decision_engine()) restarts from a uniform 
+        posterior and per-mode covariances are not supported.
+        """
+        assert self.__chol is None or self.__chol.ndim == 2, \
+            "%s: Updating the modes does not support per-mode covariances." %self._name
+        state = self.get_state()
+        last_mode = self._modes[state["last_mode"]] if state["last_mode"] >= 0 else None
+        # the existing modes keep their order and the new ones are appended
+        old_modes, old_index = self._modes, self._mode_index
+        self._modes = [mode for mode in old_modes if mode not in removed] + \
+                      [mode for mode in sim_data if mode not in old_index]
+        self.mode_labels = self.mode_labels + [mode for mode in self._modes if mode not in self.mode_labels]
+        self.__set_mode_codes()
+        rows = np.arange(len(self._time_index))
+        sim_array = np.full((len(self._modes), len(rows), self._dim), np.nan)
+        for idx, mode in enumerate(self._modes):
+            if mode in sim_data:
+                telem = sim_data[mode][['Time (ns)'] + self._columns].to_numpy(dtype=float)
+                telem_rows = np.array([self._time_index.get(t, -1) for t in telem[:, 0]], dtype=int)
+                sim_array[idx, telem_rows[telem_rows >= 0]] = telem[telem_rows >= 0, 1:]
+            else:
+                sim_array[idx] = self._expected_measurements(rows, [old_index[mode]])[0]
+        self.__set_sim_bank(sim_array)
+        self._set_channel_families(self.__families_enabled)
+
+        # rebuild the windows and restore the rest of the state
+        window_rows = np.empty(0, dtype=np.int64)
+        innov_window = np.zeros((len(self._modes), 0, self._dim))
+        if recent_truth is not None and state["innov_window"].shape[1] > 0:
+            recent_meas = self._get_measurements(recent_truth)
+            assert len(recent_meas) == state["innov_window"].shape[1], \
+                "%s: The recent truth must hold the %d measurements of the windows." %(self._name, state["innov_window"].shape[1])
+            window_rows = np.array([self._time_index[t] for t in recent_meas[:, 0]], dtype=np.int64)
+            innov_window = np.subtract(recent_meas[:, 1:], self._expected_measurements(window_rows))
+        self.__mode_id_buffer = np.empty(0, dtype=self._mode_codes.dtype)
+        self._cursor = 0
+        state.update({"modes": list(self._modes), "innov_window": innov_window, "window_rows": window_rows, 
+                      "last_mode": self._mode_index.get(last_mode, -1)})
+        self.set_state(state)
+        self.top_k = min(self.top_k, len(self._modes))
+        codes, top_dists, scores = self.__top_k_buffers
+        self.__top_k_buffers = (codes[:, :self.top_k].astype(self._mode_codes.dtype), 
+                                top_dists[:, :self.top_k], scores[:, :self.top_k])
+        if self.gate_quiet_period is not None:
+            self.__gated_dists = np.full(len(self._modes), np.nan)
+            self.__gated_contains = np.zeros(len(self._modes), dtype=bool)
+        if self.candidate_block is not None:
+            self.__candidate_index = (-1, 0, -1, None, None, None, 0.0)
+        if self.decision_engine == "posterior":
+            self.set_decision_engine(self.decision_engine, *self.__engine_params)
+        print("%s: Updated the hypothesis bank to %d modes (%d new or changed, %d removed)." 
+            %(self._name, len(self._modes), len(sim_data), len([mode for mode in old_modes if mode in removed])))
+        return None
+
+    def noise_hash(self) -> str:
+        """ Returns a hash of the noise parameters (Q, R, Px, C, N, chi). 
+        Checkpoints are only compatible with identifiers that share this hash.
+        """
+        sha = hashlib.sha256()
+        for param in (self.__Q, self.__R, self.__Px, self.__C):
+            sha.update(np.ascontiguousarray(param, dtype=float).tobytes())
+        sha.update(repr((self.__N, float(self.__chi))).encode())
+        if self.__chol is not None:
+            sha.update(repr(("covariance", self.__chol.shape)).encode())
+            sha.update(np.ascontiguousarray(self.__chol).tobytes())
+        return sha.hexdigest()
+
+    def content_hash(self, truth_telem: pd.DataFrame) -> str:
+        """ Returns a hash of every input that determines the Fault ID results: 
+        the identifier class, the simulated measurements of every mode, the 
+        truth measurements and the noise parameters. Used as the key of 
+        src.ResultCache.ResultCache.
+
+        Keyword arguments:
+        truth_telem: pandas.DataFrame -- the truth telemetry data 
+        """
+        sha = hashlib.sha256()
+        sha.update(repr((type(self).__name__, self._columns, self._modes, self.mode_labels)).encode())
+        sha.update(np.array(list(self._time_index.keys()), dtype=float).tobytes())
+        for bank in (self._divergence, self._sim_bank):
+            sha.update(np.ascontiguousarray(bank).tobytes())
+        sha.update(np.ascontiguousarray(self._get_measurements(truth_telem), dtype=float).tobytes())
+        sha.update(self.noise_hash().encode())
+        if self.gate_quiet_period is not None:
+            sha.update(repr(("gate", self.gate_quiet_period)).encode())
+        if self.decision_engine != "window":
+            sha.update(repr(("engine", self.decision_engine, self.__engine_params)).encode())
+        return sha.hexdigest()
+
+    def get_state(self) -> Dict[str, object]:
+        """ Returns a serializable snapshot of the identifier. The snapshot holds 
+        the innovation windows (and the rows they hold), the last mode ID, the 
+        sample cursor, the mode ID's identified so far and the hash of the noise parameters. 
+        """
+        innov_window = self._innov_window[:, :self._window_len].copy()
+        window_rows = None
+        if self.__uses_divergence_order():
+            # the modes that did not diverge yet hold the window of Nominal
+            sorted_window = self.__sorted_window[:, :self._window_len].copy()
+            sorted_window[self.__num_diverged:] = sorted_window[0]
+            innov_window = sorted_window[self.__inverse_order]
+            window_rows = self.__window_rows[:self._window_len].copy()
+        elif self.__uses_channel_families():
+            # the windows of the single-channel modes are Nominal's but in their channel
+            modes, channels, others, nominal = self.__channel_families
+            innov_window[others] = self.__others_window[:, :self._window_len]
+            innov_window[modes] = self.__others_window[nominal, :self._window_len]
+            innov_window[modes, :, channels] = self.__family_window[:, :self._window_len]
+        return {"name": self._name,
+                "modes": list(self._modes),
+                "noise_hash": self.noise_hash(),
+                "cursor": self._cursor,
+                "innov_window": innov_window,
+                "window_rows": window_rows,
+                "last_mode": self.__prev_mode,
+                "mode_ids": self.mode_ids.copy(),
+                "gate": self.__get_gate_state()}
+
+    def __get_gate_state(self) -> Dict[str, object]:
+        """ Returns the detection gate part of self.get_state() (None if the gate is disabled). """
+        if self.gate_quiet_period is None:
+            return None
+        return {"active": self.__gate_active,
+                "quiet_steps": self.__quiet_steps,
+                "recent_truth": self.__recent_truth[:self.__recent_len].copy(),
+                "recent_rows": self.__recent_rows[:self.__recent_len].copy()}
+
+    def set_state(self, state: Dict[str, object]) -> None:
+        """ Restores a snapshot created by self.get_state().
+
+        Keyword arguments:
+        state: Dict[str, object] -- the snapshot to restore
+        """
+        assert state["noise_hash"] == self.noise_hash(), \
+            "%s: The checkpoint was created with different noise parameters." %self._name
+        assert state["modes"] == self._modes, \
+            "%s: The checkpoint was created with a different simulation database." %self._name
+        assert len(state["mode_ids"]) == state["cursor"], "The checkpoint is corrupt."
+        assert (state["gate"] is None) == (self.gate_quiet_period is None), \
+            "%s: The checkpoint was created with a different detection gate setting." %self._name
+        self._window_len = state["innov_window"].shape[1]
+        self._innov_window[:, :self._window_len] = state["innov_window"]
+        if self.__uses_divergence_order():
+            self.__sorted_window[:, :self._window_len] = state["innov_window"][self.__divergence_order]
+            self.__window_rows[:self._window_len] = state["window_rows"]
+            self.__num_diverged = self.__count_diverged(self._window_len)
+        elif self.__uses_channel_families():
+            modes, channels, others, nominal = self.__channel_families
+            self.__family_window[:, :self._window_len] = self._innov_window[modes, :self._window_len, channels]
+            self.__others_window[:, :self._window_len] = self._innov_window[others, :self._window_len]
+        self.reserve(state["cursor"])
+        self._cursor = state["cursor"]
+        self.__mode_id_buffer[:self._cursor] = state["mode_ids"]
+        self.__prev_mode = state["last_mode"]
+        if state["gate"] is not None:
+            self.__gate_active = state["gate"]["active"]
+            self.__quiet_steps = state["gate"]["quiet_steps"]
+            self.__recent_len = len(state["gate"]["recent_rows"])
+            self.__recent_truth[:self.__recent_len] = state["gate"]["recent_truth"]
+            self.__recent_rows[:self.__recent_len] = state["gate"]["recent_rows"]
+        return None
+
+    def save_checkpoint(self, path: str) -> None:
+        """ Atomically writes self.get_state() to path. 
+
+        Keyword arguments:
+        path: str -- the checkpoint file
+        """
+        checkpoint_dir = os.path.dirname(path)
+        if checkpoint_dir != "" and not os.path.exists(checkpoint_dir):
+            os.makedirs(checkpoint_dir)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(self.get_state(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+        return None
+
+    def load_checkpoint(self, path: str) -> bool:
+        """ Restores the identifier from a checkpoint written by self.save_checkpoint().
+
+        Keyword arguments:
+        path: str -- the checkpoint file
+
+        Output: bool -- True if a checkpoint was found and restored
+        """
+        if not os.path.isfile(path):
+            return False
+        with open(path, "rb") as f:
+            self.set_state(pickle.load(f))
+        print("%s: Restored checkpoint %s at measurement %d." %(self._name, path, self._cursor))
+        return True
+
+    def __get_expected_measurements(self, time: float) -> np.ndarray:
         """ This function extracts the expected measurement for every
         fault mode. 
 		
         Keyword arguments:
         time: float -- the time stamp (in ns)
 
-        Output: Dict[str, np.ndarray] -- a dictionary where str is the fault mode
-        and the np.ndarray is the expected state for the corresponding time.
+        Output: np.ndarray -- a (num_modes, self._dim) array where row i is 
+        the expected state of self._modes[i] for the corresponding time.
         """
-        curr_meas = {}
-        for mode, df in self._sim_data.items():
-            curr_meas[mode] = self._sim_data[mode][time]
-        return curr_meas
+        return self._expected_measurements([self._time_index[time]])[:, 0]
 
-    def __update_innovations(self, exp_meas_dict: Dict[str,np.ndarray], truth_meas: np.ndarray) -> None:
-        """ This function updates self._innov_hist_dict which is represents a 
-        moving window of the self.__N most recent innovations
+    def __update_innovations(self, time_row: int, truth_meas: np.ndarray) -> None:
+        """ This function updates self._innov_window which is represents a 
+        moving window of the self.__N most recent innovations of every mode. 
+        The window is kept in chronological order.
 		
         Keyword arguments:
-        exp_meas_dict: Dict[str,np.ndarray] -- a dictionary where str is the fault mode
-        and the np.ndarray is the expected state.
+        time_row: int -- the row of the most recent time stamp (see self._time_index)
         truth_meas: np.ndarray -- the most recent truth measurement
         """
-        for mode, mode_meas in exp_meas_dict.items():
-            mode_innov = np.subtract(truth_meas, mode_meas)
-            if len(self._innov_hist_dict[mode]) < self.__N:
-                self._innov_hist_dict[mode].append(mode_innov)
-            else:
-                self._innov_hist_dict[mode].append(mode_innov)
-                self._innov_hist_dict[mode].popleft()
+        bank_rows = np.where(time_row >= self._divergence, self._suffix_offset + time_row, time_row)
+        mode_innov = np.subtract(truth_meas, self._sim_bank[bank_rows])
+        if self._window_len < self.__N:
+            self._innov_window[:, self._window_len] = mode_innov
+            self._window_len += 1
+        else:
+            self._innov_window[:, :-1] = self._innov_window[:, 1:]
+            self._innov_window[:, -1] = mode_innov
+        return None
+
+    def __uses_divergence_order(self) -> bool:
+        """ True if the modes that did not diverge from "Nominal" yet reuse its distance 
+        (see self.__update_diverged_innovations()). Their windows are then held in 
+        self.__sorted_window instead of self._innov_window. Single-channel families, 
+        detection gates, candidate indices, the posterior engine and full covariances 
+        keep their own windows.
+        """
+        return self._nominal >= 0 and self.__channel_families is None and self.__chol is None \
+            and self.gate_quiet_period is None and self.candidate_block is None and self.decision_engine == "window"
+
+    def __count_diverged(self, window_len: int) -> int:
+        """ Returns the number of leading modes of self.__divergence_order (Nominal included) 
+        that diverged from "Nominal" within the first window_len rows of the window. 
+        """
+        if window_len == 0:
+            return 0
+        return int(np.searchsorted(self.__sorted_divergence, self.__window_rows[:window_len].max(), side="right"))
+
+    def __update_diverged_innovations(self, time_row: int, truth_meas: np.ndarray) -> None:
+        """ The counterpart of self.__update_innovations() that skips the modes whose window 
+        only holds rows before their divergence from "Nominal" (see self._set_sim_data()). 
+        Their innovations are those of "Nominal" bit for bit, so only the windows of "Nominal" 
+        and of the diverged modes are updated. The windows are kept in self.__sorted_window 
+        in the order of self.__divergence_order, which makes the updated modes a leading 
+        slice. The window of a mode is copied from "Nominal" once it diverges.
+		
+        Keyword arguments:
+        time_row: int -- the row of the most recent time stamp (see self._time_index)
+        truth_meas: np.ndarray -- the most recent truth measurement
+        """
+        if self._window_len < self.__N:
+            self.__window_rows[self._window_len] = time_row
+        else:
+            self.__window_rows[:-1] = self.__window_rows[1:]
+            self.__window_rows[-1] = time_row
+        num_diverged = self.__count_diverged(min(self._window_len + 1, self.__N))
+        if num_diverged > self.__num_diverged:
+            self.__sorted_window[self.__num_diverged:num_diverged] = self.__sorted_window[0]
+        self.__num_diverged = num_diverged
+        window = self.__sorted_window[:num_diverged]
+        bank_rows = np.where(time_row >= self.__sorted_divergence[:num_diverged], 
+                             self.__sorted_offset[:num_diverged] + time_row, time_row)
+        mode_innov = np.subtract(truth_meas, self._sim_bank[bank_rows])
+        if self._window_len < self.__N:
+            window[:, self._window_len] = mode_innov
+            self._window_len += 1
+        else:
+            window[:, :-1] = window[:, 1:]
+            window[:, -1] = mode_innov
+        return None
+
+    def __update_diverged_spheres(self) -> None:
+        """ The counterpart of self.__update_chi_squared_spheres() for the windows of 
+        self.__update_diverged_innovations(). The modes that did not diverge yet share 
+        the distance of "Nominal", which is exactly the distance the generic test computes. 
+        """
+        num_diverged = self.__num_diverged
+        sorted_dists = np.empty(len(self._modes))
+        sorted_dists[:num_diverged] = self.__mahalanobis_distances(
+            np.mean(self.__sorted_window[:num_diverged, :self._window_len], axis=1))
+        sorted_dists[num_diverged:] = sorted_dists[0]
+        self.__mode_dists = sorted_dists[self.__inverse_order]
+        self.__sphere_contains_zero = self.__mode_dists <= (np.sqrt(self.__chi / self.__N))
+        return None
+
+    def __uses_channel_families(self) -> bool:
+        """ True if the single-channel modes are tested by self.__update_family_spheres() 
+        (see self._set_channel_families()). Their windows are then held in self.__family_window 
+        and self.__others_window instead of self._innov_window. Detection gates, candidate 
+        indices, the posterior engine and full covariances keep every window in self._innov_window.
+        """
+        return self.__channel_families is not None and self.__chol is None and self.gate_quiet_period is None \
+            and self.candidate_block is None and self.decision_engine == "window"
+
+    def __update_family_innovations(self, time_row: int, truth_meas: np.ndarray) -> None:
+        """ The counterpart of self.__update_innovations() for identifiers with single-channel 
+        modes (see self._set_channel_families()). Only the channel of every single-channel 
+        mode is kept in its window (self.__family_window) and every other mode keeps its 
+        full window (self.__others_window).
+		
+        Keyword arguments:
+        time_row: int -- the row of the most recent time stamp (see self._time_index)
+        truth_meas: np.ndarray -- the most recent truth measurement
+        """
+        modes, channels, others, nominal = self.__channel_families
+        bank_rows = np.where(time_row >= self._divergence, self._suffix_offset + time_row, time_row)
+        others_innov = np.subtract(truth_meas, self._sim_bank[bank_rows[others]])
+        family_innov = np.subtract(truth_meas[channels], self._sim_bank[bank_rows[modes], channels])
+        if self._window_len < self.__N:
+            self.__others_window[:, self._window_len] = others_innov
+            self.__family_window[:, self._window_len] = family_innov
+            self._window_len += 1
+        else:
+            self.__others_window[:, :-1] = self.__others_window[:, 1:]
+            self.__others_window[:, -1] = others_innov
+            self.__family_window[:, :-1] = self.__family_window[:, 1:]
+            self.__family_window[:, -1] = family_innov
+        return None
+
+    def __update_family_spheres(self) -> None:
+        """ The counterpart of self.__update_chi_squared_spheres() for identifiers with 
+        single-channel modes (see self._set_channel_families()). The squared distance of 
+        every single-channel mode is the squared distance of "Nominal" corrected by the 
+        term of its channel. A mode whose channel matches "Nominal" bit for bit has 
+        exactly the distance of "Nominal", so ties are resolved as by the generic test.
+        """
+        modes, channels, others, nominal = self.__channel_families
+        others_mean = np.mean(self.__others_window[:, :self._window_len], axis=1)
+        family_mean = np.mean(self.__family_window[:, :self._window_len], axis=1)
+        nominal_mean = others_mean[nominal]
+        s_inv = 1/self.__innov_uncertainty.diagonal()
+        nominal_sq = np.sum(nominal_mean * s_inv * nominal_mean, axis=-1)
+        family_sq = nominal_sq + s_inv[channels] * (family_mean * family_mean - nominal_mean[channels] * nominal_mean[channels])
+        self.__mode_dists = np.empty(len(self._modes))
+        self.__mode_dists[others] = self.__mahalanobis_distances(others_mean, others)
+        self.__mode_dists[modes] = np.sqrt(np.maximum(family_sq, 0.0))
+        self.__sphere_contains_zero = self.__mode_dists <= (np.sqrt(self.__chi / self.__N))
         return None
 
     def __update_innovation_uncertainty(self) -> None:
-        """ This function the covariance of every fault mode's innovations. """
-        for mode, mode_innov_deque in self._innov_hist_dict.items():
-            curr_mode_innov = mode_innov_deque[-1]
-            curr_mode_innov_uncertainty = self.__C @ self.__Px @ self.__C.transpose() + self.__R
-            self.__innov_uncertainty_dict[mode] = curr_mode_innov_uncertainty
+        """ This function the covariance of every fault mode's innovations. 
+        Every mode shares the same (constant) covariance, so it is only computed once.
+        """
+        if self.__innov_uncertainty is None:
+            self.__innov_uncertainty = self.__C @ self.__Px @ self.__C.transpose() + self.__R
         return None
 
     def __update_chi_squared_spheres(self) -> None:
@@ -136,53 +1398,225 @@ class FaultIdentifier:
         also determines if the resulting ellipsoid contains the origin. The result 
         is used for fault ID. 
         """
-        for mode, mode_innov_deque in self._innov_hist_dict.items():
-            mode_innov_mean = np.mean(mode_innov_deque, axis=0)
-            # calc the Mahalanobis distance assuming zero mean
-            exp_mu = np.zeros((self._dim, 1))
-            s_inv = np.diag(1/self.__innov_uncertainty_dict[mode].diagonal())
-            d_sq = ((exp_mu - mode_innov_mean).transpose() @ s_inv @ (exp_mu - mode_innov_mean))[0][0]
-            dist = np.sqrt(d_sq)
-            if dist <= (np.sqrt(self.__chi / self.__N)):
-                self.__sphere_contains_zero_dict[mode] = (True, dist)
-            else:
-                self.__sphere_contains_zero_dict[mode] = (False, dist)
+        mode_innov_mean = np.mean(self._innov_window[:, :self._window_len], axis=1)
+        self.__mode_dists = self.__mahalanobis_distances(mode_innov_mean)
+        self.__sphere_contains_zero = self.__mode_dists <= (np.sqrt(self.__chi / self.__N))
         return None
 
-    def __return_2nd_element(self, nested_tuple) -> float:
-        """ Extracts the 2nd element of the 2nd element of a nested tuple. 
+    def __update_gated_spheres(self, time: float, truth_meas: np.ndarray) -> None:
+        """ The detection-gated counterpart of updating the innovations and the 
+        chi-squared spheres (see self.set_detection_gate()). While the fault banks 
+        are inactive, only "Nominal" is tested and every other mode is reported 
+        with a NaN distance outside of its sphere.
+
+        Keyword arguments:
+        time: float -- the time stamp (in ns)
+        truth_meas: np.ndarray -- the most recent truth measurement
+        """
+        self.__update_innovation_uncertainty()
+        time_row = self._time_index[time]
+        self.__update_recent(time_row, truth_meas)
+        if self.__gate_active:
+            self.__update_innovations(time_row, truth_meas)
+            self.__update_chi_squared_spheres()
+            self.__active_steps += 1
+            return None
+
+        recent_truth = self.__recent_truth[:self.__recent_len]
+        recent_rows = self.__recent_rows[:self.__recent_len]
+        nominal = self._mode_index["Nominal"]
+        nominal_innov = recent_truth - self._nominal_sim[recent_rows]
+        nominal_dist = self.__mahalanobis_distances(np.mean(nominal_innov, axis=0), nominal)
+        self._window_len = self.__recent_len
+        if nominal_dist <= (np.sqrt(self.__chi / self.__N)):
+            self.__gated_dists[nominal] = nominal_dist
+            self.__gated_contains[nominal] = True
+            self.__mode_dists = self.__gated_dists
+            self.__sphere_contains_zero = self.__gated_contains
+        else:
+            # Nominal was rejected -- warm up the windows of every fault bank
+            self._innov_window[:, :self._window_len] = recent_truth - self._expected_measurements(recent_rows)
+            self.__gate_active = True
+            self.__quiet_steps = 0
+            self.__update_chi_squared_spheres()
+            self.__active_steps += 1
+        return None
 
+    def __update_posterior(self, time_row: int, truth_meas: np.ndarray) -> None:
+        """ Updates the log-posterior of every mode (and of "Unknown Mode") with the 
+        most recent measurement (see self.set_decision_engine()). 
+		
         Keyword arguments:
-        nested_tuple: Tuple[str, Tuple[bool, float]]
+        time_row: int -- the row of the most recent time stamp (see self._time_index)
+        truth_meas: np.ndarray -- the most recent truth measurement
         """
-        return nested_tuple[1][1]
+        self.__update_innovation_uncertainty()
+        bank_rows = np.where(time_row >= self._divergence, self._suffix_offset + time_row, time_row)
+        self.__mode_dists = self.__mahalanobis_distances(np.subtract(truth_meas, self._sim_bank[bank_rows]))
+        # predict: stay in the mode or switch to any mode
+        log_prior = np.logaddexp(self.__log_stay + self.__log_posterior, self.__log_switch)
+        # update: modes without simulated data are impossible
+        log_posterior = log_prior
+        log_posterior[:-1] -= np.where(np.isnan(self.__mode_dists), np.inf, 0.5 * self.__mode_dists**2)
+        log_posterior[-1] -= 0.5 * self.__chi
+        log_posterior -= np.max(log_posterior)
+        self.__log_posterior = log_posterior - np.log(np.sum(np.exp(log_posterior)))
+        return None
+
+    def __determine_posterior_mode(self) -> None:
+        """ Changes self.__prev_mode to the most probable mode once its posterior odds 
+        against the current mode reach the threshold of self.set_decision_engine(). 
+        """
+        most_probable = np.argmax(self.__log_posterior)
+        current = self.__prev_mode if self.__prev_mode >= 0 else len(self._modes)
+        if self.__log_posterior[most_probable] - self.__log_posterior[current] >= self.__log_odds:
+            self.__prev_mode = most_probable if most_probable < len(self._modes) else -1
+        return None
+
+    def __update_recent(self, time_row: int, truth_meas: np.ndarray) -> None:
+        """ Keeps the self.__N most recent truth measurements and their rows 
+        (see self._time_index) in chronological order. Used by the detection gate 
+        and the candidate index instead of the innovation windows of every mode.
+        """
+        if self.__recent_len < self.__N:
+            self.__recent_len += 1
+        else:
+            self.__recent_truth[:-1] = self.__recent_truth[1:]
+            self.__recent_rows[:-1] = self.__recent_rows[1:]
+        self.__recent_truth[self.__recent_len - 1] = truth_meas
+        self.__recent_rows[self.__recent_len - 1] = time_row
+        return None
+
+    def __update_indexed_spheres(self, time_row: int, truth_meas: np.ndarray) -> None:
+        """ The candidate index counterpart of updating the innovations and the 
+        chi-squared spheres (see self.set_candidate_index()). The innovations of the 
+        candidates are computed in the same order as self.__update_innovations(), 
+        so their distances are identical to the exhaustive test.
+
+        Keyword arguments:
+        time_row: int -- the row of the most recent time stamp (see self._time_index)
+        truth_meas: np.ndarray -- the most recent truth measurement
+        """
+        self.__update_innovation_uncertainty()
+        self.__update_recent(time_row, truth_meas)
+        self._window_len = self.__recent_len
+        recent_truth = self.__recent_truth[:self.__recent_len]
+        recent_rows = self.__recent_rows[:self.__recent_len]
+        if time_row // self.candidate_block != self.__candidate_index[0]:
+            self.__build_candidate_index(time_row // self.candidate_block)
+        block, first_row, last_row, tree, indexed, unindexed, radius = self.__candidate_index
+        if recent_rows.min() >= first_row and recent_rows.max() <= last_row:
+            truth_center = self.__whiten(np.mean(recent_truth, axis=0))
+            candidates = unindexed if tree is None else \
+                np.concatenate((indexed[tree.query_ball_point(truth_center, radius)], unindexed))
+        else:
+            # the window reaches outside of the block (e.g. out of order time stamps)
+            candidates = np.arange(len(self._modes))
+        mode_innov = np.subtract(recent_truth, self._expected_measurements(recent_rows, candidates))
+        self.__mode_dists = np.full(len(self._modes), np.inf)
+        self.__mode_dists[candidates] = self.__mahalanobis_distances(np.mean(mode_innov, axis=1), candidates)
+        self.__sphere_contains_zero = self.__mode_dists <= (np.sqrt(self.__chi / self.__N))
+        self.__candidate_count += len(candidates)
+        return None
+
+    def __build_candidate_index(self, block: int) -> None:
+        """ Builds the KD-tree of a block of time rows (see self.set_candidate_index()). 
+        The block is extended by the self.__N - 1 rows before it, so that every 
+        window that ends inside of the block is covered.
+
+        Keyword arguments:
+        block: int -- the block (time rows block * self.candidate_block onwards)
+        """
+        # scipy is only imported once the candidate index is in use
+        from scipy.spatial import cKDTree
+        first_row = max(block * self.candidate_block - self.__N + 1, 0)
+        last_row = min((block + 1) * self.candidate_block, len(self._nominal_sim)) - 1
+        points = self.__whiten(self._expected_measurements(np.arange(first_row, last_row + 1)))
+        centers = np.mean(points, axis=1)
+        radii = np.max(np.sqrt(np.sum((points - centers[:, np.newaxis])**2, axis=-1)), axis=1)
+        threshold = np.sqrt(self.__chi / self.__N)
+        # modes with wider balls (or missing data) are always tested
+        is_indexed = radii <= threshold
+        indexed = np.flatnonzero(is_indexed)
+        tree = cKDTree(centers[indexed]) if len(indexed) > 0 else None
+        # the margin absorbs the rounding of the centers and radii
+        radius = (threshold + np.max(radii[indexed], initial=0.0)) * (1 + 1e-9) + 1e-12
+        self.__candidate_index = (block, first_row, last_row, tree, indexed, np.flatnonzero(~is_indexed), radius)
+        return None
+
+    def __whiten(self, innov: np.ndarray) -> np.ndarray:
+        """ Maps innovations into coordinates where the (shared) Mahalanobis distance 
+        is the Euclidean distance (see whiten()). 
+        """
+        if self.__chol is not None:
+            return whiten(innov, self.__chol)
+        return innov * np.sqrt(1/self.__innov_uncertainty.diagonal())
+
+    def __update_gate(self) -> None:
+        """ Deactivates the fault banks after self.gate_quiet_period consecutive "Nominal" ID's. """
+        if self.__prev_mode == self._mode_index["Nominal"]:
+            self.__quiet_steps += 1
+            if self.__quiet_steps >= self.gate_quiet_period:
+                self.__gate_active = False
+        else:
+            self.__quiet_steps = 0
+        return None
+
+    def __mahalanobis_distances(self, mode_innov_mean: np.ndarray, modes=slice(None)) -> np.ndarray:
+        """ Calculates the Mahalanobis distance of every mean innovation assuming zero mean.
+
+        Keyword arguments:
+        mode_innov_mean: np.ndarray -- a (..., self._dim) array of mean innovations
+        modes: the modes of the innovations (only matters for per-mode covariances)
+
+        Output: np.ndarray -- the (...) array of distances
+        """
+        if self.__chol is not None:
+            chol = self.__chol if self.__chol.ndim == 2 else self.__chol[modes]
+            return np.sqrt(np.sum(whiten(mode_innov_mean, chol)**2, axis=-1))
+        s_inv = 1/self.__innov_uncertainty.diagonal()
+        d_sq = np.sum(mode_innov_mean * s_inv * mode_innov_mean, axis=-1)
+        return np.sqrt(d_sq)
+
+    def __rank_modes(self) -> None:
+        """ Stores the self.top_k modes closest to the origin in the top-K buffers. 
+        The candidates are selected with a partial sort, so only the top_k 
+        candidates themselves are sorted.
+        """
+        dists = self.__mode_dists
+        closest = np.argpartition(dists, self.top_k - 1)[:self.top_k]
+        closest = closest[np.argsort(dists[closest], kind="stable")]
+        # the likelihood of a mean over n innovations at distance d is proportional to exp(-n d^2 / 2)
+        log_likelihood = -0.5 * self._window_len * (dists**2 - dists[closest[0]]**2)
+        likelihood = np.exp(log_likelihood)
+        codes, top_dists, scores = self.__top_k_buffers
+        codes[self._cursor] = self._mode_codes[closest]
+        top_dists[self._cursor] = dists[closest]
+        scores[self._cursor] = likelihood[closest] / np.nansum(likelihood)
+        return None
 
     def __determine_mode(self) -> None:
-        """ Performs the required logic on self.__sphere_contains_zero_dict to correclty
-        identify the fault mode.
+        """ Performs the required logic on self.__sphere_contains_zero to correclty
+        identify the fault mode. The result is stored in self.__prev_mode as an 
+        index into self._modes (-1 is "Unknown Mode").
         """
         # extract the modes that contain zero
-        possible_modes = [(k,v) for k, v in self.__sphere_contains_zero_dict.items() if v[0] is True]
+        possible_modes = np.flatnonzero(self.__sphere_contains_zero)
         if len(possible_modes) == 1:
-            self.mode_ids.append(possible_modes[0][0])
+            self.__prev_mode = possible_modes[0]
         elif len(possible_modes) == 0:
-            self.mode_ids.append("Unknown Mode") # unknown anomaly
-        elif len(self.mode_ids) >= 1:
-            val = min(possible_modes, key=self.__return_2nd_element)[1][1]
-            if (self.mode_ids[-1], (True, val)) in possible_modes:
-                # this logic represents the situation where faults and nominal data are indistinguishable 
-                self.mode_ids.append(self.mode_ids[-1])
-            else:
-                # multiple possible ID's -- return the one whose mean is closest to 0
-                self.mode_ids.append(min(possible_modes, key=self.__return_2nd_element)[0])
+            self.__prev_mode = -1 # unknown anomaly
         else:
-            val = min(possible_modes, key=self.__return_2nd_element)[1][1]
-            if ("Nominal", (True, val)) in possible_modes:
+            closest_mode = possible_modes[np.argmin(self.__mode_dists[possible_modes])]
+            val = self.__mode_dists[closest_mode]
+            # before the first ID, self.__prev_mode is "Nominal"
+            prev_mode = self.__prev_mode
+            if prev_mode >= 0 and self.__sphere_contains_zero[prev_mode] and self.__mode_dists[prev_mode] == val:
                 # this logic represents the situation where faults and nominal data are indistinguishable 
-                self.mode_ids.append("Nominal")
+                self.__prev_mode = prev_mode
             else:
                 # multiple possible ID's -- return the one whose mean is closest to 0
-                self.mode_ids.append(min(possible_modes, key=self.__return_2nd_element)[0])
+                self.__prev_mode = closest_mode
         return None
 
 class CSS_FaultIdentifier(FaultIdentifier):
@@ -190,17 +1624,12 @@ class CSS_FaultIdentifier(FaultIdentifier):
     def __init__(self, name: str, dim: int, sim_data: Dict[str,pd.DataFrame]):
         super(CSS_FaultIdentifier, self).__init__(name, dim)
         print("%s: Setting up..." %self._name)
-        for (key, df) in sim_data.items():
-            self._sim_data[key] = {}
-            self._innov_hist_dict[key] = collections.deque([])
-            css_telem = df[['Time (ns)',
-                            'CSS Cos Values  1 [-]', 'CSS Cos Values  2 [-]',
-                            'CSS Cos Values  3 [-]', 'CSS Cos Values  4 [-]', 
-                            'CSS Cos Values  5 [-]', 'CSS Cos Values  6 [-]', 
-                            'CSS Cos Values  7 [-]', 'CSS Cos Values  8 [-]']]
-            css_telem = css_telem.to_numpy();
-            for row in css_telem:
-                self._sim_data[key][row[0]] = np.resize(row[1:], (self._dim, 1))
+        self._set_sim_data(sim_data, ['CSS Cos Values  1 [-]', 'CSS Cos Values  2 [-]',
+                            'CSS Cos Values  3 [-]', 'CSS Cos Values  4 [-]',
+                            'CSS Cos Values  5 [-]', 'CSS Cos Values  6 [-]',
+                            'CSS Cos Values  7 [-]', 'CSS Cos Values  8 [-]'])
+        # most CSS faults only affect a single sensor
+        self._set_channel_families()
         print("%s: Set-Up Complete." %self._name)
 
     def _get_measurements(self, telemetry: pd.DataFrame) -> np.ndarray:
@@ -218,15 +1647,10 @@ class RW_Encoder_FaultIdentifier(FaultIdentifier):
     def __init__(self, name: str, dim: int, sim_data: Dict[str,pd.DataFrame]):
         super(RW_Encoder_FaultIdentifier, self).__init__(name, dim)
         print("%s: Setting up..." %self._name)
-        for (key, df) in sim_data.items():
-            self._sim_data[key] = {}
-            self._innov_hist_dict[key] = collections.deque([])
-            encoder_telem = df[['Time (ns)',
-                            'RW Omega  1 [rad/s]', 'RW Omega  2 [rad/s]',
-                            'RW Omega  3 [rad/s]', 'RW Omega  4 [rad/s]']]
-            encoder_telem = encoder_telem.to_numpy();
-            for row in encoder_telem:
-                self._sim_data[key][row[0]] = np.resize(row[1:], (self._dim, 1))
+        self._set_sim_data(sim_data, ['RW Omega  1 [rad/s]', 'RW Omega  2 [rad/s]',
+                            'RW Omega  3 [rad/s]', 'RW Omega  4 [rad/s]'])
+        # most RW encoder faults only affect a single wheel
+        self._set_channel_families()
         # since RW range is so large, we need to dramatically increase the noise params
         self.R = 250 * np.identity(self._dim)
         print("%s: Set-Up Complete." %self._name)
@@ -244,15 +1668,8 @@ class RW_Friction_FaultIdentifier(FaultIdentifier):
     def __init__(self, name: str, dim: int, sim_data: Dict[str,pd.DataFrame]):
         super(RW_Friction_FaultIdentifier, self).__init__(name, dim)
         print("%s: Setting up..." %self._name)
-        for (key, df) in sim_data.items():
-            self._sim_data[key] = {}
-            self._innov_hist_dict[key] = collections.deque([])
-            frict_telem = df[['Time (ns)',
-                            'RW Torque  1 [Nm]', 'RW Torque  2 [Nm]',
-                            'RW Torque  3 [Nm]', 'RW Torque  4 [Nm]']]
-            frict_telem = frict_telem.to_numpy();
-            for row in frict_telem:
-                self._sim_data[key][row[0]] = np.resize(row[1:], (self._dim, 1))
+        self._set_sim_data(sim_data, ['RW Torque  1 [Nm]', 'RW Torque  2 [Nm]',
+                            'RW Torque  3 [Nm]', 'RW Torque  4 [Nm]'])
         # this fault is VERY subtle
         self.R = 1E-20 * np.identity(self._dim)
         print("%s: Set-Up Complete." %self._name)
@@ -270,14 +1687,7 @@ class Panel_Deployment_FaultIdentifier(FaultIdentifier):
     def __init__(self, name: str, dim: int, sim_data: Dict[str,pd.DataFrame]):
         super(Panel_Deployment_FaultIdentifier, self).__init__(name, dim)
         print("%s: Setting up..." %self._name)
-        for (key, df) in sim_data.items():
-            self._sim_data[key] = {}
-            self._innov_hist_dict[key] = collections.deque([])
-            panel_telem = df[['Time (ns)',
-                            'Panel Angle [rad]', 'Panel Angle Rate [rad/s]']]
-            panel_telem = panel_telem.to_numpy();
-            for row in panel_telem:
-                self._sim_data[key][row[0]] = np.resize(row[1:], (self._dim, 1))
+        self._set_sim_data(sim_data, ['Panel Angle [rad]', 'Panel Angle Rate [rad/s]'])
         print("%s: Set-Up Complete." %self._name)
 
     def _get_measurements(self, telemetry: pd.DataFrame) -> np.ndarray:
@@ -292,13 +1702,7 @@ class Panel_Angle_FaultIdentifier(FaultIdentifier):
     def __init__(self, name: str, dim: int, sim_data: Dict[str,pd.DataFrame]):
         super(Panel_Angle_FaultIdentifier, self).__init__(name, dim)
         print("%s: Setting up... " %self._name)
-        for (key, df) in sim_data.items():
-            self._sim_data[key] = {}
-            self._innov_hist_dict[key] = collections.deque([])
-            panel_telem = df[['Time (ns)', 'Panel Angle [rad]']]
-            panel_telem = panel_telem.to_numpy();
-            for row in panel_telem:
-                self._sim_data[key][row[0]] = np.resize(row[1:], (self._dim, 1))
+        self._set_sim_data(sim_data, ['Panel Angle [rad]'])
         print("%s: Set-Up Complete." %self._name)
 
     def _get_measurements(self, telemetry: pd.DataFrame) -> np.ndarray:
@@ -312,13 +1716,7 @@ class Panel_Efficiency_FaultIdentifier(FaultIdentifier):
     def __init__(self, name: str, dim: int, sim_data: Dict[str,pd.DataFrame]):
         super(Panel_Efficiency_FaultIdentifier, self).__init__(name, dim)
         print("%s: Setting up..." %self._name)
-        for (key, df) in sim_data.items():
-            self._sim_data[key] = {}
-            self._innov_hist_dict[key] = collections.deque([])
-            panel_telem = df[['Time (ns)', 'Supply Power [W]']]
-            panel_telem = panel_telem.to_numpy();
-            for row in panel_telem:
-                self._sim_data[key][row[0]] = np.resize(row[1:], (self._dim, 1))
+        self._set_sim_data(sim_data, ['Supply Power [W]'])
         self.R = 1E-10 * np.identity(self._dim)
         print("%s: Set-Up Complete." %self._name)
 
@@ -333,13 +1731,7 @@ class Battery_Capacity_FaultIdentifier(FaultIdentifier):
     def __init__(self, name: str, dim: int, sim_data: Dict[str,pd.DataFrame]):
         super(Battery_Capacity_FaultIdentifier, self).__init__(name, dim)
         print("%s: Setting up..." %self._name)
-        for (key, df) in sim_data.items():
-            self._sim_data[key] = {}
-            self._innov_hist_dict[key] = collections.deque([])
-            batt_telem = df[['Time (ns)', 'Stored Energy [Ws]']]
-            batt_telem = batt_telem.to_numpy();
-            for row in batt_telem:
-                self._sim_data[key][row[0]] = np.resize(row[1:], (self._dim, 1))
+        self._set_sim_data(sim_data, ['Stored Energy [Ws]'])
         print("%s: Set-Up Complete." %self._name)
 
     def _get_measurements(self, telemetry: pd.DataFrame) -> np.ndarray:
@@ -353,13 +1745,7 @@ class Power_Sink_FaultIdentifier(FaultIdentifier):
     def __init__(self, name: str, dim: int, sim_data: Dict[str,pd.DataFrame]):
         super(Power_Sink_FaultIdentifier, self).__init__(name, dim)
         print("%s: Setting up..." %self._name)
-        for (key, df) in sim_data.items():
-            self._sim_data[key] = {}
-            self._innov_hist_dict[key] = collections.deque([])
-            power_telem = df[['Time (ns)', 'Net Power [W]']]
-            power_telem = power_telem.to_numpy();
-            for row in power_telem:
-                self._sim_data[key][row[0]] = np.resize(row[1:], (self._dim, 1))
+        self._set_sim_data(sim_data, ['Net Power [W]'])
         print("%s: Set-Up Complete." %self._name)
 
     def _get_measurements(self, telemetry: pd.DataFrame) -> np.ndarray:
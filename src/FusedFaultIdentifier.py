@@ -0,0 +1,118 @@
+"""
+# ISC License (ISC)
+
+# Copyright 2023 ARIA Systems Research, University of Colorado at Boulder
+
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+# Author: Justin Kottinger
+"""
+
+import time
+import pandas as pd
+import numpy as np
+from typing import Dict, List
+from src.FaultIdentifier import FaultIdentifier
+
+
+class FusedFaultIdentifier:
+    """ Runs several FaultIdentifiers (one per subsystem) in a single time loop. 
+    The union of their truth columns is extracted once into one contiguous 
+    matrix and the simulated measurements of every subsystem with the same 
+    measurement dimension are stacked into one bank, so every time step updates 
+    the innovation windows and distances of all subsystems with one array 
+    operation per dimension. The mode of every subsystem is decided afterwards 
+    with the same logic as FaultIdentifier (see FaultIdentifier._resolve_modes()), 
+    so the results are identical to running every FaultIdentifier on its own.
+    """
+    def __init__(self, testers: Dict[str, FaultIdentifier], name: str = "Fused Fault Identifier"):
+        print("%s: Setting up..." %name)
+        self._name = name
+        self.testers = testers
+        self.columns = []
+        for tester in testers.values():
+            self.columns += [column for column in tester._columns if column not in self.columns]
+        times = sorted(set().union(*[tester._time_index.keys() for tester in testers.values()]))
+        self._time_index = {t: idx for idx, t in enumerate(times)}
+        window_sizes = set()
+
+        # one bank per measurement dimension
+        self._banks = []
+        for dim in sorted(set(tester._dim for tester in testers.values()), reverse=True):
+            bank = {"dim": dim, "segments": [], "sim": [], "col_map": [], "s_inv": [], "threshold": []}
+            num_modes = 0
+            for test_key, tester in testers.items():
+                if tester._dim != dim:
+                    continue
+                assert tester._cursor == 0, "%s: %s has already been run." %(self._name, test_key)
+                s_inv, threshold, window_size = tester._innovation_weights()
+                window_sizes.add(window_size)
+                tester_rows = np.array([tester._time_index.get(t, -1) for t in times])
+                # times the tester does not know about are NaN, as in FaultIdentifier._set_sim_data()
+                sim = np.where(tester_rows[np.newaxis, :, np.newaxis] >= 0, tester._expected_measurements(tester_rows), np.nan)
+                bank["sim"].append(sim)
+                col_map = [self.columns.index(column) + 1 for column in tester._columns]
+                bank["col_map"].append(np.tile(col_map, (len(tester._modes), 1)))
+                bank["s_inv"].append(np.tile(s_inv, (len(tester._modes), 1)))
+                bank["threshold"].append(np.full(len(tester._modes), threshold))
+                bank["segments"].append((test_key, num_modes, num_modes + len(tester._modes)))
+                num_modes += len(tester._modes)
+            for key in ("sim", "col_map", "s_inv", "threshold"):
+                bank[key] = np.concatenate(bank[key])
+            self._banks.append(bank)
+        assert len(window_sizes) == 1, "%s: Every FaultIdentifier must share the window size." %self._name
+        self._window_size = window_sizes.pop()
+        print("%s: Set-Up Complete." %self._name)
+
+    def run_offline_fault_ID(self, truth_telem: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """ Runs the Fault ID algorithm of every subsystem on the truth telemetry data. 
+
+        Keyword arguments:
+        truth_telem: pandas.DataFrame -- the truth telemetry data
+
+        Output: Dict[str, np.ndarray] -- the mode ID codes (see FaultIdentifier.mode_labels) 
+        of every subsystem for every measurement
+        """
+        print("%s: Running Fault ID algorithm on %d subsystems." %(self._name, len(self.testers)))
+        start_time = time.time()
+        truth_meas = np.ascontiguousarray(truth_telem[['Time (ns)'] + self.columns].to_numpy())
+        num_times = truth_meas.shape[0]
+        window_size = self._window_size
+        windows = [np.zeros((len(bank["sim"]), window_size, bank["dim"])) for bank in self._banks]
+        mode_dists = [np.empty((num_times, len(bank["sim"]))) for bank in self._banks]
+        window_len = 0
+        for idx, meas in enumerate(truth_meas):
+            time_row = self._time_index[meas[0]]
+            for bank, window, dists in zip(self._banks, windows, mode_dists):
+                mode_innov = np.subtract(meas[bank["col_map"]], bank["sim"][:, time_row])
+                if window_len < window_size:
+                    window[:, window_len] = mode_innov
+                else:
+                    window[:, :-1] = window[:, 1:]
+                    window[:, -1] = mode_innov
+                mode_innov_mean = np.mean(window[:, :min(window_len + 1, window_size)], axis=1)
+                dists[idx] = np.sqrt(np.sum(mode_innov_mean * bank["s_inv"] * mode_innov_mean, axis=-1))
+            window_len = min(window_len + 1, window_size)
+
+        # decide the mode of every subsystem
+        mode_ids = {}
+        for bank, dists in zip(self._banks, mode_dists):
+            contains_zero = dists <= bank["threshold"]
+            for test_key, start, stop in bank["segments"]:
+                tester = self.testers[test_key]
+                mode_codes = FaultIdentifier._resolve_modes(contains_zero[:, start:stop], dists[:, start:stop], 
+                                                            tester._mode_index.get("Nominal", -1))
+                mode_ids[test_key] = tester._mode_codes[mode_codes]
+        mode_ids = {test_key: mode_ids[test_key] for test_key in self.testers}
+        print("%s: Fault ID completed in %0.3f seconds." %(self._name, (time.time() - start_time)))
+        return mode_ids
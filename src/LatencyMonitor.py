@@ -0,0 +1,154 @@
+"""
+# ISC License (ISC)
+
+# Copyright 2023 ARIA Systems Research, University of Colorado at Boulder
+
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+# Author: Justin Kottinger
+"""
+
+import os
+import numpy as np
+from typing import Dict, List
+
+
+# The upper bounds (in seconds) of the latency histogram buckets.
+LATENCY_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 1e-1, 1.0)
+# The phases of a FaultIdentifier step, followed by the whole step.
+LATENCY_PHASES = ("lookup", "window", "distance", "decision", "total")
+
+class LatencyMonitor:
+    """ Keeps fixed-bucket histograms of the per-sample latency of every 
+    FaultIdentifier (see FaultIdentifier.set_monitor()), broken down by phase: 
+        lookup -- finding the time step and shaping the measurement
+        window -- updating the innovation windows
+        distance -- the Mahalanobis distances and chi-squared tests
+        decision -- the mode ID (and recording, gating and ranking)
+    A step only hands over its time stamps, which are buffered and binned 
+    in bulk, so the monitor costs a few percent of a step. The histograms, 
+    the queue depth and the number of dropped samples of every subsystem are 
+    periodically written to metrics_path in the Prometheus text format 
+    (e.g. for the textfile collector of node_exporter).
+    """
+    def __init__(self, metrics_path: str, interval: float = 10.0, buckets: List[float] = LATENCY_BUCKETS, 
+                capacity: int = 1024, name: str = "Latency Monitor"):
+        assert capacity >= 1, "The buffer capacity must be at least 1."
+        self.metrics_path = metrics_path
+        self.interval = interval
+        self.buckets = tuple(buckets)
+        self.__bounds_ns = np.array(self.buckets) * 1e9
+        self.__capacity = capacity
+        self.__name = name
+        self.__interval_ns = int(interval * 1e9)
+        self.__next_write_ns = None
+        # subsystem -> the flat list of the time stamps of the buffered steps
+        self.__stamps = {}
+        self.__counts = {}
+        self.__sums = {}
+        self.__queue_depth = {}
+        self.__dropped = {}
+        directory = os.path.dirname(self.metrics_path)
+        if directory != "" and not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def register(self, subsystem: str) -> None:
+        """ Adds the (empty) histograms of subsystem. Registering it again keeps its histograms. """
+        if subsystem not in self.__stamps:
+            self.__stamps[subsystem] = []
+            self.__counts[subsystem] = np.zeros((len(LATENCY_PHASES), len(self.buckets) + 1), dtype=np.int64)
+            self.__sums[subsystem] = np.zeros(len(LATENCY_PHASES), dtype=np.int64)
+            self.__queue_depth[subsystem] = 0
+            self.__dropped[subsystem] = 0
+        return None
+
+    def record(self, subsystem: str, stamps: List[int]) -> None:
+        """ Records one step of subsystem. 
+
+        Keyword arguments:
+        subsystem: str -- the registered subsystem
+        stamps: List[int] -- the time.perf_counter_ns() at the start of the step and at the end of every phase
+        """
+        buffer = self.__stamps[subsystem]
+        buffer.extend(stamps)
+        if len(buffer) >= self.__capacity * len(LATENCY_PHASES):
+            self.__bin(subsystem)
+        if self.__next_write_ns is None:
+            self.__next_write_ns = stamps[-1] + self.__interval_ns
+        elif stamps[-1] >= self.__next_write_ns:
+            self.flush()
+            self.__next_write_ns = stamps[-1] + self.__interval_ns
+        return None
+
+    def set_queue_depth(self, subsystem: str, depth: int) -> None:
+        """ Sets the number of samples of subsystem that wait to be processed. """
+        self.__queue_depth[subsystem] = depth
+        return None
+
+    def count_dropped(self, subsystem: str, num_samples: int = 1) -> None:
+        """ Counts num_samples samples of subsystem that were dropped without being processed. """
+        self.__dropped[subsystem] += num_samples
+        return None
+
+    def get_histograms(self) -> Dict[str, np.ndarray]:
+        """ Returns the (len(LATENCY_PHASES), len(self.buckets) + 1) non-cumulative 
+        bucket counts of every subsystem (the last bucket is +Inf). 
+        """
+        for subsystem in self.__stamps:
+            self.__bin(subsystem)
+        return {subsystem: counts.copy() for subsystem, counts in self.__counts.items()}
+
+    def flush(self) -> None:
+        """ Bins the buffered steps and atomically rewrites self.metrics_path. """
+        histograms = self.get_histograms()
+        lines = ["# HELP mbfid_step_latency_seconds Per-sample Fault ID latency by subsystem and phase.", 
+                 "# TYPE mbfid_step_latency_seconds histogram"]
+        for subsystem, counts in histograms.items():
+            cumulative_counts = np.cumsum(counts, axis=1)
+            for phase_idx, phase in enumerate(LATENCY_PHASES):
+                labels = 'subsystem="%s",phase="%s"' %(subsystem, phase)
+                for bound, count in zip(self.buckets + ("+Inf",), cumulative_counts[phase_idx]):
+                    lines.append('mbfid_step_latency_seconds_bucket{%s,le="%s"} %d' %(labels, bound, count))
+                lines.append("mbfid_step_latency_seconds_sum{%s} %.9f" %(labels, self.__sums[subsystem][phase_idx] * 1e-9))
+                lines.append("mbfid_step_latency_seconds_count{%s} %d" %(labels, cumulative_counts[phase_idx, -1]))
+        lines += ["# HELP mbfid_queue_depth Samples waiting to be processed.", "# TYPE mbfid_queue_depth gauge"]
+        lines += ['mbfid_queue_depth{subsystem="%s"} %d' %(subsystem, depth) for subsystem, depth in self.__queue_depth.items()]
+        lines += ["# HELP mbfid_samples_dropped_total Samples dropped without being processed.", 
+                  "# TYPE mbfid_samples_dropped_total counter"]
+        lines += ['mbfid_samples_dropped_total{subsystem="%s"} %d' %(subsystem, dropped) for subsystem, dropped in self.__dropped.items()]
+        with open(self.metrics_path + ".tmp", "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(self.metrics_path + ".tmp", self.metrics_path)
+        return None
+
+    def close(self) -> None:
+        """ Writes the final metrics. """
+        self.flush()
+        print("%s: Saved the latency metrics to %s." %(self.__name, self.metrics_path))
+        return None
+
+    def __bin(self, subsystem: str) -> None:
+        """ Adds the buffered steps of subsystem to its histograms and empties its buffer. """
+        if len(self.__stamps[subsystem]) == 0:
+            return None
+        stamps = np.array(self.__stamps[subsystem], dtype=np.int64).reshape(-1, len(LATENCY_PHASES))
+        num_steps = len(stamps)
+        latencies = np.empty((num_steps, len(LATENCY_PHASES)), dtype=np.int64)
+        latencies[:, :-1] = np.diff(stamps, axis=1)
+        latencies[:, -1] = stamps[:, -1] - stamps[:, 0]
+        bucket_idx = np.searchsorted(self.__bounds_ns, latencies, side="left")
+        for phase_idx in range(len(LATENCY_PHASES)):
+            self.__counts[subsystem][phase_idx] += np.bincount(bucket_idx[:, phase_idx], minlength=len(self.buckets) + 1)
+        self.__sums[subsystem] += latencies.sum(axis=0)
+        self.__stamps[subsystem].clear()
+        return None
@@ -0,0 +1,95 @@
+"""
+# ISC License (ISC)
+
+# Copyright 2023 ARIA Systems Research, University of Colorado at Boulder
+
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+# Author: Justin Kottinger
+"""
+
+import os
+import pickle
+import numpy as np
+
+
+class ResultCache:
+    """ A content-addressed cache of Fault ID results. Results are 
+    stored per scope (e.g. "CSS_ID") under a key that hashes every input 
+    of the FaultIdentifier (see FaultIdentifier.content_hash()), so a 
+    hit is only possible if the simulation database, the truth telemetry 
+    data and the noise parameters of that test are unchanged. The 
+    least recently used results are evicted once the cache grows beyond 
+    max_size bytes.
+    """
+    def __init__(self, cache_dir: str, max_size: int = 512 * 2**20, name: str = "Result Cache"):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.__name = name
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    def __path(self, scope: str, key: str) -> str:
+        """ Returns the file holding the results of scope and key. """
+        return os.path.join(self.cache_dir, scope, key + ".pkl")
+
+    def get(self, scope: str, key: str) -> np.ndarray:
+        """ Returns the cached mode ID codes of scope and key, or None on a miss. 
+
+        Keyword arguments:
+        scope: str -- the test type (e.g. "CSS_ID")
+        key: str -- the content hash of the test inputs
+        """
+        path = self.__path(scope, key)
+        if not os.path.isfile(path):
+            return None
+        with open(path, "rb") as f:
+            mode_ids = pickle.load(f)
+        # mark the entry as recently used
+        os.utime(path)
+        print("%s: Found the %s results in the cache." %(self.__name, scope))
+        return mode_ids
+
+    def put(self, scope: str, key: str, mode_ids: np.ndarray) -> None:
+        """ Stores the mode ID codes of scope and key and evicts old entries if needed. 
+
+        Keyword arguments:
+        scope: str -- the test type (e.g. "CSS_ID")
+        key: str -- the content hash of the test inputs
+        mode_ids: numpy.ndarray -- the mode ID codes to cache (see FaultIdentifier.mode_labels)
+        """
+        path = self.__path(scope, key)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(mode_ids, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+        self.__evict()
+        return None
+
+    def __evict(self) -> None:
+        """ Removes the least recently used entries until the cache is at most self.max_size bytes. """
+        entries = []
+        for dir_path, dir_names, file_names in os.walk(self.cache_dir):
+            for file_name in file_names:
+                if file_name.endswith(".pkl"):
+                    stat = os.stat(os.path.join(dir_path, file_name))
+                    entries.append((stat.st_mtime, stat.st_size, os.path.join(dir_path, file_name)))
+        cache_size = sum(entry[1] for entry in entries)
+        for mtime, size, path in sorted(entries):
+            if cache_size <= self.max_size:
+                break
+            os.remove(path)
+            cache_size -= size
+            print("%s: Evicted %s." %(self.__name, path))
+        return None
@@ -0,0 +1,203 @@
+"""
+# ISC License (ISC)
+
+# Copyright 2023 ARIA Systems Research, University of Colorado at Boulder
+
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+# Author: Justin Kottinger
+"""
+
+import os
+import csv
+import json
+import time
+import shutil
+import numpy as np
+import pandas as pd
+from typing import List
+
+
+class ResultsColumn:
+    """ Streams the mode ID codes of one Fault ID test (one results column) 
+    to <column>.codes in fixed-size blocks, next to <column>.json which holds 
+    the mode labels and the code dtype. Every block is written as soon as it 
+    is full and the file is flushed at least every flush_interval seconds, so 
+    the results written so far survive an interruption. Every code is repeated 
+    repeat times (e.g. to hold the decisions of a decimated test) and at most 
+    num_rows codes are kept. 
+    """
+    def __init__(self, path: str, mode_labels: List[str], dtype, block_size: int = 4096, 
+                flush_interval: float = 5.0, repeat: int = 1, num_rows: int = None):
+        assert block_size >= 1, "The block size must be at least 1."
+        self.path = path
+        self.mode_labels = list(mode_labels)
+        self.dtype = np.dtype(dtype)
+        self.flush_interval = flush_interval
+        self.repeat = repeat
+        self.num_rows = num_rows
+        self.rows_written = 0
+        self.__buffer = np.empty(block_size, dtype=self.dtype)
+        self.__fill = 0
+        self.__next_flush = time.monotonic() + flush_interval
+        with open(self.path + ".json", "w") as f:
+            json.dump({"labels": self.mode_labels, "dtype": self.dtype.str}, f)
+        self.__file = open(self.path + ".codes", "wb")
+
+    def write(self, codes) -> None:
+        """ Appends a single code or an array of codes. """
+        if np.ndim(codes) == 0 and self.repeat == 1:
+            # a single decision of a streaming identifier
+            self.__buffer[self.__fill] = codes
+            self.__fill += 1
+            if self.__fill == len(self.__buffer):
+                self.__write_block()
+            if time.monotonic() >= self.__next_flush:
+                self.flush()
+            return None
+        codes = np.atleast_1d(codes)
+        if self.repeat > 1:
+            codes = np.repeat(codes, self.repeat)
+        while len(codes) > 0:
+            num_codes = min(len(codes), len(self.__buffer) - self.__fill)
+            self.__buffer[self.__fill:self.__fill + num_codes] = codes[:num_codes]
+            self.__fill += num_codes
+            codes = codes[num_codes:]
+            if self.__fill == len(self.__buffer):
+                self.__write_block()
+        if time.monotonic() >= self.__next_flush:
+            self.flush()
+        return None
+
+    def flush(self) -> None:
+        """ Writes the buffered codes and flushes the file. """
+        self.__write_block()
+        self.__file.flush()
+        self.__next_flush = time.monotonic() + self.flush_interval
+        return None
+
+    def close(self) -> None:
+        """ Writes the buffered codes and closes the file. """
+        self.flush()
+        if self.num_rows is not None and self.rows_written > self.num_rows:
+            self.__file.truncate(self.num_rows * self.dtype.itemsize)
+            self.rows_written = self.num_rows
+        self.__file.close()
+        return None
+
+    def __write_block(self) -> None:
+        """ Writes the buffered codes to the file. """
+        self.__buffer[:self.__fill].tofile(self.__file)
+        self.rows_written += self.__fill
+        self.__fill = 0
+        return None
+
+
+class ResultsWriter:
+    """ Writes the Fault ID results of one example while the identifiers run 
+    instead of assembling them in memory. Every test streams its codes into a 
+    ResultsColumn (see self.open_column()) inside <results_dir>/<example ID>.parts/. 
+    self.close() then either merges the columns block by block into 
+    <results_dir>/<example ID>.csv (fmt "csv", see TestManager.export_results()) 
+    or keeps them as <results_dir>/<example ID>.bin/ (fmt "binary", see 
+    read_binary_results()). Memory use does not grow with the length of the run 
+    and an interrupted run leaves the results written so far in the .parts directory.
+    """
+    def __init__(self, results_dir: str, example_id: str, times: np.ndarray, fmt: str = "csv", 
+                block_size: int = 4096, flush_interval: float = 5.0, name: str = "Results Writer"):
+        assert fmt in ("csv", "binary"), "Unknown results format %s." %fmt
+        self.results_dir = results_dir
+        self.example_id = example_id
+        self.fmt = fmt
+        self.block_size = block_size
+        self.flush_interval = flush_interval
+        self.num_rows = len(times)
+        self.columns = {}
+        self.__name = name
+        self.__parts_dir = os.path.join(results_dir, example_id + ".parts")
+        if os.path.exists(self.__parts_dir):
+            shutil.rmtree(self.__parts_dir)
+        os.makedirs(self.__parts_dir)
+        np.save(os.path.join(self.__parts_dir, "times.npy"), np.asarray(times))
+
+    def open_column(self, column: str, mode_labels: List[str], dtype, repeat: int = 1) -> ResultsColumn:
+        """ Starts the results column of a test (e.g. "CSS_ID"). Columns keep the order they are opened in. 
+
+        Keyword arguments:
+        column: str -- the column name
+        mode_labels: List[str] -- the label of every code
+        dtype -- the dtype of the codes
+        repeat: int -- every code is repeated this many times (see ResultsColumn)
+
+        Output: ResultsColumn -- the column to write the codes to
+        """
+        with open(os.path.join(self.__parts_dir, "columns.txt"), "a") as f:
+            f.write(column + "\n")
+        self.columns[column] = ResultsColumn(os.path.join(self.__parts_dir, column), mode_labels, dtype, 
+                                             self.block_size, self.flush_interval, repeat, self.num_rows)
+        return self.columns[column]
+
+    def close(self) -> str:
+        """ Closes every column and writes the final results. 
+
+        Output: str -- the path of the results
+        """
+        for column in self.columns.values():
+            column.close()
+            assert column.rows_written == self.num_rows, \
+                "%s: %s holds %d of %d rows." %(self.__name, column.path, column.rows_written, self.num_rows)
+        if self.fmt == "binary":
+            results_path = os.path.join(self.results_dir, self.example_id + ".bin")
+            if os.path.exists(results_path):
+                shutil.rmtree(results_path)
+            os.replace(self.__parts_dir, results_path)
+            return results_path
+        results_path = os.path.join(self.results_dir, self.example_id + ".csv")
+        times = np.load(os.path.join(self.__parts_dir, "times.npy"), mmap_mode="r")
+        labels = [np.array(column.mode_labels, dtype=object) for column in self.columns.values()]
+        code_files = [open(column.path + ".codes", "rb") for column in self.columns.values()]
+        try:
+            with open(results_path + ".tmp", "w", newline="") as f:
+                writer = csv.writer(f, lineterminator="\n")
+                writer.writerow(["Time (ns)"] + list(self.columns.keys()))
+                for start in range(0, self.num_rows, self.block_size):
+                    block_times = times[start:start + self.block_size].tolist()
+                    block_labels = [column_labels[np.fromfile(code_file, dtype=column.dtype, count=len(block_times))] 
+                                    for column_labels, code_file, column 
+                                    in zip(labels, code_files, self.columns.values())]
+                    writer.writerows(zip(block_times, *block_labels))
+        finally:
+            for code_file in code_files:
+                code_file.close()
+        os.replace(results_path + ".tmp", results_path)
+        shutil.rmtree(self.__parts_dir)
+        return results_path
+
+
+def read_binary_results(results_path: str) -> pd.DataFrame:
+    """ Reads results written with fmt "binary" (or the .parts directory of an 
+    interrupted run) as a pandas.DataFrame of categorical mode ID's indexed by 
+    'Time (ns)'. Rows a column did not reach yet are missing (NaN). 
+    """
+    times = np.load(os.path.join(results_path, "times.npy"))
+    with open(os.path.join(results_path, "columns.txt")) as f:
+        columns = f.read().splitlines()
+    results = {}
+    for column in columns:
+        with open(os.path.join(results_path, column + ".json")) as f:
+            header = json.load(f)
+        codes = np.full(len(times), -1, dtype=int)
+        written = np.fromfile(os.path.join(results_path, column + ".codes"), dtype=header["dtype"])
+        codes[:len(written)] = written
+        results[column] = pd.Categorical.from_codes(codes, categories=header["labels"])
+    return pd.DataFrame(results, index=pd.Index(times, name="Time (ns)"))
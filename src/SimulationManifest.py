@@ -0,0 +1,220 @@
+"""
+# ISC License (ISC)
+
+# Copyright 2023 ARIA Systems Research, University of Colorado at Boulder
+
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+# Author: Justin Kottinger
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+
+class SimulationManifest:
+    """ Keeps track of the modes of a simulation database so that only new 
+    or changed modes are parsed again. The manifest records, for every mode 
+    directory, its parsed identity, the size and modification time of its 
+    telemetry.csv and the location of the cached telemetry array. If cache_dir 
+    is None, the manifest only lives in memory (e.g. for a long-running process 
+    that watches the database); otherwise it is persisted as 
+    <cache_dir>/<database>/manifest.json next to one <mode>.npy array per mode, 
+    where <database> is the SHA-1 of the absolute path to the simulation database, 
+    so several databases can share one cache directory. Truth telemetry read through self.read_truth() is cached the same way 
+    in <cache_dir>/truth/. New or changed modes are parsed concurrently by 
+    num_workers threads (the CSV parser of pandas releases the GIL).
+    """
+    def __init__(self, sim_dir_path: str, cache_dir: str = None, 
+                identify: Callable[[str], Dict[str, str]] = None, num_workers: int = 1, 
+                name: str = "Simulation Manifest"):
+        assert num_workers >= 1, "There must be at least one worker."
+        self.sim_dir_path = sim_dir_path
+        self.cache_dir = cache_dir
+        self.identify = identify
+        self.num_workers = num_workers
+        self.__name = name
+        self.entries = {}
+        self.truth_entries = {}
+        if self.cache_dir is not None:
+            if not os.path.exists(os.path.join(self.cache_dir, "truth")):
+                os.makedirs(os.path.join(self.cache_dir, "truth"))
+            if not os.path.exists(os.path.join(self.cache_dir, self.__database_key())):
+                os.makedirs(os.path.join(self.cache_dir, self.__database_key()))
+            if os.path.isfile(self.__manifest_path()):
+                with open(self.__manifest_path()) as f:
+                    self.entries = json.load(f)
+            if os.path.isfile(self.__truth_manifest_path()):
+                with open(self.__truth_manifest_path()) as f:
+                    self.truth_entries = json.load(f)
+
+    def __database_key(self) -> str:
+        """ Returns the subdirectory of self.cache_dir the manifest and the cached arrays of this simulation database live in. """
+        return hashlib.sha1(os.path.abspath(self.sim_dir_path).encode()).hexdigest()
+
+    def __manifest_path(self) -> str:
+        """ Returns the file the manifest is persisted to. """
+        return os.path.join(self.cache_dir, self.__database_key(), "manifest.json")
+
+    def __truth_manifest_path(self) -> str:
+        """ Returns the file the entries of the cached truth telemetry are persisted to. """
+        return os.path.join(self.cache_dir, "truth", "manifest.json")
+
+    def scan(self, sim_telem_dict: Dict[str, pd.DataFrame]) -> Tuple[List[str], List[str], List[str]]:
+        """ Brings sim_telem_dict (mode directory name -> telemetry data) up to 
+        date with the simulation database. Unchanged modes are kept (or loaded from 
+        their cached array), new or changed modes are parsed and removed modes are 
+        dropped. The modes keep the order of os.walk(). 
+
+        Keyword arguments:
+        sim_telem_dict: Dict[str, pandas.DataFrame] -- the telemetry data of every mode (updated in place)
+
+        Output: Tuple[List[str], List[str], List[str]] -- the added, changed and removed modes
+
+        Raises ValueError (after reporting every mode that failed) if a mode 
+        could not be parsed. sim_telem_dict is not modified in that case.
+        """
+        added, changed = [], []
+        entries = {}
+        # every mode gets a slot in os.walk() order, the modes to parse fill theirs concurrently
+        modes, slots, to_parse = [], [], []
+        for mode_dir_path in [x[0] for x in os.walk(self.sim_dir_path)][1:]:
+            mode = os.path.basename(mode_dir_path)
+            mode_telem_path = mode_dir_path + "/telemetry.csv"
+            modes.append(mode)
+            slots.append(None)
+            try:
+                stat = os.stat(mode_telem_path)
+            except OSError:
+                # parsing reports the missing file
+                to_parse.append((len(slots) - 1, mode, mode_telem_path, None))
+                continue
+            entry = self.entries.get(mode)
+            if entry is not None and entry["path"] == mode_telem_path and entry["size"] == stat.st_size \
+                and entry["mtime_ns"] == stat.st_mtime_ns and self.__is_cached(mode, entry, sim_telem_dict):
+                if mode in sim_telem_dict:
+                    slots[-1] = sim_telem_dict[mode]
+                else:
+                    slots[-1] = self.__load_array(entry["array"])
+                entries[mode] = entry
+                continue
+            to_parse.append((len(slots) - 1, mode, mode_telem_path, stat))
+
+        failures = {}
+        with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+            futures = [executor.submit(self.__parse_mode, mode, mode_telem_path) 
+                       for _, mode, mode_telem_path, _ in to_parse]
+            for (slot, mode, mode_telem_path, stat), future in zip(to_parse, futures):
+                try:
+                    slots[slot], array_path = future.result()
+                except (OSError, ValueError) as error:
+                    failures[mode] = error
+                    print("%s: Could not parse %s (%s: %s)." 
+                          %(self.__name, mode_telem_path, type(error).__name__, error))
+                    continue
+                entries[mode] = {"path": mode_telem_path, 
+                                 "identity": self.identify(mode) if self.identify is not None else None,
+                                 "size": stat.st_size, 
+                                 "mtime_ns": stat.st_mtime_ns, 
+                                 "array": array_path}
+                if mode in self.entries:
+                    changed.append(mode)
+                else:
+                    added.append(mode)
+        if len(failures) > 0:
+            raise ValueError("%d of %d modes of %s could not be parsed: %s" 
+                             %(len(failures), len(modes), self.sim_dir_path, ", ".join(failures)))
+        scanned_telem = dict(zip(modes, slots))
+        removed = [mode for mode in self.entries if mode not in entries]
+        for mode in removed:
+            if self.entries[mode]["array"] is not None and os.path.isfile(self.entries[mode]["array"]):
+                os.remove(self.entries[mode]["array"])
+        self.entries = entries
+        sim_telem_dict.clear()
+        sim_telem_dict.update(scanned_telem)
+        self.__save()
+        if len(added) + len(changed) + len(removed) > 0:
+            print("%s: %d new, %d changed and %d removed modes." %(self.__name, len(added), len(changed), len(removed)))
+        return added, changed, removed
+
+    def read_truth(self, telem_csv_path: str) -> pd.DataFrame:
+        """ Reads the truth telemetry data found at telem_csv_path. The parsed data 
+        is cached as a record array, so an unchanged telemetry.csv is only parsed once. 
+
+        Keyword arguments:
+        telem_csv_path: str -- the path to the telemetry.csv file
+
+        Output: pandas.DataFrame -- the truth telemetry data
+        """
+        stat = os.stat(telem_csv_path)
+        key = os.path.abspath(telem_csv_path)
+        entry = self.truth_entries.get(key)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns \
+            and os.path.isfile(entry["array"]):
+            return self.__load_array(entry["array"])
+        telem_df = pd.read_csv(telem_csv_path)
+        telem_df.rename( columns={'Unnamed: 0':'Time (ns)'}, inplace=True )
+        if self.cache_dir is not None:
+            name = os.path.join("truth", hashlib.sha1(key.encode()).hexdigest())
+            self.truth_entries[key] = {"size": stat.st_size, 
+                                       "mtime_ns": stat.st_mtime_ns, 
+                                       "array": self.__cache_array(name, telem_df)}
+            with open(self.__truth_manifest_path() + ".tmp", "w") as f:
+                json.dump(self.truth_entries, f, indent=1)
+            os.replace(self.__truth_manifest_path() + ".tmp", self.__truth_manifest_path())
+        return telem_df
+
+    def __parse_mode(self, mode: str, mode_telem_path: str) -> Tuple[pd.DataFrame, str]:
+        """ Parses the telemetry.csv file of mode (on a worker thread) and caches it. 
+
+        Output: Tuple[pandas.DataFrame, str] -- the telemetry data and the path to its cached array
+        """
+        mode_telem_df = pd.read_csv(mode_telem_path)
+        mode_telem_df.rename( columns={'Unnamed: 0':'Time (ns)'}, inplace=True )
+        return mode_telem_df, self.__cache_array(os.path.join(self.__database_key(), mode), mode_telem_df)
+
+    @staticmethod
+    def __load_array(path: str) -> pd.DataFrame:
+        """ Loads a cached record array into a pandas.DataFrame (one column per field). """
+        records = np.load(path)
+        return pd.DataFrame({column: records[column] for column in records.dtype.names}, copy=False)
+
+    def __is_cached(self, mode: str, entry: Dict[str, object], sim_telem_dict: Dict[str, pd.DataFrame]) -> bool:
+        """ Returns True if the telemetry data of mode is still loaded or its cached array can be reloaded. """
+        if mode in sim_telem_dict:
+            return True
+        return entry["array"] is not None and os.path.isfile(entry["array"])
+
+    def __cache_array(self, name: str, mode_telem_df: pd.DataFrame) -> str:
+        """ Stores telemetry data as a record array under name and returns its path (None without a cache). """
+        if self.cache_dir is None:
+            return None
+        path = os.path.join(self.cache_dir, name + ".npy")
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, mode_telem_df.to_records(index=False), allow_pickle=False)
+        os.replace(path + ".tmp", path)
+        return path
+
+    def __save(self) -> None:
+        """ Atomically persists the manifest (if there is a cache directory). """
+        if self.cache_dir is None:
+            return None
+        with open(self.__manifest_path() + ".tmp", "w") as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(self.__manifest_path() + ".tmp", self.__manifest_path())
+        return None
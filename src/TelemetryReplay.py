@@ -0,0 +1,125 @@
+"""
+# ISC License (ISC)
+
+# Copyright 2023 ARIA Systems Research, University of Colorado at Boulder
+
+# Permission to use, copy, modify, and/or distribute this software for any
+# purpose with or without fee is hereby granted, provided that the above
+# copyright notice and this permission notice appear in all copies.
+
+# THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES
+# WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF
+# MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR
+# ANY SPECIAL, DIRECT, INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES
+# WHATSOEVER RESULTING FROM LOSS OF USE, DATA OR PROFITS, WHETHER IN AN
+# ACTION OF CONTRACT, NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF
+# OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+
+# Author: Justin Kottinger
+"""
+
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict
+from src.FaultIdentifier import FaultIdentifier
+
+
+class TelemetryReplay:
+    """ Replays truth telemetry into the incremental ("streaming") path of 
+    FaultIdentifiers (see FaultIdentifier.process_measurement()) to test 
+    whether streaming fault ID keeps up with the telemetry rate. Every 
+    sample is handed to every identifier in turn. The replay clock releases 
+    sample i at (t_i - t_0) / speed seconds after the start (speed 0 releases 
+    every sample as soon as the previous one is processed) plus a uniformly 
+    distributed delay of up to jitter seconds. Samples are delivered in order. 
+    If more than max_queue samples are waiting, the oldest ones are dropped. 
+    At speed 0 no sample ever waits, so jitter and max_queue require a speed above 0. 
+    The replay reports the sustained samples per second, the lag of every 
+    processed sample behind the replay clock and the dropped samples.
+    """
+    def __init__(self, testers: Dict[str, FaultIdentifier], truth_telem: pd.DataFrame, speed: float = 0.0, 
+                loops: int = 1, jitter: float = 0.0, max_queue: int = None, seed: int = None, 
+                monitor=None, name: str = "Telemetry Replay"):
+        assert speed >= 0, "The replay speed must not be negative."
+        assert loops >= 1, "The telemetry must be replayed at least once."
+        assert jitter >= 0, "The jitter must not be negative."
+        assert max_queue is None or max_queue >= 1, "The queue must hold at least one sample."
+        assert speed > 0 or (jitter == 0 and max_queue is None), "Jitter and a bounded queue require a replay speed above 0."
+        self.testers = testers
+        self.speed = speed
+        self.loops = loops
+        self.jitter = jitter
+        self.max_queue = max_queue
+        self.monitor = monitor
+        self.__name = name
+        self.__truth_meas = [tester._get_measurements(truth_telem) for tester in testers.values()]
+        times = truth_telem["Time (ns)"].to_numpy(dtype=float) * 1e-9
+        self.__num_samples = len(times) * loops
+        self.__release = np.zeros(self.__num_samples)
+        if speed > 0:
+            # every loop starts one sample period after the end of the previous one
+            period = np.median(np.diff(times)) if len(times) > 1 else 0.0
+            loop_offsets = np.arange(loops)[:, np.newaxis] * (times[-1] - times[0] + period)
+            self.__release = ((times - times[0]) + loop_offsets).ravel() / speed
+        rng = np.random.default_rng(seed)
+        # a sample is only delivered once every sample before it was delivered
+        self.__available = np.maximum.accumulate(self.__release + rng.uniform(0.0, jitter, self.__num_samples))
+
+    def run(self) -> Dict[str, float]:
+        """ Replays the telemetry. 
+
+        Output: Dict[str, float] -- the "samples", "processed" and "dropped" samples, 
+        the "elapsed" seconds, the sustained "samples_per_s" and the "mean_lag", "p99_lag" 
+        and "max_lag" (in seconds) of the processed samples behind the replay clock
+        """
+        print("%s: Replaying %d samples at %s." 
+            %(self.__name, self.__num_samples, "%gx real time" %self.speed if self.speed > 0 else "maximum speed"))
+        testers = list(self.testers.values())
+        for tester in testers:
+            tester.reserve(tester._cursor + self.__num_samples)
+        num_times = len(self.__truth_meas[0])
+        lags = np.empty(self.__num_samples)
+        num_processed = 0
+        num_dropped = 0
+        idx = 0
+        start_time = time.perf_counter()
+        while idx < self.__num_samples:
+            if self.speed > 0:
+                now = time.perf_counter() - start_time
+                if self.__available[idx] > now:
+                    time.sleep(self.__available[idx] - now)
+                    now = time.perf_counter() - start_time
+                queue_depth = np.searchsorted(self.__available, now, side="right") - idx
+                if self.max_queue is not None and queue_depth > self.max_queue:
+                    num_dropped += queue_depth - self.max_queue
+                    if self.monitor is not None:
+                        for tester in testers:
+                            self.monitor.count_dropped(tester._name, queue_depth - self.max_queue)
+                    idx += queue_depth - self.max_queue
+                    queue_depth = self.max_queue
+                if self.monitor is not None:
+                    for tester in testers:
+                        self.monitor.set_queue_depth(tester._name, queue_depth - 1)
+            row = idx % num_times
+            for tester, truth_meas in zip(testers, self.__truth_meas):
+                tester.process_measurement(truth_meas[row, 0], truth_meas[row, 1:])
+            lags[num_processed] = time.perf_counter() - start_time - self.__release[idx]
+            num_processed += 1
+            idx += 1
+        elapsed = time.perf_counter() - start_time
+        lags = lags[:num_processed] if self.speed > 0 else np.zeros(num_processed)
+        report = {"samples": self.__num_samples, 
+                  "processed": num_processed, 
+                  "dropped": num_dropped, 
+                  "elapsed": elapsed, 
+                  "samples_per_s": num_processed / elapsed if elapsed > 0 else np.inf, 
+                  "mean_lag": float(np.mean(lags)) if num_processed > 0 else 0.0, 
+                  "p99_lag": float(np.percentile(lags, 99)) if num_processed > 0 else 0.0, 
+                  "max_lag": float(np.max(lags)) if num_processed > 0 else 0.0}
+        print("%s: Processed %d of %d samples in %0.3f seconds (%0.1f samples/s), dropped %d." 
+            %(self.__name, num_processed, self.__num_samples, elapsed, report["samples_per_s"], num_dropped))
+        if self.speed > 0:
+            print("%s: Lag behind the replay clock: mean %0.4f s, p99 %0.4f s, max %0.4f s." 
+                %(self.__name, report["mean_lag"], report["p99_lag"], report["max_lag"]))
+        return report
@@ -19,22 +19,97 @@
 """
 
 import os
+import threading
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
 from src.FaultIdentifier import *
-
+from src.ResultCache import ResultCache
+from src.DistanceRecorder import DistanceRecorder
+from src.LatencyMonitor import LatencyMonitor
+from src.FusedFaultIdentifier import FusedFaultIdentifier
+from src.SimulationManifest import SimulationManifest
+from src.TelemetryReplay import TelemetryReplay
+from src.ResultsWriter import ResultsWriter
+from src import results_2_stats
+
+
+# The Fault ID subsystems in the order they are set up:
+# (test type, FaultIdentifier, tester name, measurement dimension, 
+#  keyword of the simulated fault directories, TestManager mode naming function)
+# The measured columns and the noise settings are owned by every FaultIdentifier.
+SUBSYSTEMS = [("CSS_ID", CSS_FaultIdentifier, "CSS Fault Tester", 8, "CssSignalFault", "name_css_mode"),
+              ("RW_ENCODER_ID", RW_Encoder_FaultIdentifier, "RW Encoder Tester", 4, "RwEncoderFault", "name_rw_encoder_mode"),
+              ("RW_FRICTION_ID", RW_Friction_FaultIdentifier, "RW Friction Tester", 4, "RwFrictionFault", "name_rw_friction_mode"),
+              ("PANEL_DEPLOY_ID", Panel_Deployment_FaultIdentifier, "Panel Deployment Tester", 2, "PanelDeploymentFault", "name_panel_deployment_mode"),
+              ("PANEL_ANGLE_ID", Panel_Angle_FaultIdentifier, "Panel Angle Tester", 1, "PanelAngleFault", "name_panel_angle_mode"),
+              ("PANEL_EFF_ID", Panel_Efficiency_FaultIdentifier, "Panel Efficiency Tester", 1, "PanelEfficiencyFault", "name_panel_efficiency_mode"),
+              ("BATTERY_CAP_ID", Battery_Capacity_FaultIdentifier, "Battery Capacity Tester", 1, "BatteryCapacity", "name_batt_cap_mode"),
+              ("POWER_SINK_ID", Power_Sink_FaultIdentifier, "Power Sink Tester", 1, "PowerSinkFault", "name_power_sink_mode")]
 
 class TestManager:
     """ TestManager is the main MBFID class. As its name suggests, 
     it manages the data that is imported/exported through the main 
     Bayesian Hypothesis Testing class (see FaultIdentifier.py). 
     """
-    def __init__(self, sim_dir_path, telem_csv_path, name="Test Manager"):
+    def __init__(self, sim_dir_path, telem_csv_path, name="Test Manager", checkpoint_dir=None, 
+                cache_dir=None, cache_size=512 * 2**20, trace_dir=None, trace_decimation=1, top_k=0, 
+                gate_quiet_period=None, rates=None, num_shards=1, shard_executor=None, sim_cache_dir=None, 
+                metrics_path=None, metrics_interval=10.0, ingest_workers=1, covariance=None, covariance_rows=None, 
+                results_dir="results/", results_format="csv", results_block_size=4096, results_flush_interval=5.0, 
+                candidate_block=None, coarse_stride=1, engines=None, num_chunks=1):
         self.sim_dir_path = sim_dir_path
         self.telem_csv_path = telem_csv_path
+        self.checkpoint_dir = checkpoint_dir
+        self.trace_dir = trace_dir
+        self.trace_decimation = trace_decimation
+        self.top_k = top_k
+        self.gate_quiet_period = gate_quiet_period
+        # None (diagonal test), "model" or "nominal" (estimated from the first covariance_rows 
+        # residuals of the truth against Nominal, see FaultIdentifier.estimate_innovation_covariance())
+        assert covariance in (None, "model", "nominal"), "Unknown covariance %s." %covariance
+        self.covariance = covariance
+        self.covariance_rows = covariance_rows
+        # the modes that could pass are looked up in a KD-tree per candidate_block 
+        # time rows (see FaultIdentifier.set_candidate_index())
+        self.candidate_block = candidate_block
+        # the Fault ID's are first made on blocks of coarse_stride measurements and 
+        # only refined where Nominal is rejected (see FaultIdentifier.run_coarse_to_fine())
+        self.coarse_stride = coarse_stride
+        # test type (e.g. "RW_FRICTION_ID") -> (decision engine, switch probability, posterior odds)
+        # (see FaultIdentifier.set_decision_engine()). Every other test uses the window engine.
+        self.engines = {} if engines is None else engines
+        assert all(engine[0] == "window" for engine in self.engines.values()) or \
+            (self.trace_dir is None and self.top_k == 0 and self.gate_quiet_period is None and candidate_block is None), \
+            "The posterior engine does not support traces, top-K candidates, detection gates or candidate indices."
+        # the results are streamed to results_dir while the tests run (see src.ResultsWriter)
+        self.results_dir = results_dir
+        self.results_format = results_format
+        self.results_block_size = results_block_size
+        self.results_flush_interval = results_flush_interval
+        # test type (e.g. "BATTERY_CAP_ID") -> (decimation factor, pre-average)
+        self.rates = {} if rates is None else rates
+        # the modes of every FaultIdentifier are split across num_shards workers (see FaultIdentifier.run_sharded())
+        self.num_shards = num_shards
+        # the time axis of every FaultIdentifier is split into num_chunks chunks (see FaultIdentifier.run_time_partitioned())
+        self.num_chunks = num_chunks
+        assert num_shards == 1 or num_chunks == 1, "Modes and time chunks cannot be split at the same time."
+        self.shard_executor = shard_executor
+        self.result_cache = ResultCache(cache_dir, cache_size) if cache_dir is not None else None
+        # the per-sample latency of every FaultIdentifier is written to metrics_path (see src.LatencyMonitor)
+        self.latency_monitor = LatencyMonitor(metrics_path, metrics_interval) if metrics_path is not None else None
+        # the modes of the simulation database are parsed by ingest_workers threads
+        self.sim_manifest = SimulationManifest(sim_dir_path, sim_cache_dir, identify=self.identify_mode, 
+                                               num_workers=ingest_workers)
         self.sim_telem_dict = {}
         self.truth_telem_df = {}
         self.__name = name
-        self.__results_dict = {}
+        # held by every run and by self.refresh_simulations(), so the simulation 
+        # database only changes between runs (see self.watch_simulations())
+        self.__lock = threading.RLock()
+        self.__results_writer = None
+        self.__top_k_dict = {}
+        self.__testers = {}
         self.__ready = self.__set_up()
 
     def __set_up(self) -> bool:
@@ -48,32 +123,28 @@ class TestManager:
 
         Note: BSK does not name the time column. This function names the column
         as a bookkeeping technique for Hypothesis Testing. 
+        Only modes that are new or changed since the last run are parsed and, 
+        with a cache directory, the truth telemetry is only parsed once 
+        (see src.SimulationManifest.SimulationManifest).
         """
         # fill self.sim_telem_dict
         try:
             print("%s: Collecting digital-twin data..." %self.__name)
-            mode_dir_paths = [x[0] for x in os.walk(self.sim_dir_path)][1:]
-            for mode_dir_path in mode_dir_paths:
-                mode = os.path.basename(mode_dir_path)
-                mode_telem_path = mode_dir_path + "/telemetry.csv"
-                mode_telem_df = pd.read_csv(mode_telem_path)
-                mode_telem_df.rename( columns={'Unnamed: 0':'Time (ns)'}, inplace=True )
-                self.sim_telem_dict[mode] = mode_telem_df
+            self.sim_manifest.scan(self.sim_telem_dict)
             print("%s: success!" %self.__name)
-        except:
-            print("%s: Path Error!", self.__name)
-            print("%s: The provided argument %s must point directly to an existing simulation database." % (self.__name, self.path_to_sim))
+        except (OSError, ValueError) as error:
+            print("%s: Path Error! %s" %(self.__name, error))
+            print("%s: The provided argument %s must point directly to an existing simulation database." % (self.__name, self.sim_dir_path))
             print("%s: If you designed the database yourself, be sure the database is properly set-up." % self.__name)
             return False
 
         # fill self.truth_telem_df
         try:
             print("%s: Collecting telemetry data..." %self.__name)
-            self.truth_telem_df = pd.read_csv(self.telem_csv_path)
-            self.truth_telem_df.rename( columns={'Unnamed: 0':'Time (ns)'}, inplace=True )
+            self.truth_telem_df = self.sim_manifest.read_truth(self.telem_csv_path)
             print("%s: success!" %self.__name)
-        except:
-            print("%s: Path Error!" %self.__name)
+        except (OSError, ValueError) as error:
+            print("%s: Path Error! %s" %(self.__name, error))
             print("%s: The provided argument %s must point directly to an existing *.csv file." % (self.__name, self.telem_csv_path))
             return False
         return True
@@ -158,176 +229,496 @@ class TestManager:
         return name
 
 
+    def identify_mode(self, dir_name: str) -> Dict[str, str]:
+        """ Returns the identity of a simulated mode directory: the test type it 
+        belongs to ("all" for Nominal) and its nicely formatted fault name. 
+        None if the directory does not belong to any test.
+        """
+        for test_key, identifier, tester_name, dim, sim_keyword, name_mode in SUBSYSTEMS:
+            if sim_keyword in dir_name:
+                return {"test_type": test_key, "mode": getattr(self, name_mode)(dir_name)}
+        if "Nominal" in dir_name:
+            return {"test_type": "all", "mode": "Nominal"}
+        return None
+
+    def refresh_simulations(self) -> Tuple[List[str], List[str], List[str]]:
+        """ Picks up modes that were added to, changed in or removed from the 
+        simulation database since it was last scanned. The hypothesis banks of 
+        the affected FaultIdentifiers are updated in place (see 
+        FaultIdentifier.update_modes()), so they keep their state. Waits for a 
+        running test to finish first.
+
+        Output: Tuple[List[str], List[str], List[str]] -- the added, changed and removed modes
+        """
+        with self.__lock:
+            identities = {mode: entry["identity"] for mode, entry in self.sim_manifest.entries.items()}
+            added, changed, removed = self.sim_manifest.scan(self.sim_telem_dict)
+            identities.update({mode: entry["identity"] for mode, entry in self.sim_manifest.entries.items()})
+            updated_telem = {mode: self.sim_telem_dict[mode] for mode in added + changed}
+            for test_key, tester in self.__testers.items():
+                sim_data = self.__subsystem_sim_data(test_key, updated_telem)
+                removed_modes = [identities[mode]["mode"] for mode in removed if identities[mode] is not None 
+                                 and identities[mode]["test_type"] in (test_key, "all")]
+                if len(sim_data) + len(removed_modes) == 0:
+                    continue
+                print("%s: Updating the %s hypothesis bank." %(self.__name, test_key))
+                # the windows are rebuilt from the truth measurements they hold
+                decimation, pre_average = self.rates.get(test_key, (1, False))
+                truth_telem = self.__schedule_truth(decimation, pre_average)
+                recent_truth = truth_telem.iloc[tester._cursor - tester._window_len:tester._cursor]
+                tester.update_modes(self.__pre_average(test_key, sim_data), removed_modes, recent_truth)
+                self.__set_covariance(test_key)
+            return added, changed, removed
+
+    def watch_simulations(self, interval: float = 10.0) -> threading.Event:
+        """ Calls self.refresh_simulations() every interval seconds on a background 
+        thread, so a long-running process picks up new modes without a restart. 
+        A refresh that is due while a test runs is applied once the test is done. 
+
+        Output: threading.Event -- set it to stop watching
+        """
+        stop_event = threading.Event()
+        def watch():
+            while not stop_event.wait(interval):
+                self.refresh_simulations()
+        threading.Thread(target=watch, name=self.__name + " watcher", daemon=True).start()
+        return stop_event
+
+    def __set_up_testers(self) -> Dict[str, FaultIdentifier]:
+        """ Initializes a FaultIdentifier for every Fault ID test and stores them
+        in self.__testers, a Dict[str, FaultIdentifier] where str is the test 
+        type (e.g. "CSS_ID"). The FaultIdentifiers are only set up once and 
+        are reused by every run (e.g. self.run_monte_carlo()).
+        """
+        # Set up every Fault ID in the order of SUBSYSTEMS
+        # Note: Set-up for these Fault ID tests requires creating 
+        # a dictionary Dict[str, pandas.DataFrame] where str is 
+        # a nicely formatted fault name and the pandas.Dataframe 
+        # holds the telemetry data for that mode. The FaultIdentifier
+        # will take care of the rest and return a list of modes. 
+        for test_key, identifier, tester_name, dim, sim_keyword, name_mode in SUBSYSTEMS:
+            if test_key in self.__testers:
+                continue
+            sim_data = self.__subsystem_sim_data(test_key, self.sim_telem_dict)
+            self.__testers[test_key] = identifier(name=tester_name, 
+                                                  dim=dim, 
+                                                  sim_data=self.__pre_average(test_key, sim_data))
+            self.__set_covariance(test_key)
+        self.__testers = {test_key: self.__testers[test_key] for test_key, *_ in SUBSYSTEMS}
+        return self.__testers
+
+    def __subsystem_sim_data(self, test_key: str, sim_telem_dict: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        """ Returns the modes of sim_telem_dict (mode directory name -> telemetry data) that 
+        belong to the test_key FaultIdentifier, keyed by their nicely formatted fault name. 
+        """
+        test_keys = [subsystem[0] for subsystem in SUBSYSTEMS]
+        test_key, identifier, tester_name, dim, sim_keyword, name_mode = SUBSYSTEMS[test_keys.index(test_key)]
+        sim_data = {}
+        for key, value in sim_telem_dict.items():
+            if sim_keyword in key:
+                fault_name = getattr(self, name_mode)(key)
+                sim_data[fault_name] = value
+            elif "Nominal" in key:
+                sim_data["Nominal"] = value
+        return sim_data
+
+    def __set_covariance(self, test_key: str) -> None:
+        """ Sets the full innovation covariance of the test_key FaultIdentifier (see self.covariance). """
+        if self.covariance is not None:
+            num_rows = 0 if self.covariance == "model" else self.covariance_rows
+            covariance = self.__testers[test_key].estimate_innovation_covariance(self.truth_telem_df, num_rows)
+            self.__testers[test_key].set_innovation_covariance(covariance)
+        return None
+
+    def get_testers(self) -> Dict[str, FaultIdentifier]:
+        """ Returns the FaultIdentifier of every Fault ID test (e.g. "CSS_ID"), set up 
+        on the current simulation database. Used to run a FaultIdentifier directly 
+        (e.g. by equivalence_checks.py). 
+        """
+        with self.__lock:
+            assert(self.__ready is True)
+            return dict(self.__set_up_testers())
+
     # the main fault id function
-    def run_offline_fault_ID(self, test_type: str = "all") -> None:
+    def run_offline_fault_ID(self, test_type: str = "all", resume: bool = False, fused: bool = False) -> None:
         """ This is the main MBFID function. The test manager will
         run test_type by initializing a FaultIdentifier object
         for every desired mode. The FaultIdentifier will perform the
         test based on the data that TestManager provides. 
-        After the test is complete, TestManager requests the resulting
-        mode ID's from the FaultIdentifier and stores in self.__results_dict.
-        At the end of this function, self.__results_dict is a 
-        Dict[str, List[str]] where str is the test_type (e.g. "CSS_ID")
-        and List[str] is a list of mode ID's that were generated during 
-        the test. The ith element of the list cooresponds to the mode
-        ID'd given the ith row of telemetry data. In other words, for 
-        the measurement given at the time-step of row i.
+        The FaultIdentifiers stream the resulting mode ID's into the 
+        columns of a src.ResultsWriter.ResultsWriter while they run, one 
+        column per test_type (e.g. "CSS_ID"). The ith element of a column 
+        cooresponds to the mode ID'd given the ith row of telemetry data. 
+        In other words, for the measurement given at the time-step of row i. 
+        The results are finalized by self.export_results().
 
         Keyword arguments:
         test_type: str -- the list of all command line arguments
+        resume: bool -- if True, every FaultIdentifier resumes from its 
+        latest checkpoint inside self.checkpoint_dir (if one exists)
+        fused: bool -- if True, all FaultIdentifiers run in a single time loop 
+        (see src.FusedFaultIdentifier.FusedFaultIdentifier). Checkpoints, the 
+        result cache, traces, top-K candidates, detection gates, rates, latency 
+        metrics, full covariances, candidate indices, coarse-to-fine runs, 
+        posterior engines, shards and time chunks are not supported by the fused engine.
 
         Note: Single-fault test_type's are not currently supported.
         """
-        assert(self.__ready is True)
-
-        print("%s: Testing for %s faults on the telemetry data found at %s." 
-            %(self.__name, test_type, self.telem_csv_path))
-
-        if test_type == "all":
-            """
-            Tests all faults in the following order:
-                1. CSS
-                2. RW Encoder
-                3. RW Friction
-                4. Panel Deployment
-                5. Panel Angle 
-                6. Panel Efficiency
-                7. Battery Capacity
-                8. Power Sink
-            Note: Set-up for these Fault ID tests requires creating 
-            a dictionary Dict[str, pandas.DataFrame] where str is 
-            a nicely formatted fault name and the pandas.Dataframe 
-            holds the telemetry data for that mode. The FaultIdentifier
-            will take care of the rest and return a list of modes. 
-            """
-            # 1. Run CSS Fault ID
-            css_data = {}
-            for key, value in self.sim_telem_dict.items():
-                if "CssSignalFault" in key:
-                    fault_name = self.name_css_mode(key)
-                    css_data[fault_name] = value
-                elif "Nominal" in key:
-                    css_data["Nominal"] = value
-            css_tester = CSS_FaultIdentifier(name="CSS Fault Tester", 
-                                            dim=8, 
-                                            sim_data=css_data)
-            css_tester.run_offline_fault_ID(self.truth_telem_df)
-            self.__results_dict['CSS_ID'] = css_tester.mode_ids
-
-            # 2. Run RW Encoder Fault ID
-            rw_encode_data = {}
-            for key, value in self.sim_telem_dict.items():
-                if "RwEncoderFault" in key:
-                    fault_name = self.name_rw_encoder_mode(key)
-                    rw_encode_data[fault_name] = value
-                elif "Nominal" in key:
-                    rw_encode_data["Nominal"] = value
-            rw_encoder_tester = RW_Encoder_FaultIdentifier(name="RW Encoder Tester", 
-                                                        dim=4, 
-                                                        sim_data=rw_encode_data)
-            rw_encoder_tester.run_offline_fault_ID(self.truth_telem_df)
-            self.__results_dict['RW_ENCODER_ID'] = rw_encoder_tester.mode_ids
-
-            # 3. Run RW Friction Fault ID
-            rw_friction_data = {}
-            for key, value in self.sim_telem_dict.items():
-                if "RwFrictionFault" in key:
-                    fault_name = self.name_rw_friction_mode(key)
-                    rw_friction_data[fault_name] = value
-                elif "Nominal" in key:
-                    rw_friction_data["Nominal"] = value
-            rw_friction_tester = RW_Friction_FaultIdentifier(name="RW Friction Tester", 
-                                                            dim=4, 
-                                                            sim_data=rw_friction_data)
-            rw_friction_tester.run_offline_fault_ID(self.truth_telem_df)
-            self.__results_dict['RW_FRICTION_ID'] = rw_friction_tester.mode_ids
-
-            # 4. Run Panel Deployment Fault ID
-            panel_deploy_data = {}
-            for key, value in self.sim_telem_dict.items():
-                if "PanelDeploymentFault" in key:
-                    fault_name = self.name_panel_deployment_mode(key)
-                    panel_deploy_data[fault_name] = value
-                elif "Nominal" in key:
-                    panel_deploy_data["Nominal"] = value
-            panel_deployment_tester = Panel_Deployment_FaultIdentifier(name="Panel Deployment Tester", 
-                                                                    dim=2, 
-                                                                    sim_data=panel_deploy_data)
-            panel_deployment_tester.run_offline_fault_ID(self.truth_telem_df)
-            self.__results_dict['PANEL_DEPLOY_ID'] = panel_deployment_tester.mode_ids
-
-            # 5. Run Panel Angle Fault ID
-            panel_angle_data = {}
-            for key, value in self.sim_telem_dict.items():
-                if "PanelAngleFault" in key:
-                    fault_name = self.name_panel_angle_mode(key)
-                    panel_angle_data[fault_name] = value
-                elif "Nominal" in key:
-                    panel_angle_data["Nominal"] = value
-            panel_angle_tester = Panel_Angle_FaultIdentifier(name="Panel Angle Tester", 
-                                                            dim=1, 
-                                                            sim_data=panel_angle_data)
-            panel_angle_tester.run_offline_fault_ID(self.truth_telem_df)
-            self.__results_dict['PANEL_ANGLE_ID'] = panel_angle_tester.mode_ids
-
-            # 6. Run Panel Efficiency Fault ID
-            panel_efficiency_data = {}
-            for key, value in self.sim_telem_dict.items():
-                if "PanelEfficiencyFault" in key:
-                    fault_name = self.name_panel_efficiency_mode(key)
-                    panel_efficiency_data[fault_name] = value
-                elif "Nominal" in key:
-                    panel_efficiency_data["Nominal"] = value
-            panel_efficiency_tester = Panel_Efficiency_FaultIdentifier(name="Panel Efficiency Tester", 
-                                                                    dim=1, 
-                                                                    sim_data=panel_efficiency_data)
-            panel_efficiency_tester.run_offline_fault_ID(self.truth_telem_df)
-            self.__results_dict['PANEL_EFF_ID'] = panel_efficiency_tester.mode_ids
-
-            # 7. Run Battery Capacity Fault ID
-            battery_capacity_data = {}
-            for key, value in self.sim_telem_dict.items():
-                if "BatteryCapacity" in key:
-                    fault_name = self.name_batt_cap_mode(key)
-                    battery_capacity_data[fault_name] = value
-                elif "Nominal" in key:
-                    battery_capacity_data["Nominal"] = value
-            battery_capacity_tester = Battery_Capacity_FaultIdentifier(name="Battery Capacity Tester", 
-                                                                    dim=1, 
-                                                                    sim_data=battery_capacity_data)
-            battery_capacity_tester.run_offline_fault_ID(self.truth_telem_df)
-            self.__results_dict['BATTERY_CAP_ID'] = battery_capacity_tester.mode_ids
-
-            # 8. Run Power Sink Fault ID
-            power_sink_data = {}
-            for key, value in self.sim_telem_dict.items():
-                if "PowerSinkFault" in key:
-                    fault_name = self.name_power_sink_mode(key)
-                    power_sink_data[fault_name] = value
-                elif "Nominal" in key:
-                    power_sink_data["Nominal"] = value
-            power_sink_tester = Power_Sink_FaultIdentifier(name="Power Sink Tester", 
-                                                        dim=1, 
-                                                        sim_data=power_sink_data)
-            power_sink_tester.run_offline_fault_ID(self.truth_telem_df)
-            self.__results_dict['POWER_SINK_ID'] = power_sink_tester.mode_ids
+        with self.__lock:
+            assert(self.__ready is True)
+
+            print("%s: Testing for %s faults on the telemetry data found at %s." 
+                %(self.__name, test_type, self.telem_csv_path))
+            example_id = self.telem_csv_path.split("/")[-2]
+            self.__results_writer = ResultsWriter(self.results_dir, example_id, self.truth_telem_df["Time (ns)"].to_numpy(), 
+                                                  fmt=self.results_format, block_size=self.results_block_size, 
+                                                  flush_interval=self.results_flush_interval)
+
+            if test_type == "all" and fused:
+                assert not resume and self.trace_dir is None and self.top_k == 0 and \
+                    self.gate_quiet_period is None and len(self.rates) == 0 and self.latency_monitor is None \
+                    and self.covariance is None and self.candidate_block is None and self.coarse_stride == 1 \
+                    and len(self.engines) == 0 and self.num_chunks == 1 and self.num_shards == 1 \
+                    and self.result_cache is None and self.checkpoint_dir is None, \
+                    "%s: The fused engine only supports plain Fault ID runs." %self.__name
+                testers = self.__set_up_testers()
+                fused_tester = FusedFaultIdentifier(testers)
+                for test_key, mode_ids in fused_tester.run_offline_fault_ID(self.truth_telem_df).items():
+                    self.__results_writer.open_column(test_key, testers[test_key].mode_labels, mode_ids.dtype).write(mode_ids)
+            elif test_type == "all":
+                # the shards of every FaultIdentifier share one pool of workers
+                shard_executor = self.shard_executor
+                if max(self.num_shards, self.num_chunks) > 1 and shard_executor is None:
+                    self.shard_executor = ProcessPoolExecutor(max_workers=max(self.num_shards, self.num_chunks))
+                try:
+                    for test_key, tester in self.__set_up_testers().items():
+                        self.__run_tester(test_key, tester, resume)
+                finally:
+                    if self.shard_executor is not shard_executor:
+                        self.shard_executor.shutdown()
+                        self.shard_executor = shard_executor
+                    if self.latency_monitor is not None:
+                        self.latency_monitor.close()
+            else:
+                print("%s ERROR: running the tool with type %s is not yet implemented." %(self.__name, testType))
+            return None
+
+    def run_replay(self, speed: float = 0.0, loops: int = 1, jitter: float = 0.0, 
+                   max_queue: int = None, seed: int = None) -> Dict[str, float]:
+        """ Replays the truth telemetry into every FaultIdentifier one sample at a time 
+        (see src.TelemetryReplay.TelemetryReplay) to measure whether streaming fault ID 
+        keeps up with the telemetry rate. Detection gates and latency metrics are 
+        applied, the results of the replay are not stored. 
 
-        else:
-            print("%s ERROR: running the tool with type %s is not yet implemented." %(self.__name, testType))
+        Keyword arguments:
+        speed: float -- the replay speed (1.0 is real time, 0.0 is as fast as possible)
+        loops: int -- the number of times the telemetry is replayed
+        jitter: float -- the maximum delay (in seconds) added to the release of every sample (requires speed > 0)
+        max_queue: int -- the number of waiting samples beyond which the oldest are dropped (None never drops, requires speed > 0)
+        seed: int -- the seed of the jitter
+
+        Output: Dict[str, float] -- the replay report (see TelemetryReplay.run())
+        """
+        with self.__lock:
+            assert(self.__ready is True)
+            assert len(self.rates) == 0, "%s: Replays do not support rates." %self.__name
+            testers = self.__set_up_testers()
+            for tester in testers.values():
+                tester.set_detection_gate(self.gate_quiet_period)
+                tester.set_monitor(self.latency_monitor)
+            for test_key, engine in self.engines.items():
+                testers[test_key].set_decision_engine(*engine)
+            replay = TelemetryReplay(testers, self.truth_telem_df, speed=speed, loops=loops, jitter=jitter, 
+                                     max_queue=max_queue, seed=seed, monitor=self.latency_monitor)
+            try:
+                return replay.run()
+            finally:
+                # the replayed testers are not reused by other runs
+                self.__testers = {}
+                if self.latency_monitor is not None:
+                    self.latency_monitor.close()
+
+    def __checkpoint_path(self, test_key: str) -> str:
+        """ Returns the checkpoint file of the test_key FaultIdentifier, or 
+        None if checkpointing is disabled. Checkpoints are stored as 
+        <self.checkpoint_dir>/<example ID>/<test_key>.pkl
+        """
+        if self.checkpoint_dir is None:
+            return None
+        example_id = self.telem_csv_path.split("/")[-2]
+        return os.path.join(self.checkpoint_dir, example_id, test_key + ".pkl")
+
+    def __run_tester(self, test_key: str, tester: FaultIdentifier, resume: bool) -> None:
+        """ Runs tester on the truth telemetry data and streams the resulting 
+        mode ID's into the test_key results column. If self.result_cache 
+        already holds the results for the exact same inputs, tester is not run 
+        (unless the distances are traced to <self.trace_dir>/<example ID>/<test_key>/ 
+        or the top self.top_k candidates are ranked). The tester only evaluates 
+        every nth measurement if self.rates holds a decimation factor n for 
+        test_key and its decisions are held in between.
+
+        Keyword arguments:
+        test_key: str -- the results column (e.g. "CSS_ID")
+        tester: FaultIdentifier -- the initialized FaultIdentifier
+        resume: bool -- if True, tester resumes from its latest checkpoint
+        """
+        tester.set_detection_gate(self.gate_quiet_period)
+        tester.set_decision_engine(*self.engines.get(test_key, ("window",)))
+        decimation, pre_average = self.rates.get(test_key, (1, False))
+        truth_telem = self.__schedule_truth(decimation, pre_average)
+        if decimation > 1:
+            print("%s: Evaluating %s every %d measurements." %(self.__name, test_key, decimation))
+        cache_key = None
+        recorder = None
+        # every decision is held for the decimation factor (see self.__hold())
+        results_column = self.__results_writer.open_column(test_key, tester.mode_labels, 
+                                                           tester._mode_codes.dtype, repeat=decimation)
+        if self.trace_dir is not None:
+            example_id = self.telem_csv_path.split("/")[-2]
+            recorder = DistanceRecorder(os.path.join(self.trace_dir, example_id, test_key), tester._modes, 
+                                        len(truth_telem.index), decimation=self.trace_decimation)
+        if self.result_cache is not None:
+            cache_key = tester.content_hash(truth_telem)
+            cached_mode_ids = self.result_cache.get(test_key, cache_key)
+            if cached_mode_ids is not None and recorder is None and self.top_k == 0:
+                results_column.write(cached_mode_ids)
+                return None
+        checkpoint_path = self.__checkpoint_path(test_key)
+        if resume and checkpoint_path is not None:
+            tester.load_checkpoint(checkpoint_path)
+        # the runs that identify the whole trace at once: (name, enabled, run, arguments, cacheable). 
+        # Coarse-to-fine results can differ from the serial ones, so they are not cached.
+        trace_runs = [("Sharded", self.num_shards > 1, tester.run_sharded, 
+                       (truth_telem, self.num_shards, self.shard_executor), True), 
+                      ("Time-partitioned", self.num_chunks > 1, tester.run_time_partitioned, 
+                       (truth_telem, self.num_chunks, self.shard_executor), True), 
+                      ("Coarse-to-fine", self.coarse_stride > 1, tester.run_coarse_to_fine, 
+                       (truth_telem, self.coarse_stride), False)]
+        trace_runs = [trace_run for trace_run in trace_runs if trace_run[1]]
+        if len(trace_runs) > 0:
+            assert len(trace_runs) == 1, "%s: Shards, time chunks and coarse-to-fine runs cannot be combined." %self.__name
+            run_name, _, run, run_args, cacheable = trace_runs[0]
+            assert tester.decision_engine == "window", "%s: %s runs only support the window engine." %(self.__name, run_name)
+            assert recorder is None and self.top_k == 0 and self.gate_quiet_period is None and not resume \
+                and self.latency_monitor is None and self.covariance is None and self.candidate_block is None, \
+                "%s: %s runs do not support traces, top-K candidates, detection gates, checkpoints, " \
+                "latency metrics, full covariances or candidate indices." %(self.__name, run_name)
+            mode_ids = run(*run_args)
+            results_column.write(mode_ids)
+            if cacheable and cache_key is not None:
+                self.result_cache.put(test_key, cache_key, mode_ids)
+            return None
+        # the mode ID's restored from a checkpoint are written before the new ones
+        results_column.write(tester.mode_ids)
+        tester.set_writer(results_column)
+        tester.set_recorder(recorder)
+        tester.set_monitor(self.latency_monitor)
+        tester.set_top_k(self.top_k)
+        tester.set_candidate_index(self.candidate_block)
+        tester.run_offline_fault_ID(truth_telem, checkpoint_path=checkpoint_path)
+        tester.set_writer(None)
+        if recorder is not None:
+            recorder.close()
+            tester.set_recorder(None)
+        if self.top_k > 0:
+            self.__top_k_dict[test_key] = (tester.mode_labels,) + tuple(self.__hold(buffer, decimation) 
+                                                                        for buffer in tester.get_top_k())
+        if cache_key is not None:
+            self.result_cache.put(test_key, cache_key, tester.mode_ids)
         return None
 
-    def export_results(self) -> None:
-        """ Exports the Fault ID test results inside
-        self.__results_dict to a csv using the pandas.DataFrame 
-        interface. The results are saved inside ./results
-        and are named identically to the truth example ID. 
+    def __schedule_truth(self, decimation: int, pre_average: bool) -> pd.DataFrame:
+        """ Returns every decimation-th row of the truth telemetry data, 
+        pre-averaged if pre_average is True (see self.__block_average()). 
+        """
+        assert decimation >= 1, "The decimation factor must be at least 1."
+        if decimation == 1:
+            return self.truth_telem_df
+        truth_telem = self.truth_telem_df
+        if pre_average:
+            truth_telem = self.__block_average(truth_telem, decimation)
+        return truth_telem.iloc[::decimation]
+
+    def __pre_average(self, test_key: str, sim_data: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        """ Pre-averages the simulated telemetry of every mode if the test_key 
+        FaultIdentifier is scheduled with pre-averaging (see self.rates), so the 
+        simulations stay comparable to the pre-averaged truth telemetry data. 
+        """
+        decimation, pre_average = self.rates.get(test_key, (1, False))
+        if decimation == 1 or not pre_average:
+            return sim_data
+        return {mode: self.__block_average(df, decimation) for mode, df in sim_data.items()}
+
+    def __block_average(self, telem_df: pd.DataFrame, decimation: int) -> pd.DataFrame:
+        """ Replaces every telemetry column (but 'Time (ns)') by its mean over 
+        the decimation rows up to (and including) the current one. 
+        """
+        columns = [column for column in telem_df.columns if column != "Time (ns)"]
+        telem_df = telem_df.copy()
+        telem_df[columns] = telem_df[columns].rolling(decimation, min_periods=1).mean()
+        return telem_df
+
+    def __hold(self, decimated: np.ndarray, decimation: int) -> np.ndarray:
+        """ Upsamples the rows of decimated (see self.__schedule_truth()) back onto 
+        the truth time stamps by holding every row until the next one. 
+        """
+        if decimation == 1:
+            return decimated
+        return decimated[np.arange(len(self.truth_telem_df.index)) // decimation]
+
+    def run_monte_carlo(self, num_replicas: int = 100, noise_std=0.0, seed: int = 0, 
+                        replicas: List[pd.DataFrame] = None) -> Tuple[Dict[str, np.ndarray], Dict[str, pd.DataFrame]]:
+        """ Evaluates the Fault ID algorithm on many noisy replicas of the 
+        truth telemetry data to quantify the detection probability. Every 
+        FaultIdentifier is only set up once and evaluates all replicas in one 
+        batched computation (see FaultIdentifier.run_monte_carlo()).
+
+        Keyword arguments:
+        num_replicas: int -- the number of replicas to generate
+        noise_std: float or Dict[str, float] -- the standard deviation of the Gaussian 
+        noise injected into every truth column, or a dictionary mapping a 
+        column name to its standard deviation (missing columns are not perturbed)
+        seed: int -- the seed of the noise generator. A column always receives the 
+        same noise, so FaultIdentifiers sharing a column see the same replicas.
+        replicas: List[pandas.DataFrame] -- truth replicas to use instead of 
+        generating them. Every replica must share the time stamps of the truth data.
+
+        Output: Tuple[Dict[str, np.ndarray], Dict[str, pandas.DataFrame]] -- the 
+        (num_replicas, num_times) mode ID codes of every test type (e.g. "CSS_ID", 
+        see FaultIdentifier.mode_labels) and 
+        the stats tables of results_2_stats.py with one row per replica followed 
+        by a row holding the aggregate stats. 
+        """
+        with self.__lock:
+            assert(self.__ready is True)
+            if replicas is not None:
+                num_replicas = len(replicas)
+            print("%s: Testing %d replicas of the telemetry data found at %s." 
+                %(self.__name, num_replicas, self.telem_csv_path))
+            mc_mode_ids = {}
+            for test_key, tester in self.__set_up_testers().items():
+                if replicas is not None:
+                    replica_meas = np.stack([tester._get_measurements(df)[:, 1:] for df in replicas])
+                else:
+                    replica_meas = self.__noisy_replicas(tester._columns, num_replicas, noise_std, seed)
+                mc_mode_ids[test_key] = tester.run_monte_carlo(self.truth_telem_df, replicas=replica_meas)
+
+            # calculate the stats of every replica
+            path2truth = os.path.dirname(self.telem_csv_path)
+            example_id = os.path.basename(path2truth)
+            example_stats_list = []
+            for replica_idx in range(num_replicas):
+                replica_results = {key: self.__testers[key].decode_mode_ids(mode_ids[replica_idx]) 
+                                    for key, mode_ids in mc_mode_ids.items()}
+                replica_results_df = pd.DataFrame(replica_results, index=self.truth_telem_df["Time (ns)"])
+                example_stats = results_2_stats.calc_example_stats(path2truth, replica_results_df)
+                for row in example_stats.values():
+                    row[0] = "%s/replica_%d" %(example_id, replica_idx)
+                example_stats_list.append(example_stats)
+            stats_tables = results_2_stats.build_stats_tables(example_stats_list)
+            for stats_table in stats_tables.values():
+                stats_table.loc[len(stats_table.index)] = results_2_stats.aggregate_stats(stats_table, example_id + "/mean")
+            return mc_mode_ids, stats_tables
+
+    def __noisy_replicas(self, columns: List[str], num_replicas: int, noise_std, seed: int) -> np.ndarray:
+        """ Returns a (num_replicas, num_times, len(columns)) array of truth 
+        measurements with Gaussian noise injected (see self.run_monte_carlo()).
+        """
+        truth = self.truth_telem_df[columns].to_numpy(dtype=float)
+        replica_meas = np.repeat(truth[np.newaxis], num_replicas, axis=0)
+        for col_idx, column in enumerate(columns):
+            if isinstance(noise_std, dict):
+                std = noise_std.get(column, 0.0)
+            else:
+                std = noise_std
+            if std > 0:
+                rng = np.random.default_rng([seed, self.truth_telem_df.columns.get_loc(column)])
+                replica_meas[:, :, col_idx] += std * rng.standard_normal((num_replicas, truth.shape[0]))
+        return replica_meas
+
+    def export_monte_carlo(self, stats_tables: Dict[str, pd.DataFrame]) -> None:
+        """ Exports the stats tables returned by self.run_monte_carlo() to 
+        ./stats/monte_carlo/<example ID>/ using the results_2_stats.py file names. 
         """
-        results_dir = "results/"
-        if not os.path.exists(results_dir):
-            os.mkdir(results_dir)
+        example_id = self.telem_csv_path.split("/")[-2]
+        stats_dir = os.path.join("stats", "monte_carlo", example_id)
+        if not os.path.exists(stats_dir):
+            os.makedirs(stats_dir)
+        for table_name, stats_table in stats_tables.items():
+            stats_table.to_csv(os.path.join(stats_dir, table_name + ".csv"))
+        return None
+
+    def run_parameter_sweep(self, window_sizes: List[int] = None, r_scales: List[float] = None, 
+                            confidences: List[float] = None) -> Tuple[Dict[Tuple[int, float, float], Dict[str, np.ndarray]], Dict[str, pd.DataFrame]]:
+        """ Tunes the Fault ID algorithm by evaluating every combination of window 
+        size, measurement noise scale and chi-squared confidence in a single 
+        pass per FaultIdentifier (see FaultIdentifier.run_parameter_sweep()).
 
-        self.__results_dict["Time (ns)"] = self.truth_telem_df["Time (ns)"].tolist()
-        results_df = pd.DataFrame.from_dict(self.__results_dict)
-        results_df = results_df.set_index('Time (ns)')
+        Keyword arguments:
+        window_sizes: List[int] -- the innovation window sizes to test (defaults to every FaultIdentifier's own)
+        r_scales: List[float] -- the factors every FaultIdentifier's measurement noise is scaled by 
+        (defaults to 1.0). Only the shared R = 0.1 I is scaled (see FaultIdentifier.run_parameter_sweep()).
+        confidences: List[float] -- the chi-squared confidences to test (defaults to 0.95)
+
+        Output: Tuple[Dict[Tuple[int, float, float], Dict[str, np.ndarray]], Dict[str, pandas.DataFrame]] --
+        the mode ID codes of every test type (e.g. "CSS_ID") for every (window size, R scale, confidence) 
+        combination and the stats tables of results_2_stats.py with one row per combination
+        """
+        with self.__lock:
+            assert(self.__ready is True)
+            print("%s: Sweeping %d configurations on the telemetry data found at %s." 
+                %(self.__name, len(window_sizes or [None]) * len(r_scales or [None]) * len(confidences or [None]), 
+                  self.telem_csv_path))
+            sweep_mode_ids = {}
+            for test_key, tester in self.__set_up_testers().items():
+                tester_sweep = tester.run_parameter_sweep(self.truth_telem_df, window_sizes, r_scales, confidences)
+                for config, mode_ids in tester_sweep.items():
+                    sweep_mode_ids.setdefault(config, {})[test_key] = mode_ids
+
+            # calculate the stats of every configuration
+            path2truth = os.path.dirname(self.telem_csv_path)
+            example_stats_list = []
+            for config, config_mode_ids in sweep_mode_ids.items():
+                config_results = {key: self.__testers[key].decode_mode_ids(mode_ids) for key, mode_ids in config_mode_ids.items()}
+                config_results_df = pd.DataFrame(config_results, index=self.truth_telem_df["Time (ns)"])
+                example_stats_list.append(results_2_stats.calc_example_stats(path2truth, config_results_df))
+            stats_tables = results_2_stats.build_stats_tables(example_stats_list)
+            configs = np.array(list(sweep_mode_ids.keys()), dtype=object).reshape(-1, 3)
+            for stats_table in stats_tables.values():
+                stats_table.insert(1, "Window Size", configs[:, 0])
+                stats_table.insert(2, "R Scale", configs[:, 1])
+                stats_table.insert(3, "Confidence", configs[:, 2])
+            return sweep_mode_ids, stats_tables
+
+    def export_parameter_sweep(self, stats_tables: Dict[str, pd.DataFrame]) -> None:
+        """ Exports the stats tables returned by self.run_parameter_sweep() to 
+        ./stats/sweep/<example ID>/ using the results_2_stats.py file names. 
+        """
+        example_id = self.telem_csv_path.split("/")[-2]
+        stats_dir = os.path.join("stats", "sweep", example_id)
+        if not os.path.exists(stats_dir):
+            os.makedirs(stats_dir)
+        for table_name, stats_table in stats_tables.items():
+            stats_table.to_csv(os.path.join(stats_dir, table_name + ".csv"))
+        return None
+
+    def export_results(self) -> None:
+        """ Finalizes the Fault ID test results streamed by 
+        self.run_offline_fault_ID(). The results are saved inside self.results_dir 
+        and are named identically to the truth example ID, either as a csv 
+        or as a binary directory (see src.ResultsWriter.ResultsWriter). The ranked 
+        candidates of every test (see self.top_k) are saved next to them in 
+        <self.results_dir>/top_k/<example ID>/<test type>.npz
+        """
+        assert self.__results_writer is not None, "%s: There are no results to export." %self.__name
+        results_dir = self.results_dir
         example_id = self.telem_csv_path.split("/")[-2]
-        results_df.to_csv(results_dir + example_id + ".csv")
+        self.__results_writer.close()
+        self.__results_writer = None
+
+        top_k_dir = os.path.join(results_dir, "top_k", example_id)
+        if len(self.__top_k_dict) > 0 and not os.path.exists(top_k_dir):
+            os.makedirs(top_k_dir)
+        for test_key, (mode_labels, codes, distances, scores) in self.__top_k_dict.items():
+            np.savez(os.path.join(top_k_dir, test_key + ".npz"), times=self.truth_telem_df["Time (ns)"].to_numpy(), 
+                    mode_labels=np.array(mode_labels), codes=codes, distances=distances, scores=scores)
@@ -19,61 +19,66 @@
 """
 
 import pandas as pd
+import numpy as np
 import os, sys
 import re
+import json
+import hashlib
 from collections import Counter
 
 
-def generate_detection_stats(modes_df, fault_time_s, fault, faulty_sensors, results_dict):
-	fault_time_ns = fault_time_s * 1E9
+def mode_codes(modes_df):
+	""" Returns the (codes, labels) of a series of mode ID's. Every statistic below is 
+	computed on the integer codes, so every mode label is only ever inspected once. """
+	modes = modes_df if isinstance(modes_df.dtype, pd.CategoricalDtype) else modes_df.astype("category")
+	return modes.cat.codes.to_numpy(), list(modes.cat.categories)
 
-	# initialize the statistics
-	tp = 0
-	tn = 0
-	fp = 0
-	fn = 0
-	latency = 0
+def count_stats(pre_correct, post_correct):
+	""" Counts the (tp, tn, fp, fn, latency) of the per-sample outcomes before and after the fault. 
+	The latency is the number of misses before the last correct sample. """
+	tn = int(np.count_nonzero(pre_correct))
+	fp = len(pre_correct) - tn
+	tp = int(np.count_nonzero(post_correct))
+	fn = len(post_correct) - tp
 	latency_final = 0
+	if tp > 0:
+		last_hit = len(post_correct) - 1 - np.argmax(post_correct[::-1])
+		latency_final = int(last_hit + 1 - np.count_nonzero(post_correct[:last_hit + 1]))
+	return tp, tn, fp, fn, latency_final
+
+def sample_period_s(modes_df):
+	""" Returns the (median) time between two samples of a series of mode ID's in seconds. 
+	Latencies in samples are converted to seconds with it. """
+	if len(modes_df.index) < 2:
+		return 0.0
+	return float(np.median(np.diff(modes_df.index.to_numpy()))) / 1E9
+
+def most_common_mode(codes, labels):
+	""" Returns the most common mode of codes (ties go to the mode seen first) or "Nominal" if codes is empty. 
+	Missing mode ID's (code -1, e.g. rows an interrupted binary run did not reach) are not counted. """
+	codes = codes[codes >= 0]
+	if len(codes) == 0:
+		return "Nominal"
+	counts = np.bincount(codes, minlength=len(labels))
+	candidates = np.flatnonzero(counts == counts.max())
+	first_seen = [np.argmax(codes == code) for code in candidates]
+	return labels[candidates[np.argmin(first_seen)]]
 
-	unknown_mode = "N/A"
-	detected_list = []
+def generate_detection_stats(modes_df, fault_time_s, fault, faulty_sensors, results_dict):
+	fault_time_ns = fault_time_s * 1E9
+	codes, labels = mode_codes(modes_df)
+	post_fault = modes_df.index.to_numpy() >= fault_time_ns
+	is_nominal = np.array([label == "Nominal" for label in labels] + [False])
 
 	# see https://en.wikipedia.org/wiki/Sensitivity_and_specificity for details
-	n = 0
-	p = 0
-
-	for time, detected_mode in modes_df.items():
-		if time < fault_time_ns:
-			n += 1
-			# no fault occured yet
-			if detected_mode == "Nominal":
-				# detected no fault on negative sample
-				# this is a true negative
-				tn += 1
-			else:
-				# we detected a fault on negative sample
-				# this is a false postive
-				fp += 1
-		else:
-			p += 1
-			# fault detected
-			# correct_modes = [fault + str(s) for idx, s in enumerate(faulty_sensors) ]
-			if (detected_mode != "Nominal"):
-				# a correctly detected fault
-				tp += 1
-				latency_final = latency
-			else:
-				# a missed fault (so far)
-				fn += 1
-				latency += 1
-			detected_list.append(detected_mode)
-	
+	# before the fault, a Nominal ID is a true negative (and anything else a false positive)
+	# after the fault, a non-Nominal ID is a true positive (and Nominal a missed fault)
+	tp, tn, fp, fn, latency_final = count_stats(is_nominal[codes[~post_fault]], ~is_nominal[codes[post_fault]])
+	n = tn + fp
+	p = tp + fn
 
 	# get most common mess up
-	detected_mode_common = "Nominal"
-	if len(detected_list) > 0:
-		counter = Counter(detected_list)
-		detected_mode_common = counter.most_common(1)[0][0]
+	detected_mode_common = most_common_mode(codes[post_fault], labels)
 
 	# see https://en.wikipedia.org/wiki/Sensitivity_and_specificity for details
 	results_dict["FNR"] = fn / p
@@ -81,6 +86,7 @@ def generate_detection_stats(modes_df, fault_time_s, fault, faulty_sensors, resu
 	results_dict["FPR"] = fp / n
 	results_dict["TNR"] = tn / n
 	results_dict["Latency"] = latency_final
+	results_dict["Latency_s"] = latency_final * sample_period_s(modes_df)
 	results_dict["Detected_Fault"] = detected_mode_common
 	if faulty_sensors == "None":
 		results_dict["True_Fault"] = fault
@@ -89,164 +95,70 @@ def generate_detection_stats(modes_df, fault_time_s, fault, faulty_sensors, resu
 	
 	return results_dict
 
+def is_correct_id(fault, faulty_sensors, id_mode):
+	""" Returns True if id_mode correctly identifies fault, or None if fault is not implemented. """
+	if "CSSFAULT_STUCK_MAX" in fault:
+		return "Stuck" in id_mode and "Max" in id_mode and str(faulty_sensors) in id_mode
+	elif "CSSFAULT_OFF" in fault:
+		return "Off" in id_mode and str(faulty_sensors) in id_mode
+	elif "CSSFAULT_STUCK_CURRENT" in fault or "CSSFAULT_STUCK_RAND" in fault:
+		return "Stuck" in id_mode and str(faulty_sensors) in id_mode
+	elif "CSSFAULT_RAND" in fault:
+		return "CSS" in id_mode and "Random" in id_mode and str(faulty_sensors) in id_mode
+	elif "SIGNAL_STUCK" in fault:
+		return "Stuck" in id_mode and str(faulty_sensors) in id_mode
+	elif "SIGNAL_OFF" in fault:
+		return "Off" in id_mode and str(faulty_sensors) in id_mode
+	elif "FRICTION_10x" in fault:
+		return "Friction" in id_mode and "10x" in id_mode
+	elif "PanelAngleFault" in fault:
+		return "Panel" in id_mode and "Stuck" in id_mode
+	elif "PanelDeploymentFault" in fault:
+		return "Panel" in id_mode and "Deployment" in id_mode
+	elif "PanelEfficiencyFault" in fault:
+		return "Panel" in id_mode and "Efficiency" in id_mode
+	elif "BatteryCapacityFault" in fault:
+		return "Battery" in id_mode and "Decreased" in id_mode
+	elif "PowerSinkFault" in fault:
+		return "Power Sink" in id_mode
+	return None
+
 def generate_identification_stats(modes_df, fault_time_s, fault, faulty_sensors, results_dict):
 	fault_time_ns = fault_time_s * 1E9
-
-	# initialize the statistics
-	tp = 0
-	tn = 0
-	fp = 0
-	fn = 0
-	latency = 0
-	latency_final = 0
-
-	unknown_mode = "N/A"
-	id_list = []
+	codes, labels = mode_codes(modes_df)
+	times = modes_df.index.to_numpy()
+	post_fault = times >= fault_time_ns
+	p_extra = 0
+	if "PanelDeploymentFault" in fault:
+		# this is a hacky check. Used to find end of meaningful data inside PanelDeploymentFaults:
+		# the data ends at the first fault sample that goes back in time (which still counts as positive)
+		post_idx = np.flatnonzero(post_fault)
+		went_back = np.flatnonzero(times[post_idx[1:]] < times[post_idx[:-1]])
+		if len(went_back) > 0:
+			end = post_idx[went_back[0] + 1]
+			codes, post_fault = codes[:end], post_fault[:end]
+			p_extra = 1
+
+	post_codes = codes[post_fault]
+	is_nominal = np.array(["Nominal" in label for label in labels] + [False])
+	if len(post_codes) > 0 or p_extra > 0:
+		is_correct = np.array([is_correct_id(fault, faulty_sensors, label) for label in labels] + [False])
+		if None in is_correct:
+			print("ERROR in generate_identification_stats(): %s not implemented." %fault)
+			exit(1)
+		is_correct = is_correct.astype(bool)
+	else:
+		is_correct = np.zeros(len(labels) + 1, dtype=bool)
 
 	# see https://en.wikipedia.org/wiki/Sensitivity_and_specificity for details
-	n = 0
-	p = 0
-	# this is a hacky variable. Used to find end of meaningful data inside PanelDeploymentFaults
-	last_time = -1
-	for time, id_mode in modes_df.items():
-		if time < fault_time_ns:
-			n += 1
-			# no fault occured yet
-			if "Nominal" in id_mode:
-				# detected no fault on negative sample
-				# this is a true negative
-				tn += 1
-			else:
-				# we detected a fault on negative sample
-				# this is a false postive
-				fp += 1
-		else:
-			# print(fault)
-			p += 1
-			# fault id'd
-			# correct_modes = [fault + str(s) for idx, s in enumerate(faulty_sensors) ]
-			if "CSSFAULT_STUCK_MAX" in fault:
-				if "Stuck" in id_mode and "Max" in id_mode and str(faulty_sensors) in id_mode:
-					# a correctly id'd fault
-					tp += 1
-					latency_final = latency
-				else:
-					# a missed fault (so far)
-					fn += 1
-					latency += 1
-			elif "CSSFAULT_OFF" in fault:
-				if "Off" in id_mode and str(faulty_sensors) in id_mode:
-					# a correctly id'd fault
-					tp += 1
-					latency_final = latency
-				else:
-					# a missed fault (so far)
-					fn += 1
-					latency += 1
-			elif "CSSFAULT_STUCK_CURRENT" in fault or "CSSFAULT_STUCK_RAND" in fault:
-				if "Stuck" in id_mode and str(faulty_sensors) in id_mode:
-					# a correctly id'd fault
-					tp += 1
-					latency_final = latency
-				else:
-					# a missed fault (so far)
-					fn += 1
-					latency += 1
-			elif "CSSFAULT_RAND" in fault:
-				if "CSS" in id_mode and "Random" in id_mode and str(faulty_sensors) in id_mode:
-					# a correctly id'd fault
-					tp += 1
-					latency_final = latency
-				else:
-					# a missed fault (so far)
-					fn += 1
-					latency += 1
-			elif "SIGNAL_STUCK" in fault:
-				if "Stuck" in id_mode and str(faulty_sensors) in id_mode:
-					# a correctly id'd fault
-					tp += 1
-					latency_final = latency
-				else:
-					# a missed fault (so far)
-					fn += 1
-					latency += 1
-			elif "SIGNAL_OFF" in fault:
-				if "Off" in id_mode and str(faulty_sensors) in id_mode:
-					# a correctly id'd fault
-					tp += 1
-					latency_final = latency
-				else:
-					# a missed fault (so far)
-					fn += 1
-					latency += 1
-			elif "FRICTION_10x" in fault:
-				if "Friction" in id_mode and "10x" in id_mode:
-					# a correctly id'd fault
-					tp += 1
-					latency_final = latency
-				else:
-					# a missed fault (so far)
-					fn += 1
-					latency += 1
-			elif "PanelAngleFault" in fault:
-				if "Panel" in id_mode and "Stuck" in id_mode:
-					# a correctly id'd fault
-					tp += 1
-					latency_final = latency
-				else:
-					# a missed fault (so far)
-					fn += 1
-					latency += 1
-			elif "PanelDeploymentFault" in fault:
-				if last_time > time:
-					break
-				if "Panel" in id_mode and "Deployment" in id_mode:
-					# a correctly id'd fault
-					tp += 1
-					latency_final = latency
-				else:
-					# a missed fault (so far)
-					fn += 1
-					latency += 1
-				last_time = time
-			elif "PanelEfficiencyFault" in fault:
-				if "Panel" in id_mode and "Efficiency" in id_mode:
-					# a correctly id'd fault
-					tp += 1
-					latency_final = latency
-				else:
-					# a missed fault (so far)
-					fn += 1
-					latency += 1
-			elif "BatteryCapacityFault" in fault:
-				if "Battery" in id_mode and "Decreased" in id_mode:
-					# a correctly id'd fault
-					tp += 1
-					latency_final = latency
-				else:
-					# a missed fault (so far)
-					fn += 1
-					latency += 1
-			elif "PowerSinkFault" in fault:
-				if "Power Sink" in id_mode:
-					# a correctly id'd fault
-					tp += 1
-					latency_final = latency
-				else:
-					# a missed fault (so far)
-					fn += 1
-					latency += 1
-			else:
-				print("ERROR in generate_identification_stats(): %s not implemented." %fault)
-				exit(1)
-			id_list.append(id_mode)
-	
+	# before the fault, a Nominal ID is a true negative (and anything else a false positive)
+	# after the fault, the correct ID is a true positive (and anything else a missed fault)
+	tp, tn, fp, fn, latency_final = count_stats(is_nominal[codes[~post_fault]], is_correct[post_codes])
+	n = tn + fp
+	p = tp + fn + p_extra
 
 	# get most common mess up
-	id_mode_common = "Nominal"
-	if len(id_list) > 0:
-		counter = Counter(id_list)
-		id_list_common = counter.most_common(1)[0][0]
+	id_list_common = most_common_mode(post_codes, labels)
 
 	# see https://en.wikipedia.org/wiki/Sensitivity_and_specificity for details
 	results_dict["FNR"] = fn / p
@@ -254,6 +166,7 @@ def generate_identification_stats(modes_df, fault_time_s, fault, faulty_sensors,
 	results_dict["FPR"] = fp / n
 	results_dict["TNR"] = tn / n
 	results_dict["Latency"] = latency_final
+	results_dict["Latency_s"] = latency_final * sample_period_s(modes_df)
 	results_dict["Identified_Fault"] = id_list_common
 	if faulty_sensors == "None":
 		results_dict["True_Fault"] = fault
@@ -262,10 +175,11 @@ def generate_identification_stats(modes_df, fault_time_s, fault, faulty_sensors,
 	
 	return results_dict
 
-def calc_css_data(path2truth):
+def calc_css_data(path2truth, test_data=None):
 	example_id = os.path.basename(path2truth)
 	fault_data = pd.read_csv(path2truth + "/faults.csv", index_col=[0])
-	test_data = pd.read_csv("results/" + example_id + ".csv", index_col=[0], keep_default_na=False, na_values=['_'])
+	if test_data is None:
+		test_data = read_results(example_id)
 
 	det_stats_dict = {"Example_ID":example_id + "/",
 						"TPR": "N/A",
@@ -273,6 +187,7 @@ def calc_css_data(path2truth):
 						"TNR": "N/A",
 						"FNR": "N/A",
 						"Latency": "N/A",
+						"Latency_s": "N/A",
 						"Detected_Fault": "N/A",
 						"True_Fault": "N/A"}
 	id_stats_dict = {"Example_ID":example_id + "/",
@@ -281,10 +196,11 @@ def calc_css_data(path2truth):
 						"TNR": "N/A",
 						"FNR": "N/A",
 						"Latency": "N/A",
+						"Latency_s": "N/A",
 						"Identified_Fault": "N/A",
 						"True_Fault": "N/A"}
 	if fault_data.empty:
-		return rates_dict
+		return det_stats_dict, id_stats_dict
 	elif 'cssSignal' in fault_data['name'].values:
 		
 		msg = fault_data.loc[fault_data['name'] == 'cssSignal'].at[0,'message']
@@ -313,10 +229,11 @@ def calc_css_data(path2truth):
 
 	return det_stats_dict, id_stats_dict
 
-def calc_RwEncode_data(path2truth):
+def calc_RwEncode_data(path2truth, test_data=None):
 	example_id = os.path.basename(path2truth)
 	fault_data = pd.read_csv(path2truth + "/faults.csv", index_col=[0])
-	test_data = pd.read_csv("Results/" + example_id + ".csv", index_col=[0], keep_default_na=False, na_values=['_'])
+	if test_data is None:
+		test_data = read_results(example_id)
 	
 	det_stats_dict = {"Example_ID":example_id + "/",
 						"TPR": "N/A",
@@ -324,6 +241,7 @@ def calc_RwEncode_data(path2truth):
 						"TNR": "N/A",
 						"FNR": "N/A",
 						"Latency": "N/A",
+						"Latency_s": "N/A",
 						"Detected_Fault": "N/A",
 						"True_Fault": "N/A"}
 	id_stats_dict = {"Example_ID":example_id + "/",
@@ -332,11 +250,12 @@ def calc_RwEncode_data(path2truth):
 						"TNR": "N/A",
 						"FNR": "N/A",
 						"Latency": "N/A",
+						"Latency_s": "N/A",
 						"Identified_Fault": "N/A",
 						"True_Fault": "N/A"}
 	
 	if fault_data.empty:
-		return rates_dict
+		return det_stats_dict, id_stats_dict
 	elif 'RwEncoder' in fault_data['name'].values:
 		msg = fault_data.loc[fault_data['name'] == 'RwEncoder'].at[0,'message']
 		time = fault_data.loc[fault_data['name'] == 'RwEncoder'].at[0,'time [s]']
@@ -361,10 +280,11 @@ def calc_RwEncode_data(path2truth):
 		id_stats_dict = generate_identification_stats(test_data['RW_ENCODER_ID'], time, fault, faulty_sensors_lst, id_stats_dict)
 	return det_stats_dict, id_stats_dict
 
-def calc_RwFric_data(path2truth):
+def calc_RwFric_data(path2truth, test_data=None):
 	example_id = os.path.basename(path2truth)
 	fault_data = pd.read_csv(path2truth + "/faults.csv", index_col=[0])
-	test_data = pd.read_csv("Results/" + example_id + ".csv", index_col=[0], keep_default_na=False, na_values=['_'])
+	if test_data is None:
+		test_data = read_results(example_id)
 	
 	det_stats_dict = {"Example_ID":example_id + "/",
 						"TPR": "N/A",
@@ -372,6 +292,7 @@ def calc_RwFric_data(path2truth):
 						"TNR": "N/A",
 						"FNR": "N/A",
 						"Latency": "N/A",
+						"Latency_s": "N/A",
 						"Detected_Fault": "N/A",
 						"True_Fault": "N/A"}
 
@@ -381,10 +302,11 @@ def calc_RwFric_data(path2truth):
 						"TNR": "N/A",
 						"FNR": "N/A",
 						"Latency": "N/A",
+						"Latency_s": "N/A",
 						"Identified_Fault": "N/A",
 						"True_Fault": "N/A"}
 	if fault_data.empty:
-		return rates_dict
+		return det_stats_dict, id_stats_dict
 	elif 'RwFriction' in fault_data['name'].values:
 		msg = fault_data.loc[fault_data['name'] == 'RwFriction'].at[0,'message']
 		time = fault_data.loc[fault_data['name'] == 'RwFriction'].at[0,'time [s]']
@@ -412,10 +334,11 @@ def calc_RwFric_data(path2truth):
 		id_stats_dict = generate_identification_stats(test_data['RW_FRICTION_ID'], time, fault, faulty_sensors_lst, id_stats_dict)
 	return det_stats_dict, id_stats_dict
 
-def calc_panelDeployment_data(path2truth):
+def calc_panelDeployment_data(path2truth, test_data=None):
 	example_id = os.path.basename(path2truth)
 	fault_data = pd.read_csv(path2truth + "/faults.csv", index_col=[0])
-	test_data = pd.read_csv("Results/" + example_id + ".csv", index_col=[0], keep_default_na=False, na_values=['_'])
+	if test_data is None:
+		test_data = read_results(example_id)
 	
 	det_stats_dict = {"Example_ID":example_id + "/",
 						"TPR": "N/A",
@@ -423,6 +346,7 @@ def calc_panelDeployment_data(path2truth):
 						"TNR": "N/A",
 						"FNR": "N/A",
 						"Latency": "N/A",
+						"Latency_s": "N/A",
 						"Detected_Fault": "N/A",
 						"True_Fault": "N/A"}
 	id_stats_dict = {"Example_ID":example_id + "/",
@@ -431,11 +355,12 @@ def calc_panelDeployment_data(path2truth):
 						"TNR": "N/A",
 						"FNR": "N/A",
 						"Latency": "N/A",
+						"Latency_s": "N/A",
 						"Identified_Fault": "N/A",
 						"True_Fault": "N/A"}
 
 	if fault_data.empty:
-		return rates_dict
+		return det_stats_dict, id_stats_dict
 	elif 'deployment' in fault_data['name'].values:
 		fault = "PanelDeploymentFault"
 		'''
@@ -459,10 +384,11 @@ def calc_panelDeployment_data(path2truth):
 		id_stats_dict = generate_identification_stats(test_data['PANEL_DEPLOY_ID'], time, fault, faulty_sensors_lst, id_stats_dict)
 	return det_stats_dict, id_stats_dict
 
-def calc_panelEfficiency_data(path2truth):
+def calc_panelEfficiency_data(path2truth, test_data=None):
 	example_id = os.path.basename(path2truth)
 	fault_data = pd.read_csv(path2truth + "/faults.csv", index_col=[0])
-	test_data = pd.read_csv("Results/" + example_id + ".csv", index_col=[0], keep_default_na=False, na_values=['_'])
+	if test_data is None:
+		test_data = read_results(example_id)
 	
 	det_stats_dict = {"Example_ID":example_id + "/",
 						"TPR": "N/A",
@@ -470,6 +396,7 @@ def calc_panelEfficiency_data(path2truth):
 						"TNR": "N/A",
 						"FNR": "N/A",
 						"Latency": "N/A",
+						"Latency_s": "N/A",
 						"Detected_Fault": "N/A",
 						"True_Fault": "N/A"}
 	id_stats_dict = {"Example_ID":example_id + "/",
@@ -478,11 +405,12 @@ def calc_panelEfficiency_data(path2truth):
 						"TNR": "N/A",
 						"FNR": "N/A",
 						"Latency": "N/A",
+						"Latency_s": "N/A",
 						"Identified_Fault": "N/A",
 						"True_Fault": "N/A"}
 
 	if fault_data.empty:
-		return rates_dict
+		return det_stats_dict, id_stats_dict
 	elif 'panelEfficiency' in fault_data['name'].values:
 		fault = "PanelEfficiencyFault"
 		'''
@@ -498,10 +426,11 @@ def calc_panelEfficiency_data(path2truth):
 		id_stats_dict = generate_identification_stats(test_data['PANEL_EFF_ID'], time, fault, faulty_sensors_lst, id_stats_dict)
 	return det_stats_dict, id_stats_dict
 
-def calc_BattCap_data(path2truth):
+def calc_BattCap_data(path2truth, test_data=None):
 	example_id = os.path.basename(path2truth)
 	fault_data = pd.read_csv(path2truth + "/faults.csv", index_col=[0])
-	test_data = pd.read_csv("Results/" + example_id + ".csv", index_col=[0], keep_default_na=False, na_values=['_'])
+	if test_data is None:
+		test_data = read_results(example_id)
 	
 	det_stats_dict = {"Example_ID":example_id + "/",
 						"TPR": "N/A",
@@ -509,6 +438,7 @@ def calc_BattCap_data(path2truth):
 						"TNR": "N/A",
 						"FNR": "N/A",
 						"Latency": "N/A",
+						"Latency_s": "N/A",
 						"Detected_Fault": "N/A",
 						"True_Fault": "N/A"}
 	id_stats_dict = {"Example_ID":example_id + "/",
@@ -517,11 +447,12 @@ def calc_BattCap_data(path2truth):
 						"TNR": "N/A",
 						"FNR": "N/A",
 						"Latency": "N/A",
+						"Latency_s": "N/A",
 						"Identified_Fault": "N/A",
 						"True_Fault": "N/A"}
 
 	if fault_data.empty:
-		return rates_dict
+		return det_stats_dict, id_stats_dict
 	elif 'batteryCapacity' in fault_data['name'].values:
 		fault = "BatteryCapacityFault"
 		'''
@@ -537,10 +468,11 @@ def calc_BattCap_data(path2truth):
 		id_stats_dict = generate_identification_stats(test_data['BATTERY_CAP_ID'], time, fault, faulty_sensors_lst, id_stats_dict)
 	return det_stats_dict, id_stats_dict
 
-def calc_powerSink_data(path2truth):
+def calc_powerSink_data(path2truth, test_data=None):
 	example_id = os.path.basename(path2truth)
 	fault_data = pd.read_csv(path2truth + "/faults.csv", index_col=[0])
-	test_data = pd.read_csv("Results/" + example_id + ".csv", index_col=[0], keep_default_na=False, na_values=['_'])
+	if test_data is None:
+		test_data = read_results(example_id)
 	
 	det_stats_dict = {"Example_ID":example_id + "/",
 						"TPR": "N/A",
@@ -548,6 +480,7 @@ def calc_powerSink_data(path2truth):
 						"TNR": "N/A",
 						"FNR": "N/A",
 						"Latency": "N/A",
+						"Latency_s": "N/A",
 						"Detected_Fault": "N/A",
 						"True_Fault": "N/A"}
 	id_stats_dict = {"Example_ID":example_id + "/",
@@ -556,11 +489,12 @@ def calc_powerSink_data(path2truth):
 						"TNR": "N/A",
 						"FNR": "N/A",
 						"Latency": "N/A",
+						"Latency_s": "N/A",
 						"Identified_Fault": "N/A",
 						"True_Fault": "N/A"}
 
 	if fault_data.empty:
-		return rates_dict
+		return det_stats_dict, id_stats_dict
 	elif 'powerSink' in fault_data['name'].values:
 		fault = "PowerSinkFault"
 		'''
@@ -574,10 +508,11 @@ def calc_powerSink_data(path2truth):
 		id_stats_dict = generate_identification_stats(test_data['POWER_SINK_ID'], time, fault, faulty_sensors_lst, id_stats_dict)
 	return det_stats_dict,id_stats_dict
 
-def calc_panelAngle_data(path2truth):
+def calc_panelAngle_data(path2truth, test_data=None):
 	example_id = os.path.basename(path2truth)
 	fault_data = pd.read_csv(path2truth + "/faults.csv", index_col=[0])
-	test_data = pd.read_csv("Results/" + example_id + ".csv", index_col=[0], keep_default_na=False, na_values=['_'])
+	if test_data is None:
+		test_data = read_results(example_id)
 	
 	det_stats_dict = {"Example_ID":example_id + "/",
 						"TPR": "N/A",
@@ -585,6 +520,7 @@ def calc_panelAngle_data(path2truth):
 						"TNR": "N/A",
 						"FNR": "N/A",
 						"Latency": "N/A",
+						"Latency_s": "N/A",
 						"Detected_Fault": "N/A",
 						"True_Fault": "N/A"}
 	id_stats_dict = {"Example_ID":example_id + "/",
@@ -593,11 +529,12 @@ def calc_panelAngle_data(path2truth):
 						"TNR": "N/A",
 						"FNR": "N/A",
 						"Latency": "N/A",
+						"Latency_s": "N/A",
 						"Identified_Fault": "N/A",
 						"True_Fault": "N/A"}
 
 	if fault_data.empty:
-		return rates_dict
+		return det_stats_dict, id_stats_dict
 	elif 'panelAng' in fault_data['name'].values:
 		fault = "PanelAngleFault"
 		'''
@@ -614,6 +551,170 @@ def calc_panelAngle_data(path2truth):
 	return det_stats_dict, id_stats_dict
 
 
+def locate_results(example_id, results_dir="results/"):
+	""" Returns the results of a single example: <results_dir>/<example ID>.csv or, if the 
+	results were written with --results-format binary, the <results_dir>/<example ID>.bin directory. """
+	csv_path = results_dir + example_id + ".csv"
+	return csv_path if os.path.isfile(csv_path) else results_dir + example_id + ".bin"
+
+def read_results(example_id, results_dir="results/"):
+	""" Reads the Fault ID results of a single example (see TestManager.export_results()) as categorical mode ID's. """
+	path = locate_results(example_id, results_dir)
+	if os.path.isdir(path):
+		# this script is run from within src/ as well as imported as src.results_2_stats
+		try:
+			from src.ResultsWriter import read_binary_results
+		except ImportError:
+			from ResultsWriter import read_binary_results
+		return read_binary_results(path)
+	results = pd.read_csv(path, index_col=[0], keep_default_na=False, na_values=['_'])
+	return results.astype("category")
+
+# the stats file prefix and the stats calculator of every Fault ID test
+STATS_CALCULATORS = [("CSS", calc_css_data),
+					("RwEncode", calc_RwEncode_data),
+					("RwFriction", calc_RwFric_data),
+					("PanelDeploy", calc_panelDeployment_data),
+					("PanelEfficiency", calc_panelEfficiency_data),
+					("BattCap", calc_BattCap_data),
+					("PowerSink", calc_powerSink_data),
+					("PanelAngle", calc_panelAngle_data)]
+
+DET_STATS_COLUMNS = ["Example_ID", 
+					"TPR_(1/100)", "FPR_(1/100)", 
+					"TNR_(1/100)", "FNR_(1/100)",
+					"Latency (k)", "Latency (s)", "Detected_Fault", "True_Fault"]
+
+ID_STATS_COLUMNS = ["Example_ID", 
+					"TPR_(1/100)", "FPR_(1/100)", 
+					"TNR_(1/100)", "FNR_(1/100)",
+					"Latency (k)", "Latency (s)", "Identified_Fault", "True_Fault"]
+
+def calc_example_stats(path2truth, test_data=None):
+	""" Calculates the detection and identification stats of every Fault ID 
+	test for a single example. Returns a dictionary where the key is the stats 
+	table name (e.g. "CSS_det_stats") and the value is the row of that table.
+	test_data defaults to the example's results file.
+	"""
+	example_stats = {}
+	for prefix, calc_stats in STATS_CALCULATORS:
+		det_stats_example, id_stats_example = calc_stats(path2truth, test_data)
+		example_stats[prefix + "_det_stats"] = list(det_stats_example.values())
+		example_stats[prefix + "_id_stats"] = list(id_stats_example.values())
+	return example_stats
+
+def build_stats_tables(example_stats_list):
+	""" Turns a list of calc_example_stats() outputs into a dictionary 
+	of pandas.DataFrames (one per stats table) with one row per example. 
+	"""
+	stats_tables = {}
+	for prefix, calc_stats in STATS_CALCULATORS:
+		stats_tables[prefix + "_det_stats"] = pd.DataFrame(columns=DET_STATS_COLUMNS)
+		stats_tables[prefix + "_id_stats"] = pd.DataFrame(columns=ID_STATS_COLUMNS)
+	for example_stats in example_stats_list:
+		for table_name, row in example_stats.items():
+			stats_table = stats_tables[table_name]
+			stats_table.loc[len(stats_table.index)] = row
+	return stats_tables
+
+# the version of the stats calculators and of the mode label rules (see is_correct_id()). 
+# Bump it whenever either changes, so every example in the stats store is recomputed.
+STATS_VERSION = 1
+
+def stats_key(path2truth, results_path):
+	""" Returns the key of an example in the stats store: a hash of its results file 
+	(every file of a binary results directory), its faults.csv and STATS_VERSION. 
+	The stats only need to be recomputed when it changes. """
+	sha = hashlib.sha256(repr(("stats", STATS_VERSION)).encode())
+	paths = [results_path]
+	if os.path.isdir(results_path):
+		paths = [os.path.join(results_path, file) for file in sorted(os.listdir(results_path))]
+	for path in paths + [path2truth + "/faults.csv"]:
+		with open(path, "rb") as f:
+			for chunk in iter(lambda: f.read(2**20), b""):
+				sha.update(chunk)
+	return sha.hexdigest()
+
+def to_builtin(value):
+	""" Converts numpy scalars into Python scalars (used to serialize the stats store). """
+	return value.item() if isinstance(value, np.generic) else value
+
+def update_stats_store(filenames, relativePath2Truth="examples/Telemetry/", results_dir="results/", store_dir="stats/store/"):
+	""" Returns the calc_example_stats() output of every results file (or binary results 
+	directory) in filenames. 
+	The stats of every example are kept in <store_dir>/<example ID>.json under their 
+	stats_key(), so only new or changed examples are computed. Entries of examples 
+	that are no longer in filenames are removed. 
+	"""
+	if not os.path.exists(store_dir):
+		os.makedirs(store_dir)
+	example_ids = [file[:-4] for file in filenames]
+	example_stats_list = []
+	num_computed = 0
+	for example_id in example_ids:
+		truthPath = relativePath2Truth + example_id
+		key = stats_key(truthPath, locate_results(example_id, results_dir))
+		entry_path = os.path.join(store_dir, example_id + ".json")
+		entry = None
+		if os.path.isfile(entry_path):
+			with open(entry_path) as f:
+				entry = json.load(f)
+		if entry is None or entry["key"] != key:
+			print(truthPath)
+			entry = {"key": key, "version": STATS_VERSION, 
+					"stats": calc_example_stats(truthPath, read_results(example_id, results_dir))}
+			with open(entry_path + ".tmp", "w") as f:
+				json.dump(entry, f, indent=1, default=to_builtin)
+			os.replace(entry_path + ".tmp", entry_path)
+			num_computed += 1
+		example_stats_list.append(entry["stats"])
+	for file in os.listdir(store_dir):
+		if file.endswith(".json") and file[:-5] not in example_ids:
+			os.remove(os.path.join(store_dir, file))
+	print("Computed the stats of %d new or changed of %d examples." %(num_computed, len(example_ids)))
+	return example_stats_list
+
+def aggregate_stats(stats_table, example_id="mean"):
+	""" Summarizes a stats table (e.g. the per-replica stats of a Monte-Carlo run). 
+	The rates and latency are averaged over the rows where they are available and 
+	the fault names are replaced by the most common one. The summary is returned 
+	as a row of the same format. 
+	"""
+	summary = [example_id]
+	for column in stats_table.columns[1:]:
+		values = [v for v in stats_table[column] if not (isinstance(v, str) and v == "N/A")]
+		if len(values) == 0:
+			summary.append("N/A")
+		elif column.endswith("_Fault"):
+			summary.append(Counter(values).most_common(1)[0][0])
+		else:
+			summary.append(sum(values) / len(values))
+	return summary
+
+def compare_latency(baseline_tables, stats_tables):
+	""" Compares the rates and latencies of two sets of stats tables (e.g. of two 
+	decision engines, see FaultIdentifier.set_decision_engine()) example by example. 
+	Returns a pandas.DataFrame with one row per stats table and example that holds 
+	the baseline value, the new value and their difference. 
+	"""
+	columns = ["TPR_(1/100)", "FPR_(1/100)", "Latency (k)", "Latency (s)"]
+	rows = []
+	for table_name, stats_table in stats_tables.items():
+		baseline = baseline_tables[table_name].set_index("Example_ID")
+		for _, example_stats in stats_table.iterrows():
+			if example_stats["Example_ID"] not in baseline.index:
+				continue
+			row = [table_name, example_stats["Example_ID"]]
+			for column in columns:
+				old, new = baseline.at[example_stats["Example_ID"], column], example_stats[column]
+				# stats tables read back from csv files hold NaN instead of "N/A"
+				numeric = all(not (isinstance(v, str) and v == "N/A") and not pd.isna(v) for v in (old, new))
+				row += [old, new, float(new) - float(old) if numeric else "N/A"]
+			rows.append(row)
+	header = ["Stats", "Example_ID"] + [name + suffix for name in columns for suffix in (" baseline", "", " change")]
+	return pd.DataFrame(rows, columns=header)
+
+
 if __name__ == "__main__":
 	'''
 	This script turns all csv files from hyp_test.py into meaningful results like:
@@ -622,170 +723,40 @@ if __name__ == "__main__":
 		TNR := Probability of no fault occuring and no fault detected (good)
 		FNR := Probability of no fault occuring but dectecting a fault (bad)
 		Latency := Time of fault occurance - Time of fault detection (successful detections only)
+	Run with --compare <path/to/stats> to compare the new stats with those of an earlier 
+	run (e.g. with another decision engine), saved in stats/comparison.csv.
 	'''
+	baseline_dir = None
+	if len(sys.argv) > 2 and sys.argv[1] == "--compare":
+		baseline_dir = sys.argv[2]
 
 	# pull all results
 	relativePath2Truth = "examples/Telemetry/"
-	filenames = next(os.walk("results/"))[2]  # [] if no file
+	_, dirnames, filenames = next(os.walk("results/"))  # [] if no file
 	if ".DS_Store" in filenames:
 		filenames.remove(".DS_Store")
 
-	# create CssFault results DF
-	css_det_stats_total = pd.DataFrame(columns=["Example_ID", 
-												"TPR_(1/100)", "FPR_(1/100)", 
-												"TNR_(1/100)", "FNR_(1/100)",
-												"Latency (k)", "Detected_Fault", "True_Fault"])
-
-	# create CssFault results DF
-	css_id_stats_total = pd.DataFrame(columns=["Example_ID", 
-												"TPR_(1/100)", "FPR_(1/100)", 
-												"TNR_(1/100)", "FNR_(1/100)",
-												"Latency (k)", "Identified_Fault", "True_Fault"])
-	# create RwEncode results DF
-	RwEncode_det_stats_total = pd.DataFrame(columns=["Example_ID", 
-												"TPR_(1/100)", "FPR_(1/100)", 
-												"TNR_(1/100)", "FNR_(1/100)",
-												"Latency (k)", "Detected_Fault", "True_Fault"])
-	# create RwEncode results DF
-	RwEncode_id_stats_total = pd.DataFrame(columns=["Example_ID", 
-												"TPR_(1/100)", "FPR_(1/100)", 
-												"TNR_(1/100)", "FNR_(1/100)",
-												"Latency (k)", "Identified_Fault", "True_Fault"])
-	# create RwFric results DF
-	RwFric_det_stats_total = pd.DataFrame(columns=["Example_ID", 
-												"TPR_(1/100)", "FPR_(1/100)", 
-												"TNR_(1/100)", "FNR_(1/100)",
-												"Latency (k)", "Detected_Fault", "True_Fault"])
-	# create RwFric results DF
-	RwFric_id_stats_total = pd.DataFrame(columns=["Example_ID", 
-												"TPR_(1/100)", "FPR_(1/100)", 
-												"TNR_(1/100)", "FNR_(1/100)",
-												"Latency (k)", "Identified_Fault", "True_Fault"])
-	# create Panel Deployment Fault results DF
-	PanelDeployment_det_stats_total = pd.DataFrame(columns=["Example_ID", 
-												"TPR_(1/100)", "FPR_(1/100)", 
-												"TNR_(1/100)", "FNR_(1/100)",
-												"Latency (k)", "Detected_Fault", "True_Fault"])
-	PanelDeployment_id_stats_total = pd.DataFrame(columns=["Example_ID", 
-												"TPR_(1/100)", "FPR_(1/100)", 
-												"TNR_(1/100)", "FNR_(1/100)",
-												"Latency (k)", "Identified_Fault", "True_Fault"])
-
-	# create Panel Deployment Fault results DF
-	PanelEff_det_stats_total = pd.DataFrame(columns=["Example_ID", 
-												"TPR_(1/100)", "FPR_(1/100)", 
-												"TNR_(1/100)", "FNR_(1/100)",
-												"Latency (k)", "Detected_Fault", "True_Fault"])
-	PanelEff_id_stats_total = pd.DataFrame(columns=["Example_ID", 
-												"TPR_(1/100)", "FPR_(1/100)", 
-												"TNR_(1/100)", "FNR_(1/100)",
-												"Latency (k)", "Identified_Fault", "True_Fault"])
-
-	# create Panel Deployment Fault results DF
-	BattCap_det_stats_total = pd.DataFrame(columns=["Example_ID", 
-												"TPR_(1/100)", "FPR_(1/100)", 
-												"TNR_(1/100)", "FNR_(1/100)",
-												"Latency (k)", "Detected_Fault", "True_Fault"])
-	BattCap_id_stats_total = pd.DataFrame(columns=["Example_ID", 
-												"TPR_(1/100)", "FPR_(1/100)", 
-												"TNR_(1/100)", "FNR_(1/100)",
-												"Latency (k)", "Identified_Fault", "True_Fault"])
-
-	# create Panel Deployment Fault results DF
-	PowerSink_det_stats_total = pd.DataFrame(columns=["Example_ID", 
-												"TPR_(1/100)", "FPR_(1/100)", 
-												"TNR_(1/100)", "FNR_(1/100)",
-												"Latency (k)", "Detected_Fault", "True_Fault"])
-	PowerSink_id_stats_total = pd.DataFrame(columns=["Example_ID", 
-												"TPR_(1/100)", "FPR_(1/100)", 
-												"TNR_(1/100)", "FNR_(1/100)",
-												"Latency (k)", "Identified_Fault", "True_Fault"])
-	
-	# create Panel Angle Fault results DF
-	PanelAngle_det_stats_total = pd.DataFrame(columns=["Example_ID", 
-														"TPR_(1/100)", "FPR_(1/100)", 
-														"TNR_(1/100)", "FNR_(1/100)",
-														"Latency (k)", "Detected_Fault", "True_Fault"])
-	PanelAngle_id_stats_total = pd.DataFrame(columns=["Example_ID", 
-														"TPR_(1/100)", "FPR_(1/100)", 
-														"TNR_(1/100)", "FNR_(1/100)",
-														"Latency (k)", "Identified_Fault", "True_Fault"])
-	
-	# '''
-	# To Do:
-	# - Panel Efficiency Fault
-	# - Battery Capacity Fault
-	# '''
-	for idx, file in enumerate(filenames):
-		truthPath = relativePath2Truth + file[:-4]
-		print(truthPath)
-		# calc css stats for this example
-		css_det_stats_example, css_id_stats_example = calc_css_data(truthPath)
-		css_det_stats_total.loc[len(css_det_stats_total.index)] = list(css_det_stats_example.values()) 
-		css_id_stats_total.loc[len(css_id_stats_total.index)] = list(css_id_stats_example.values()) 
-	
-		# calc RwEncode stats for this example
-		rwencode_det_stats_example, rwencode_id_stats_example = calc_RwEncode_data(truthPath)
-		RwEncode_det_stats_total.loc[len(RwEncode_det_stats_total.index)] = list(rwencode_det_stats_example.values()) 
-		RwEncode_id_stats_total.loc[len(RwEncode_id_stats_total.index)] = list(rwencode_id_stats_example.values()) 
-		
-		# calc RwFric stats for this example
-		RwFric_det_stats_example, RwFric_id_stats_example = calc_RwFric_data(truthPath)
-		RwFric_det_stats_total.loc[len(RwFric_det_stats_total.index)] = list(RwFric_det_stats_example.values())
-		RwFric_id_stats_total.loc[len(RwFric_id_stats_total.index)] = list(RwFric_id_stats_example.values())
-
-		# calc Panel Deployment stats for this example
-		PanelDeployment_det_stats_example, PanelDeployment_id_stats_example = calc_panelDeployment_data(truthPath)
-		PanelDeployment_det_stats_total.loc[len(PanelDeployment_det_stats_total.index)] = list(PanelDeployment_det_stats_example.values()) 
-		PanelDeployment_id_stats_total.loc[len(PanelDeployment_id_stats_total.index)] = list(PanelDeployment_id_stats_example.values())
-
-		# calc Panel Efficiency stats for this example
-		PanelEff_det_stats_example, PanelEff_id_stats_example = calc_panelEfficiency_data(truthPath)
-		PanelEff_det_stats_total.loc[len(PanelEff_det_stats_total.index)] = list(PanelEff_det_stats_example.values()) 
-		PanelEff_id_stats_total.loc[len(PanelEff_id_stats_total.index)] = list(PanelEff_id_stats_example.values())
-
-		# calc Panel Efficiency stats for this example
-		BattCap_det_stats_example, BattCap_id_stats_example = calc_BattCap_data(truthPath)
-		BattCap_det_stats_total.loc[len(BattCap_det_stats_total.index)] = list(BattCap_det_stats_example.values()) 
-		BattCap_id_stats_total.loc[len(BattCap_id_stats_total.index)] = list(BattCap_id_stats_example.values())
-
-		# calc Power Sink Stats for this example
-		PowerSink_det_stats_example, PowerSink_id_stats_example = calc_powerSink_data(truthPath)
-		PowerSink_det_stats_total.loc[len(PowerSink_det_stats_total.index)] = list(PowerSink_det_stats_example.values()) 
-		PowerSink_id_stats_total.loc[len(PowerSink_id_stats_total.index)] = list(PowerSink_id_stats_example.values())
-
-		# calc Panel Angle Stats for this example
-		PanelAngle_det_stats_example, PanelAngle_id_stats_example = calc_panelAngle_data(truthPath)
-		PanelAngle_det_stats_total.loc[len(PanelAngle_det_stats_total.index)] = list(PanelAngle_det_stats_example.values()) 
-		PanelAngle_id_stats_total.loc[len(PanelAngle_id_stats_total.index)] = list(PanelAngle_id_stats_example.values()) 
+	# csv results files and binary results directories (see --results-format)
+	filenames = [file for file in filenames if file.endswith(".csv")]
+	filenames += [dirname for dirname in dirnames if dirname.endswith(".bin") and dirname[:-4] + ".csv" not in filenames]
+
+	# only new or changed examples are computed, the rest comes from the stats store
+	example_stats_list = update_stats_store(filenames, relativePath2Truth)
+	stats_tables = build_stats_tables(example_stats_list)
 
-	
 	isExist = os.path.exists("stats/")
 	if not isExist:
 		# Create a new directory because it does not exist
 		os.mkdir("stats/")
 
 	# export the results
-	css_det_stats_total.to_csv("stats/CSS_det_stats.csv")
-	css_id_stats_total.to_csv("stats/CSS_id_stats.csv")
-	
-	RwEncode_det_stats_total.to_csv("stats/RwEncode_det_stats.csv")
-	RwEncode_id_stats_total.to_csv("stats/RwEncode_id_stats.csv")
-	
-	RwFric_det_stats_total.to_csv("stats/RwFriction_det_stats.csv")
-	RwFric_id_stats_total.to_csv("stats/RwFriction_id_stats.csv")
-	
-	PanelDeployment_det_stats_total.to_csv("stats/PanelDeploy_det_stats.csv")
-	PanelDeployment_id_stats_total.to_csv("stats/PanelDeploy_id_stats.csv")
-
-	PanelEff_det_stats_total.to_csv("stats/PanelEfficiency_det_stats.csv")
-	PanelEff_id_stats_total.to_csv("stats/PanelEfficiency_id_stats.csv")
-
-	BattCap_det_stats_total.to_csv("stats/BattCap_det_stats.csv")
-	BattCap_id_stats_total.to_csv("stats/BattCap_id_stats.csv")
-	
-	PowerSink_det_stats_total.to_csv("stats/PowerSink_det_stats.csv")
-	PowerSink_id_stats_total.to_csv("stats/PowerSink_id_stats.csv")
-	
-	PanelAngle_det_stats_total.to_csv("stats/PanelAngle_det_stats.csv")
-	PanelAngle_id_stats_total.to_csv("stats/PanelAngle_id_stats.csv")
+	for table_name, stats_table in stats_tables.items():
+		stats_table.to_csv("stats/" + table_name + ".csv")
+
+	if baseline_dir is not None:
+		baseline_tables = {table_name: pd.read_csv(os.path.join(baseline_dir, table_name + ".csv"), index_col=[0]) 
+							for table_name in stats_tables}
+		comparison = compare_latency(baseline_tables, stats_tables)
+		comparison = comparison[comparison["Latency (k) change"] != "N/A"]
+		print(comparison[["Stats", "Example_ID", "Latency (k) baseline", "Latency (k)", "Latency (s) change"]].to_string(index=False))
+		comparison.to_csv("stats/comparison.csv")